@@ -0,0 +1,46 @@
+"""
+Сравнение ConsoleLogger и FastConsoleLogger при перехвате stdlib logging в loguru.
+
+Запуск: python benchmarks/bench_console_logger.py
+"""
+
+import logging
+import timeit
+
+import loguru
+
+from fastapi_app.logging import loggers
+
+NUMBER = 20_000
+REPEAT = 5
+
+
+def nested_call(logger: logging.Logger, depth: int) -> None:
+    """Глубина стека влияет на обход фреймов в ConsoleLogger."""
+    if depth:
+        return nested_call(logger, depth - 1)
+    logger.debug("message %s", depth)
+
+
+def bench(name: str, handler: logging.Handler, depth: int) -> None:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    seconds = min(
+        timeit.repeat(lambda: nested_call(logger, depth), number=NUMBER, repeat=REPEAT),
+    )
+    print(f"{name:<20} depth={depth:<3} {seconds / NUMBER * 1_000_000:8.2f} us/op")
+
+
+if __name__ == "__main__":
+    loguru.logger.remove()
+    loguru.logger.add(
+        lambda message: None,
+        level="DEBUG",
+        format="{time} {level} {name}:{function}:{line} {message}",
+    )
+
+    for depth in (0, 20):
+        bench("ConsoleLogger", loggers.ConsoleLogger(), depth)
+        bench("FastConsoleLogger", loggers.FastConsoleLogger(), depth)
@@ -0,0 +1,70 @@
+"""
+Микробенчмарк маскирования тел и заголовков запросов.
+
+Запуск: python benchmarks/bench_masking.py
+"""
+
+import copy
+import timeit
+
+import orjson
+
+from fastapi_app.logging import masking
+from fastapi_app.logging.models import RawJSON
+
+NUMBER = 20_000
+
+BODY = {
+    "user": {"login": "user", "email": "user@example.com", "password": "secret"},
+    "items": [{"id": i, "title": f"item {i}", "price": i * 10} for i in range(20)],
+    "meta": {"source": "mobile", "version": "1.2.3"},
+}
+CLEAN_BODY = {key: value for key, value in BODY.items() if key != "user"}
+HEADERS = {
+    "host": "api.example.com",
+    "content-type": "application/json",
+    "authorization": "Bearer token",
+    "user-agent": "bench",
+}
+
+
+def deepcopy_walk(body: dict, names: frozenset[str]) -> dict:
+    """Наивная реализация для сравнения: deepcopy и обход всего дерева."""
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key.lower() in names:
+                    value[key] = "***"
+                else:
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    result = copy.deepcopy(body)
+    walk(result)
+    return result
+
+
+def bench(name: str, func) -> None:
+    seconds = timeit.timeit(func, number=NUMBER)
+    print(f"{name:<40} {seconds / NUMBER * 1_000_000:8.2f} us/op")
+
+
+if __name__ == "__main__":
+    masker = masking.Masker(masking.DEFAULT_MASK_RULES)
+    path_masker = masking.Masker([*masking.DEFAULT_MASK_RULES, "body.user.email"])
+    names = frozenset(
+        {"password", "token", "access_token", "refresh_token", "secret", "api_key"}
+    )
+    raw = RawJSON(orjson.dumps(BODY))
+    clean_raw = RawJSON(orjson.dumps(CLEAN_BODY))
+
+    print(f"body size: {len(raw.raw)} bytes")
+    bench("raw json, no sensitive fields", lambda: masker.mask_body(clean_raw))
+    bench("raw json, sensitive fields", lambda: masker.mask_body(raw))
+    bench("raw json, path rule (parse fallback)", lambda: path_masker.mask_body(raw))
+    bench("parsed body, single pass", lambda: masker.mask_body(BODY))
+    bench("headers", lambda: masker.mask_headers(HEADERS))
+    bench("baseline: deepcopy and walk", lambda: deepcopy_walk(BODY, names))
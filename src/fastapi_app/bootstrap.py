@@ -15,8 +15,10 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 from starlette import types
 
 from fastapi_app.exception_handlers import exceptions, registry
+from fastapi_app.idempotency import cache as replay_cache
 from fastapi_app.idempotency import middleware as idempotency_middleware
 from fastapi_app.logging import middleware as logging_middleware
+from fastapi_app.logging import policy as log_policy
 from fastapi_app.telemetry import sentry
 
 logger = logging.getLogger(__name__)
@@ -56,6 +58,9 @@ def create(
     idempotency_backed: base.Backend | None = None,
     idempotency_enforce_uuid4: bool = True,
     idempotency_methods: typing.List[typing.Text] | None = None,
+    idempotency_cache: replay_cache.ResponseCache | None = None,
+    idempotency_wait_timeout: float | None = None,
+    idempotency_max_body_bytes: int | None = idempotency_middleware.MAX_BODY_BYTES,
     auth_require: bool = False,
     auth_key_pattern: typing.Text = "API_KEY_",
     ignore_auth_methods: typing.List[typing.Text] | None = None,
@@ -72,6 +77,12 @@ def create(
     cors_allow_credentials: bool = True,
     sentry_enable: bool = False,
     sentry_dsn: str | None = None,
+    logging_policy: log_policy.LoggingPolicy | None = None,
+    kafka_consumers: typing.Iterable[typing.Callable[[], typing.Awaitable[typing.Any]]]
+    | None = None,
+    kafka_stop_timeout: float | None = None,
+    kafka_producers: typing.Iterable[typing.Any] | None = None,
+    outbox_relays: typing.Iterable[typing.Any] | None = None,
     **kwargs,
 ) -> fastapi.FastAPI:
     global_dependencies = global_dependencies or []
@@ -79,6 +90,25 @@ def create(
     query_dependencies = query_dependencies or []
     healthcheck_routers = healthcheck_routers or []
 
+    if kafka_consumers or kafka_producers:
+        from fastapi_app import kafka
+
+        # Consumer'ы работают фоновыми задачами в event loop'е приложения
+        lifespan_handler = kafka.lifespan(
+            *(kafka_consumers or []),
+            lifespan_handler=lifespan_handler,
+            stop_timeout=kafka_stop_timeout,
+            producers=kafka_producers or [],
+        )
+    if outbox_relays:
+        from fastapi_app import outbox
+
+        # Relay'и запускаются после producer'ов и останавливаются раньше них
+        lifespan_handler = outbox.lifespan(
+            *outbox_relays,
+            lifespan_handler=lifespan_handler,
+        )
+
     # Инициализирует приложение FastAPI
     app = fastapi.FastAPI(
         **kwargs,
@@ -119,6 +149,9 @@ def create(
             backend=idempotency_backed,
             applicable_methods=idempotency_methods or [],
             enforce_uuid4_formatting=idempotency_enforce_uuid4,
+            cache=idempotency_cache,
+            wait_timeout=idempotency_wait_timeout,
+            max_body_bytes=idempotency_max_body_bytes,
         )
     if auth_require:
         app.add_middleware(
@@ -127,7 +160,7 @@ def create(
             key_pattern=auth_key_pattern,
         )
 
-    app.middleware("http")(logging_middleware.LoggingMiddleware())
+    app.add_middleware(logging_middleware.LoggingMiddleware, policy=logging_policy)
     if cors_enable:
         app.add_middleware(
             cors.CORSMiddleware,
@@ -0,0 +1,427 @@
+import abc
+import asyncio
+import collections
+import dataclasses
+import time
+import zlib
+
+import orjson
+from idempotency_header_middleware.backends import base
+from redis import asyncio as redis
+from starlette import responses
+
+__all__ = (
+    "Backend",
+    "MemoryBackend",
+    "MemoryBackendStats",
+    "RedisBackend",
+    "StoredResponse",
+)
+
+# Ответ, если он сохранен, иначе захват блокировки: 0 - захвачена, 1 - уже занята
+GET_OR_LOCK_SCRIPT = """
+local stored = redis.call('HMGET', KEYS[1], 'status_code', 'body', 'headers')
+if stored[1] then
+    return stored
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'PX', ARGV[1]) then
+    return 0
+end
+return 1
+"""
+JSON_HEADERS = ((b"content-type", b"application/json"),)
+
+# Общие пулы соединений по URL, чтобы backend'ы не открывали свои
+_pools: dict[str, redis.ConnectionPool] = {}
+
+
+@dataclasses.dataclass(frozen=True)
+class StoredResponse:
+    """Response stored as is: status, raw body and selected raw headers."""
+
+    status_code: int
+    body: bytes
+    headers: tuple[tuple[bytes, bytes], ...] = ()
+
+    def to_response(self) -> responses.Response:
+        """Response replaying the stored bytes without re-encoding."""
+        response = responses.Response(content=self.body, status_code=self.status_code)
+        # Content-Length вычисляется заново, остальные заголовки отдаем как есть
+        response.raw_headers += [
+            (name, value) for name, value in self.headers if name != b"content-length"
+        ]
+        return response
+
+    def dump_headers(self) -> bytes:
+        return orjson.dumps(
+            [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in self.headers
+            ],
+        )
+
+    @staticmethod
+    def load_headers(data: bytes | None) -> tuple[tuple[bytes, bytes], ...]:
+        if not data:
+            return ()
+        return tuple(
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in orjson.loads(data)
+        )
+
+
+class Backend(base.Backend):
+    """
+    Base backend storing raw responses.
+
+    Implementations store `StoredResponse` and may override `get_or_lock`
+    to check the stored response and lock the key in one call.
+    Methods of `idempotency_header_middleware` backends are implemented on top of them.
+    """
+
+    @abc.abstractmethod
+    async def get_response(self, idempotency_key: str) -> StoredResponse | None:
+        """Return the stored response if it exists, otherwise return None."""
+
+    @abc.abstractmethod
+    async def store_response(
+        self,
+        idempotency_key: str,
+        response: StoredResponse,
+    ) -> None:
+        """Store the response and release the pending key."""
+
+    async def get_or_lock(
+        self,
+        idempotency_key: str,
+    ) -> tuple[StoredResponse | None, bool]:
+        """
+        Return the stored response or lock the key.
+
+        Returns `(response, False)` if the response is stored, `(None, False)` if
+        the lock was taken and `(None, True)` if the key is already pending.
+        """
+        if stored := await self.get_response(idempotency_key):
+            return stored, False
+        return None, await self.store_idempotency_key(idempotency_key)
+
+    async def wait_response(
+        self,
+        idempotency_key: str,
+        timeout: float,
+    ) -> StoredResponse | None:
+        """
+        Wait for a response of a key pending in another worker.
+
+        Returns None if the key was released without a response, on timeout,
+        or if the backend does not support notifications.
+        """
+        return None
+
+    async def get_stored_response(
+        self,
+        idempotency_key: str,
+    ) -> responses.Response | None:
+        stored = await self.get_response(idempotency_key)
+        return stored.to_response() if stored else None
+
+    async def store_response_data(
+        self,
+        idempotency_key: str,
+        payload: dict,
+        status_code: int,
+    ) -> None:
+        await self.store_response(
+            idempotency_key,
+            StoredResponse(status_code, orjson.dumps(payload), JSON_HEADERS),
+        )
+
+
+class RedisBackend(Backend):
+    """
+    Redis backend of idempotency keys.
+
+    A stored response and a pending lock of every key live in two keys with
+    the same hash tag, so the backend also works with Redis Cluster:
+
+    * `get_or_lock` returns a stored response or takes the lock in one script call;
+    * pending locks expire after `lock_expiry` seconds, so a crashed worker
+      does not block the key forever;
+    * a response is stored and the lock is released in one pipelined transaction;
+    * with `notify=True` completion of a key is published to a channel,
+      so `wait_response` wakes up waiting requests of other workers.
+
+    ## Пример использования
+
+    ```python
+    backend = RedisBackend.from_url("redis://localhost:6379/0")
+    ```
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        prefix: str = "idempotency",
+        expiry: int | None = 60 * 60 * 24,
+        lock_expiry: int = 60,
+        notify: bool = False,
+    ):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.expiry = expiry
+        self.lock_expiry = lock_expiry
+        self.notify = notify
+        self._get_or_lock = self.redis.register_script(GET_OR_LOCK_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        """Create a backend on a connection pool shared by all backends with the same url."""
+        if (pool := _pools.get(url)) is None:
+            pool = _pools[url] = redis.ConnectionPool.from_url(url)
+        return cls(redis.Redis(connection_pool=pool), **kwargs)
+
+    def _get_keys(self, idempotency_key: str) -> tuple[str, str]:
+        tag = f"{self.prefix}:{{{idempotency_key}}}"
+        return f"{tag}:response", f"{tag}:lock"
+
+    def _get_channel(self, idempotency_key: str) -> str:
+        return f"{self.prefix}:{{{idempotency_key}}}:done"
+
+    @staticmethod
+    def _load(
+        status_code: bytes,
+        body: bytes | None,
+        headers: bytes | None,
+    ) -> StoredResponse:
+        return StoredResponse(
+            int(status_code),
+            body or b"",
+            StoredResponse.load_headers(headers),
+        )
+
+    async def get_or_lock(
+        self,
+        idempotency_key: str,
+    ) -> tuple[StoredResponse | None, bool]:
+        """Same as `Backend.get_or_lock`, but in one round-trip."""
+        result = await self._get_or_lock(
+            keys=self._get_keys(idempotency_key),
+            args=[self.lock_expiry * 1000],
+        )
+        if isinstance(result, list):
+            return self._load(*result), False
+        return None, bool(result)
+
+    async def get_response(self, idempotency_key: str) -> StoredResponse | None:
+        response_key, _ = self._get_keys(idempotency_key)
+        status_code, body, headers = await self.redis.hmget(
+            response_key,
+            ["status_code", "body", "headers"],
+        )
+        if status_code is None:
+            return None
+        return self._load(status_code, body, headers)
+
+    async def store_response(
+        self,
+        idempotency_key: str,
+        response: StoredResponse,
+    ) -> None:
+        response_key, lock_key = self._get_keys(idempotency_key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                response_key,
+                mapping={
+                    "status_code": response.status_code,
+                    "body": response.body,
+                    "headers": response.dump_headers(),
+                },
+            )
+            if self.expiry:
+                pipe.expire(response_key, self.expiry)
+            pipe.delete(lock_key)
+            if self.notify:
+                pipe.publish(self._get_channel(idempotency_key), b"")
+            await pipe.execute()
+
+    async def store_idempotency_key(self, idempotency_key: str) -> bool:
+        _, lock_key = self._get_keys(idempotency_key)
+        is_locked = await self.redis.set(lock_key, 1, nx=True, ex=self.lock_expiry)
+        return not is_locked
+
+    async def clear_idempotency_key(self, idempotency_key: str) -> None:
+        _, lock_key = self._get_keys(idempotency_key)
+        if not self.notify:
+            await self.redis.delete(lock_key)
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(lock_key)
+            pipe.publish(self._get_channel(idempotency_key), b"")
+            await pipe.execute()
+
+    async def wait_response(
+        self,
+        idempotency_key: str,
+        timeout: float,
+    ) -> StoredResponse | None:
+        if not self.notify:
+            return None
+        async with self.redis.pubsub() as pubsub:
+            await pubsub.subscribe(self._get_channel(idempotency_key))
+            # Ответ мог быть сохранен до подписки
+            if stored := await self.get_response(idempotency_key):
+                return stored
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while (left := deadline - loop.time()) > 0:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=left,
+                )
+                if message is not None:
+                    return await self.get_response(idempotency_key)
+        return None
+
+
+@dataclasses.dataclass
+class MemoryBackendStats:
+    """Counters of `MemoryBackend`."""
+
+    entries: int = 0
+    stored_bytes: int = 0
+    compressed_entries: int = 0
+    # Вытеснены из-за ограничений размера
+    evictions: int = 0
+    # Удалены по истечении expiry
+    expirations: int = 0
+    # Не сохранены, так как больше max_entry_bytes
+    rejected: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class _MemoryEntry:
+    expires_at: float
+    status_code: int
+    body: bytes
+    headers: tuple[tuple[bytes, bytes], ...]
+    compressed: bool
+    size: int
+
+
+class MemoryBackend(Backend):
+    """
+    Bounded in-process backend of idempotency keys.
+
+    * responses expire after `expiry` seconds and pending locks after `lock_expiry` seconds;
+    * least recently used responses are evicted when there are more than `max_entries`
+      of them or they take more than `max_bytes`;
+    * responses larger than `max_entry_bytes` are not stored at all,
+      so a few large responses do not evict many small ones;
+    * bodies of at least `compress_threshold` bytes are stored compressed with zlib.
+
+    Sizes are counted after compression. Counters are available in `stats`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int | None = 1024 * 1024,
+        expiry: int | None = 60 * 60 * 24,
+        lock_expiry: int = 60,
+        compress_threshold: int | None = 1024,
+        compress_level: int = 6,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.expiry = expiry
+        self.lock_expiry = lock_expiry
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.stats = MemoryBackendStats()
+        self._responses: collections.OrderedDict[str, _MemoryEntry] = (
+            collections.OrderedDict()
+        )
+        self._locks: dict[str, float] = {}
+
+    def _pack(self, response: StoredResponse) -> _MemoryEntry:
+        body, compressed = response.body, False
+        if self.compress_threshold is not None and len(body) >= self.compress_threshold:
+            packed = zlib.compress(body, self.compress_level)
+            # Несжимаемые тела храним как есть
+            if len(packed) < len(body):
+                body, compressed = packed, True
+        size = len(body) + sum(
+            len(name) + len(value) for name, value in response.headers
+        )
+        return _MemoryEntry(
+            expires_at=time.monotonic() + self.expiry if self.expiry else float("inf"),
+            status_code=response.status_code,
+            body=body,
+            headers=response.headers,
+            compressed=compressed,
+            size=size,
+        )
+
+    def _remove(self, idempotency_key: str) -> _MemoryEntry:
+        entry = self._responses.pop(idempotency_key)
+        self.stats.entries -= 1
+        self.stats.stored_bytes -= entry.size
+        self.stats.compressed_entries -= entry.compressed
+        return entry
+
+    def _evict(self) -> None:
+        """Remove least recently used responses while over limits or expired."""
+        now = time.monotonic()
+        while self._responses:
+            idempotency_key, entry = next(iter(self._responses.items()))
+            if entry.expires_at <= now:
+                self.stats.expirations += 1
+            elif (
+                len(self._responses) > self.max_entries
+                or self.stats.stored_bytes > self.max_bytes
+            ):
+                self.stats.evictions += 1
+            else:
+                break
+            self._remove(idempotency_key)
+
+    async def get_response(self, idempotency_key: str) -> StoredResponse | None:
+        if (entry := self._responses.get(idempotency_key)) is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(idempotency_key)
+            self.stats.expirations += 1
+            return None
+        self._responses.move_to_end(idempotency_key)
+        body = zlib.decompress(entry.body) if entry.compressed else entry.body
+        return StoredResponse(entry.status_code, body, entry.headers)
+
+    async def store_response(
+        self,
+        idempotency_key: str,
+        response: StoredResponse,
+    ) -> None:
+        self._locks.pop(idempotency_key, None)
+        entry = self._pack(response)
+        if idempotency_key in self._responses:
+            self._remove(idempotency_key)
+        if self.max_entry_bytes is not None and entry.size > self.max_entry_bytes:
+            self.stats.rejected += 1
+            return
+        self._responses[idempotency_key] = entry
+        self.stats.entries += 1
+        self.stats.stored_bytes += entry.size
+        self.stats.compressed_entries += entry.compressed
+        self._evict()
+
+    async def store_idempotency_key(self, idempotency_key: str) -> bool:
+        now = time.monotonic()
+        if self._locks.get(idempotency_key, 0) > now:
+            return True
+        self._locks[idempotency_key] = now + self.lock_expiry
+        return False
+
+    async def clear_idempotency_key(self, idempotency_key: str) -> None:
+        self._locks.pop(idempotency_key, None)
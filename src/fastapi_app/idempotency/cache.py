@@ -0,0 +1,46 @@
+import collections
+import time
+
+from fastapi_app.idempotency import backends
+
+__all__ = ("ResponseCache",)
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of completed responses in front of a backend.
+
+    Holds at most `max_size` responses, each for `ttl` seconds,
+    so replays of recent keys do not go to the backend.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._responses: collections.OrderedDict[
+            str,
+            tuple[float, backends.StoredResponse],
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, idempotency_key: str) -> backends.StoredResponse | None:
+        if (item := self._responses.get(idempotency_key)) is None:
+            return None
+        expires_at, response = item
+        if expires_at <= time.monotonic():
+            del self._responses[idempotency_key]
+            return None
+        self._responses.move_to_end(idempotency_key)
+        return response
+
+    def set(
+        self,
+        idempotency_key: str,
+        response: backends.StoredResponse,
+    ) -> None:
+        self._responses[idempotency_key] = (time.monotonic() + self.ttl, response)
+        self._responses.move_to_end(idempotency_key)
+        while len(self._responses) > self.max_size:
+            self._responses.popitem(last=False)
@@ -1,8 +1,8 @@
 """Исправляет ошибку https://github.com/snok/asgi-idempotency-header/issues/16."""
 
+import asyncio
 import json
 import logging
-from collections import namedtuple
 from dataclasses import dataclass, field
 from json import JSONDecodeError
 from uuid import UUID
@@ -12,8 +12,26 @@ from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from fastapi_app.idempotency import backends
+from fastapi_app.idempotency.cache import ResponseCache
+from fastapi_app.logging import timing
+
 logger = logging.getLogger(__name__)
 
+# Заголовки ответа, которые сохраняются и повторяются вместе с телом
+STORED_HEADERS = (
+    "content-type",
+    "content-encoding",
+    "content-language",
+    "content-disposition",
+    "location",
+    "etag",
+    "last-modified",
+    "cache-control",
+)
+# Ответы больше этого размера не сохраняются, чтобы не держать в памяти потоковые ответы целиком
+MAX_BODY_BYTES = 1024 * 1024
+
 
 def is_valid_uuid(uuid_: str) -> bool:
     """
@@ -27,12 +45,31 @@ def is_valid_uuid(uuid_: str) -> bool:
 
 @dataclass
 class IdempotencyHeaderMiddleware:
+    """
+    Idempotency-Key middleware.
+
+    With `cache` completed responses are replayed from the in-process cache.
+    With `wait_timeout` duplicates of a pending request wait up to `wait_timeout` seconds
+    for its response instead of an immediate 409: requests of the same worker wait
+    on the first one, requests of other workers use `backends.Backend.wait_response`.
+    A response body larger than `max_body_bytes` is streamed to the client without buffering
+    and not stored, the key is cleared so the request can be repeated.
+    """
+
     app: ASGIApp
     backend: Backend
     idempotency_header_key: str = "Idempotency-Key"
     replay_header_key: str = "Idempotent-Replayed"
     enforce_uuid4_formatting: bool = False
     applicable_methods: list[str] = field(default_factory=lambda: ["POST", "PATCH"])
+    stored_headers: tuple[str, ...] = STORED_HEADERS
+    cache: ResponseCache | None = None
+    wait_timeout: float | None = None
+    max_body_bytes: int | None = MAX_BODY_BYTES
+    # Запросы воркера, выполняющиеся сейчас, по ключу идемпотентности
+    _in_flight: dict[str, asyncio.Future] = field(
+        default_factory=dict, init=False, repr=False
+    )
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
@@ -55,58 +92,186 @@ class IdempotencyHeaderMiddleware:
             response = JSONResponse(payload, 422)
             return await response(scope, receive, send)
 
-        if stored_response := await self.backend.get_stored_response(idempotency_key):
-            stored_response.headers[self.replay_header_key] = "true"
-            return await stored_response(scope, receive, send)
+        if self.cache is not None and (cached := self.cache.get(idempotency_key)):
+            return await self._replay(cached, scope, receive, send)
+
+        if self.wait_timeout is None:
+            await self._handle(idempotency_key, scope, receive, send)
+            return
+
+        if (first_request := self._in_flight.get(idempotency_key)) is not None:
+            try:
+                with timing.span("idempotency"):
+                    stored = await asyncio.wait_for(
+                        asyncio.shield(first_request), self.wait_timeout
+                    )
+            except TimeoutError:
+                return await self._pending(idempotency_key, scope, receive, send)
+            if stored:
+                return await self._replay(stored, scope, receive, send)
+            # Первый запрос не сохранил ответ, обрабатываем этот как обычно
+            await self._handle(idempotency_key, scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[idempotency_key] = future
+        stored = None
+        try:
+            stored = await self._handle(idempotency_key, scope, receive, send)
+        finally:
+            del self._in_flight[idempotency_key]
+            future.set_result(stored)
+
+    async def _handle(
+        self,
+        idempotency_key: str,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> backends.StoredResponse | None:
+        """Replay the stored response or run the app, return the response to share with waiting duplicates."""
+        with timing.span("idempotency"):
+            stored, is_pending = await self._get_or_lock(idempotency_key)
+        if (
+            is_pending
+            and self.wait_timeout is not None
+            and isinstance(self.backend, backends.Backend)
+        ):
+            with timing.span("idempotency"):
+                stored = await self.backend.wait_response(
+                    idempotency_key, self.wait_timeout
+                )
+
+        if stored:
+            if self.cache is not None:
+                self.cache.set(idempotency_key, stored)
+            await self._replay(stored, scope, receive, send)
+            return stored
 
         # Check if request is already pending
-        if await self.backend.store_idempotency_key(idempotency_key):
-            payload = {
-                "detail": f"Request already pending for idempotency key '{idempotency_key}'",
-            }
-            response = JSONResponse(payload, 409)
-            return await response(scope, receive, send)
+        if is_pending:
+            await self._pending(idempotency_key, scope, receive, send)
+            return None
 
-        # Spin up a request-specific class instance, so we can read and write to it in the `send_wrapper` below
-        response_state = namedtuple(
-            "response_state",
-            ["status_code", "response_headers"],
-        )
+        # Тело ответа может прийти несколькими сообщениями с more_body, собираем его целиком
+        response_start: Message = {}
+        body_chunks: list[bytes] = []
+        body_size = 0
+        too_large = False
 
         async def send_wrapper(message: Message) -> None:
+            nonlocal stored, body_size, too_large
             if message["type"] == "http.response.start":
-                response_state.status_code = message["status"]
-                response_state.response_headers = Headers(scope=message)
-
-            elif message["type"] == "http.response.body":
-                is_content_type_set = "content-type" in response_state.response_headers
-                is_application_json = (
-                    response_state.response_headers["content-type"]
-                    != "application/json"
-                )
-                if is_content_type_set and is_application_json:
-                    await self.backend.clear_idempotency_key(idempotency_key)
-                    await send(message)
-                    return
-
-                try:
-                    json_payload = json.loads(message["body"])
-                except JSONDecodeError as e:
-                    logger.info("Failed to save JSON response: %s", e)
-                    await self.backend.clear_idempotency_key(idempotency_key)
-                    await send(message)
-                    return
-
-                await self.backend.store_response_data(
-                    idempotency_key=idempotency_key,
-                    payload=json_payload,
-                    status_code=response_state.status_code,
-                )
+                response_start.update(message)
+
+            elif message["type"] == "http.response.body" and not too_large:
+                body = message.get("body", b"")
+                body_size += len(body)
+                if self.max_body_bytes is not None and body_size > self.max_body_bytes:
+                    # Дальше тело передается клиенту без буферизации и не сохраняется
+                    too_large = True
+                    body_chunks.clear()
+                    with timing.span("idempotency"):
+                        await self.backend.clear_idempotency_key(idempotency_key)
+                else:
+                    body_chunks.append(body)
+                    if not message.get("more_body", False):
+                        with timing.span("idempotency"):
+                            stored = await self._store(
+                                idempotency_key, response_start, b"".join(body_chunks)
+                            )
 
             await send(message)
 
         try:
             await self.app(scope, receive, send_wrapper)
         except Exception:
-            await self.backend.clear_idempotency_key(idempotency_key)
+            with timing.span("idempotency"):
+                await self.backend.clear_idempotency_key(idempotency_key)
             raise
+        if stored and self.cache is not None:
+            self.cache.set(idempotency_key, stored)
+        return stored
+
+    async def _replay(
+        self,
+        stored: backends.StoredResponse,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        response = stored.to_response()
+        response.headers[self.replay_header_key] = "true"
+        await response(scope, receive, send)
+
+    async def _pending(
+        self, idempotency_key: str, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        payload = {
+            "detail": f"Request already pending for idempotency key '{idempotency_key}'",
+        }
+        response = JSONResponse(payload, 409)
+        await response(scope, receive, send)
+
+    async def _get_or_lock(
+        self, idempotency_key: str
+    ) -> tuple[backends.StoredResponse | None, bool]:
+        """
+        Return a stored response or lock the key.
+
+        Uses a single backend call for `backends.Backend` (see `RedisBackend.get_or_lock`).
+        """
+        if isinstance(self.backend, backends.Backend):
+            return await self.backend.get_or_lock(idempotency_key)
+        if stored_response := await self.backend.get_stored_response(idempotency_key):
+            stored = backends.StoredResponse(
+                stored_response.status_code,
+                bytes(stored_response.body),
+                tuple(stored_response.raw_headers),
+            )
+            return stored, False
+        return None, await self.backend.store_idempotency_key(idempotency_key)
+
+    async def _store(
+        self,
+        idempotency_key: str,
+        response_start: Message,
+        body: bytes,
+    ) -> backends.StoredResponse | None:
+        """
+        Store the complete response, return None if it was not stored.
+
+        `backends.Backend` stores raw bytes of any response, other backends only support JSON.
+        """
+        stored_headers = {
+            name.lower().encode("latin-1") for name in self.stored_headers
+        }
+        headers = tuple(
+            (name, value)
+            for name, value in response_start.get("headers", [])
+            if name.lower() in stored_headers
+        )
+        response = backends.StoredResponse(response_start["status"], body, headers)
+        if isinstance(self.backend, backends.Backend):
+            await self.backend.store_response(idempotency_key, response)
+            return response
+
+        response_headers = Headers(raw=response_start.get("headers", []))
+        if (
+            response_headers.get("content-type", "application/json")
+            != "application/json"
+        ):
+            await self.backend.clear_idempotency_key(idempotency_key)
+            return None
+        try:
+            json_payload = json.loads(body)
+        except JSONDecodeError as e:
+            logger.info("Failed to save JSON response: %s", e)
+            await self.backend.clear_idempotency_key(idempotency_key)
+            return None
+        await self.backend.store_response_data(
+            idempotency_key=idempotency_key,
+            payload=json_payload,
+            status_code=response_start["status"],
+        )
+        return response
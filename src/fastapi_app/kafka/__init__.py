@@ -1,10 +1,58 @@
-from fastapi_app.kafka.bootstrap import create
-from fastapi_app.kafka.consumer import KafkaConsumer, OnMessage
-from fastapi_app.kafka.dependencies import kafka_consumer_factory
+from fastapi_app.kafka.bootstrap import create, create_producer
+from fastapi_app.kafka.consumer import (
+    ConsumerStats,
+    KafkaConsumer,
+    OnBatch,
+    OnDeadLetter,
+    OnMessage,
+)
+from fastapi_app.kafka.dead_letter import DeadLetterPublisher
+from fastapi_app.kafka.decoders import (
+    DecodedRecord,
+    DecodeFailure,
+    Decoder,
+    OrjsonDecoder,
+    PydanticDecoder,
+)
+from fastapi_app.kafka.dependencies import (
+    kafka_consumer_factory,
+    kafka_producer_factory,
+)
+from fastapi_app.kafka.fetch import AdaptiveFetch
+from fastapi_app.kafka.lifespan import ConsumerStarter, lifespan
+from fastapi_app.kafka.metrics import ConsumerHealth, ConsumerMetrics
+from fastapi_app.kafka.monitoring import render_prometheus
+from fastapi_app.kafka.monitoring import router as monitoring_router
+from fastapi_app.kafka.offsets import OffsetTracker
+from fastapi_app.kafka.producer import KafkaProducer, ProducerRecord
+from fastapi_app.kafka.runner import ConsumerRunner, WorkerStats
 
 __all__ = (
     "create",
+    "create_producer",
+    "AdaptiveFetch",
+    "ConsumerRunner",
+    "ConsumerHealth",
+    "ConsumerMetrics",
+    "ConsumerStarter",
+    "ConsumerStats",
+    "DeadLetterPublisher",
+    "DecodedRecord",
+    "DecodeFailure",
+    "Decoder",
     "KafkaConsumer",
+    "KafkaProducer",
+    "OnBatch",
+    "OnDeadLetter",
     "OnMessage",
+    "OrjsonDecoder",
     "kafka_consumer_factory",
+    "kafka_producer_factory",
+    "lifespan",
+    "monitoring_router",
+    "OffsetTracker",
+    "ProducerRecord",
+    "PydanticDecoder",
+    "render_prometheus",
+    "WorkerStats",
 )
@@ -1,11 +1,12 @@
 import asyncio
+import functools
 import logging
 import ssl
 import typing
 
 from sqlalchemy.ext.asyncio import AsyncEngine
 
-from fastapi_app.kafka import consumer, dependencies
+from fastapi_app.kafka import consumer, dependencies, producer
 from fastapi_app.telemetry import sentry
 
 logger = logging.getLogger(__name__)
@@ -29,9 +30,21 @@ def create(
     sentry_enable: bool = False,
     sentry_dsn: str | None = None,
     ssl_context: ssl.SSLContext | None = None,
+    loop: asyncio.AbstractEventLoop | None = None,
+    **kwargs,
 ) -> consumer.KafkaConsumer:
-    loop = asyncio.get_event_loop()
-    asyncio.set_event_loop(loop)
+    """
+    Create a `KafkaConsumer`.
+
+    Called inside a running event loop (e.g. in a FastAPI lifespan) the consumer uses that loop
+    and is run with `start`/`run`. Otherwise it gets `loop` or a new event loop for `consume`.
+    """
+    if loop is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
     if telemetry_enable:
         from opentelemetry.instrumentation import aiokafka as ot_aiokafka
         from opentelemetry.instrumentation import httpx as ot_httpx
@@ -63,6 +76,8 @@ def create(
         )
         sentry.configure_sentry(sentry_dsn)
 
+    # Метрики consumer'а помечаются его группой
+    kwargs.setdefault("name", group_id)
     return consumer.KafkaConsumer(
         dependencies.kafka_consumer_factory(
             topics=topics,
@@ -77,4 +92,37 @@ def create(
             ssl_context=ssl_context,
         ),
         loop=loop,
+        **kwargs,
+    )
+
+
+def create_producer(
+    dsn: str,
+    security_protocol: str,
+    sasl_mechanism: str,
+    user: str,
+    password: str,
+    linger_ms: int = 5,
+    max_batch_size: int = 64 * 1024,
+    compression_type: str | None = None,
+    acks: int | str = "all",
+    enable_idempotence: bool = False,
+    ssl_context: ssl.SSLContext | None = None,
+) -> producer.KafkaProducer:
+    """Create a `KafkaProducer`, the connection is opened by `KafkaProducer.start`."""
+    return producer.KafkaProducer(
+        functools.partial(
+            dependencies.kafka_producer_factory,
+            security_protocol=security_protocol,
+            sasl_mechanism=sasl_mechanism,
+            sasl_plain_username=user,
+            sasl_plain_password=password,
+            bootstrap_servers=dsn,
+            linger_ms=linger_ms,
+            max_batch_size=max_batch_size,
+            compression_type=compression_type,
+            acks=acks,
+            enable_idempotence=enable_idempotence,
+            ssl_context=ssl_context,
+        ),
     )
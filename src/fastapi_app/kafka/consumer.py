@@ -1,63 +1,899 @@
 import asyncio
+import collections
+import concurrent.futures
+import dataclasses
+import functools
+import itertools
 import logging
+import time
 import typing
+import weakref
 
 import aiokafka
 
-__all__ = ("KafkaConsumer", "OnMessage")
+from fastapi_app.kafka import decoders, fetch, metrics
+from fastapi_app.kafka.offsets import OffsetTracker
+
+__all__ = (
+    "ConsumerStats",
+    "KafkaConsumer",
+    "OnBatch",
+    "OnDeadLetter",
+    "OnMessage",
+    "collect_stats",
+    "request_stop_all",
+)
 
 
 logger = logging.getLogger(__name__)
 
-OnMessage: typing.TypeAlias = typing.Callable[[aiokafka.ConsumerRecord], typing.Awaitable[None]]
+OnMessage: typing.TypeAlias = typing.Callable[
+    [aiokafka.ConsumerRecord], typing.Awaitable[None]
+]
+OnBatch: typing.TypeAlias = typing.Callable[
+    [list[aiokafka.ConsumerRecord]], typing.Awaitable[None]
+]
+OnDeadLetter: typing.TypeAlias = typing.Callable[
+    [aiokafka.ConsumerRecord, Exception], typing.Awaitable[None]
+]
+Batch: typing.TypeAlias = dict[aiokafka.TopicPartition, list[aiokafka.ConsumerRecord]]
+
+# Сколько ждать завершения обработки партиций, если новых сообщений нет
+IDLE_WAIT_SECONDS = 0.01
+# Чтение возобновляется, когда в обработке остается меньше этой доли лимита
+RESUME_RATIO = 0.5
+
+
+@dataclasses.dataclass
+class ConsumerStats:
+    """Counters of a `KafkaConsumer`."""
+
+    messages: int = 0
+    batches: int = 0
+    commits: int = 0
+    # Неудачные вызовы обработчика, повторные вызовы и сообщения, отправленные в dead letter
+    failures: int = 0
+    retries: int = 0
+    dead_letters: int = 0
+
+
+# Все consumer'ы процесса, чтобы остановить их по сигналу
+_consumers: "weakref.WeakSet[KafkaConsumer]" = weakref.WeakSet()
+# Порядковые номера consumer'ов, различают consumer'ы с одинаковым `name` в метриках
+_consumer_ids = itertools.count()
+
+
+def request_stop_all() -> None:
+    """Request a graceful stop of all consumers of the process, safe to call from a signal handler."""
+    for consumer in list(_consumers):
+        consumer.request_stop()
+
+
+def collect_stats() -> ConsumerStats:
+    """Sum of the counters of all consumers of the process."""
+    total = ConsumerStats()
+    for consumer in list(_consumers):
+        for field in dataclasses.fields(ConsumerStats):
+            setattr(
+                total,
+                field.name,
+                getattr(total, field.name) + getattr(consumer.stats, field.name),
+            )
+    return total
+
+
+class _RevocationListener(aiokafka.ConsumerRebalanceListener):
+    """Commits processed offsets before partitions are revoked."""
+
+    def __init__(self, consumer: "KafkaConsumer"):
+        self._consumer = consumer
+
+    async def on_partitions_revoked(
+        self, revoked: typing.Collection[aiokafka.TopicPartition]
+    ) -> None:
+        await self._consumer._on_partitions_revoked(revoked)
+
+    async def on_partitions_assigned(
+        self, assigned: typing.Collection[aiokafka.TopicPartition]
+    ) -> None:
+        logger.debug(f"Partitions assigned: {sorted(assigned)}")
+        await self._consumer._on_partitions_assigned(assigned)
 
 
 class KafkaConsumer:
+    """
+    Kafka consumer with at-least-once semantics.
+
+    By default batches are processed one by one across all partitions.
+    With `concurrency` every batch is processed by its own task, at most
+    `concurrency` batches at a time. Partitions of a batch are paused while it is processed,
+    so the order within a partition is preserved.
+
+    Offsets of processed batches are committed for all partitions with a single commit:
+    after every poll by default, or once `commit_every` messages are processed
+    or `commit_interval_ms` has passed since the last commit. Processed offsets are
+    also committed before partitions are revoked and when the consumer stops.
+
+    With `concurrency` the number of messages and bytes in flight can be limited
+    with `max_in_flight_messages` and `max_in_flight_bytes`. When a limit is exceeded,
+    all assigned partitions are paused and resumed once in-flight work drains to half of the limit.
+    Polling continues while partitions are paused, so the consumer stays in the group.
+
+    With `key_ordering` messages of one partition are processed in parallel, strictly in order
+    per message key (messages without a key are one group). Partitions are not paused per batch,
+    the committed offset is the highest contiguous processed one, see `OffsetTracker`.
+    `key_ordering` requires `concurrency`, without it `ValueError` is raised.
+    Use it together with `max_in_flight_messages` to bound the key queues.
+
+    A failed handler call is retried up to `retries` times with an exponential backoff
+    from `retry_backoff_ms` to `max_retry_backoff_ms`. When retries are exhausted the messages
+    are passed to `dead_letter` (e.g. `DeadLetterPublisher`) and committed as processed,
+    without `dead_letter` the error stops the consumer.
+
+    With `decoder` (see `kafka.decoders`) handlers receive records with decoded values,
+    the values of all fetched messages are decoded with one call. Batches of at least
+    `decode_executor_min_batch` messages are decoded in `decode_executor`, so the event loop
+    is not blocked and with `concurrency` decoding of the next batch overlaps handling of the current ones.
+    A message that cannot be decoded is handled as a failed one, without retries.
+
+    `metrics` collects batch size, handler and commit latency histograms and the processing rate,
+    `lag` returns the lag of assigned partitions and `health` reports a stuck consumer,
+    see `kafka.monitoring`. Metrics are labeled with `name`.
+
+    With `adaptive_fetch` `consume` ignores `timeout_ms` and `max_records` and tunes them
+    from the processing time and the backlog, see `AdaptiveFetch`.
+    """
+
     def __init__(
         self,
         kafka_consumer: aiokafka.AIOKafkaConsumer,
-        loop: asyncio.AbstractEventLoop,
+        loop: asyncio.AbstractEventLoop | None = None,
+        concurrency: int | None = None,
+        commit_every: int | None = None,
+        commit_interval_ms: float | None = None,
+        max_in_flight_messages: int | None = None,
+        max_in_flight_bytes: int | None = None,
+        key_ordering: bool = False,
+        retries: int = 0,
+        retry_backoff_ms: float = 100,
+        max_retry_backoff_ms: float = 10_000,
+        dead_letter: OnDeadLetter | None = None,
+        decoder: decoders.Decoder | None = None,
+        decode_executor: concurrent.futures.Executor | None = None,
+        decode_executor_min_batch: int = 100,
+        name: str = "default",
+        adaptive_fetch: fetch.AdaptiveFetch | None = None,
     ):
+        if key_ordering and concurrency is None:
+            # Без ограничения параллельности сообщения с разными ключами обрабатывались бы по одному
+            raise ValueError("key_ordering requires concurrency")
         self._kafka_consumer = kafka_consumer
         self._loop = loop
+        self._concurrency = concurrency
+        self._commit_every = commit_every
+        self._commit_interval_ms = commit_interval_ms
+        self._tasks: set[asyncio.Task] = set()
+        self._stop_requested = False
+        # Фоновая задача `start` и признак запуска aiokafka consumer'а
+        self._task: asyncio.Task | None = None
+        self._started = asyncio.Event()
+        self._start_requested = False
+        self.name = name
+        self.id = next(_consumer_ids)
+        self._adaptive_fetch = adaptive_fetch
+        self.stats = ConsumerStats()
+        self.metrics = metrics.ConsumerMetrics()
+        # Закоммиченные offset'ы группы, по ним считается lag
+        self._committed_offsets: dict[aiokafka.TopicPartition, int] = {}
+        _consumers.add(self)
+        # Offset'ы обработанных, но еще не закоммиченных сообщений
+        self._pending_offsets: dict[aiokafka.TopicPartition, int] = {}
+        self._pending_messages = 0
+        self._last_commit = 0.0
+        self._max_in_flight_messages = max_in_flight_messages
+        self._max_in_flight_bytes = max_in_flight_bytes
+        self._in_flight_messages = 0
+        self._in_flight_bytes = 0
+        # Партиции пачек в обработке и партиции, остановленные из-за превышения лимитов
+        self._in_flight_partitions: set[aiokafka.TopicPartition] = set()
+        self._backpressure_partitions: set[aiokafka.TopicPartition] = set()
+        # Партиции пачек, обработка которых завершилась ошибкой, остаются на паузе
+        self._failed_partitions: set[aiokafka.TopicPartition] = set()
+        self._key_ordering = key_ordering
+        # Очереди сообщений по ключу и трекеры offset'ов партиций для `key_ordering`
+        self._key_queues: dict[
+            tuple[aiokafka.TopicPartition, typing.Any],
+            collections.deque[aiokafka.ConsumerRecord],
+        ] = {}
+        self._trackers: dict[aiokafka.TopicPartition, OffsetTracker] = {}
+        self._retries = retries
+        self._retry_backoff_ms = retry_backoff_ms
+        self._max_retry_backoff_ms = max_retry_backoff_ms
+        self._dead_letter = dead_letter
+        self._decoder = decoder
+        self._decode_executor = decode_executor
+        self._decode_executor_min_batch = decode_executor_min_batch
+
+    async def _retry(self, handle: typing.Callable[[], typing.Awaitable[None]]) -> None:
+        """Call `handle`, retrying failures with an exponential backoff."""
+        for attempt in itertools.count():
+            start = time.perf_counter()
+            try:
+                await handle()
+            except Exception as e:
+                self.metrics.handler_latency.observe(time.perf_counter() - start)
+                self.stats.failures += 1
+                if attempt >= self._retries:
+                    raise
+                backoff_ms = min(
+                    self._retry_backoff_ms * 2**attempt, self._max_retry_backoff_ms
+                )
+                logger.warning(
+                    f"Handler failed, retry {attempt + 1} of {self._retries} in {backoff_ms:.0f}ms: {e}"
+                )
+                self.stats.retries += 1
+                await asyncio.sleep(backoff_ms / 1000)
+            else:
+                self.metrics.handler_latency.observe(time.perf_counter() - start)
+                return
+
+    async def _send_to_dead_letter(
+        self, messages: list[aiokafka.ConsumerRecord], error: Exception
+    ) -> None:
+        # Ошибка публикации останавливает consumer, offset'ы сообщений не коммитятся
+        for message in messages:
+            await self._dead_letter(message, error)
+        self.stats.dead_letters += len(messages)
+
+    async def _fail(
+        self, messages: list[aiokafka.ConsumerRecord], error: Exception
+    ) -> None:
+        """Send failed messages to the dead letter or stop the consumer."""
+        if self._dead_letter is None:
+            raise error
+        # В dead letter публикуется исходное значение, а не результат декодера
+        await self._send_to_dead_letter(
+            [
+                dataclasses.replace(message, value=message.raw_value)
+                if isinstance(message, decoders.DecodedRecord)
+                else message
+                for message in messages
+            ],
+            error,
+        )
+
+    async def _fail_decoding(self, messages: list[aiokafka.ConsumerRecord]) -> None:
+        for message in messages:
+            failure: decoders.DecodeFailure = message.value
+            self.stats.failures += 1
+            logger.error(
+                f"Failed to decode message: {failure.raw}\ntopic: {message.topic}\n"
+                f"partition: {message.partition}\nCause: {failure.error}",
+            )
+            await self._fail([message], failure.error)
 
-    async def _consume(
+    def _message_handler(self, on_message: OnMessage) -> OnBatch:
+        async def handle(messages: list[aiokafka.ConsumerRecord]) -> None:
+            for message in messages:
+                if isinstance(message.value, decoders.DecodeFailure):
+                    await self._fail_decoding([message])
+                    continue
+                try:
+                    await self._retry(functools.partial(on_message, message))
+                except Exception as e:
+                    logger.error(
+                        f"Failed to process message: {message.value}\ntopic: {message.topic}\n"
+                        f"partition: {message.partition}\nCause: {e}",
+                    )
+                    await self._fail([message], e)
+
+        return handle
+
+    def _batch_handler(self, on_batch: OnBatch) -> OnBatch:
+        async def handle(messages: list[aiokafka.ConsumerRecord]) -> None:
+            if failed := [
+                message
+                for message in messages
+                if isinstance(message.value, decoders.DecodeFailure)
+            ]:
+                await self._fail_decoding(failed)
+                messages = [
+                    message
+                    for message in messages
+                    if not isinstance(message.value, decoders.DecodeFailure)
+                ]
+                if not messages:
+                    return
+            try:
+                await self._retry(functools.partial(on_batch, messages))
+            except Exception as e:
+                partitions = sorted(
+                    {(message.topic, message.partition) for message in messages}
+                )
+                logger.error(
+                    f"Failed to process batch of {len(messages)} messages\npartitions: {partitions}\nCause: {e}",
+                )
+                await self._fail(messages, e)
+
+        return handle
+
+    def _decode_values(self, values: list[bytes | None]) -> list[typing.Any]:
+        """Decode values with one decoder call, fall back to one call per value if the batch fails."""
+        try:
+            return self._decoder(values)
+        except Exception:
+            decoded = []
+            for value in values:
+                try:
+                    decoded.extend(self._decoder([value]))
+                except Exception as e:
+                    decoded.append(decoders.DecodeFailure(value, e))
+            return decoded
+
+    async def _decode(self, result: Batch) -> Batch:
+        messages = list(itertools.chain(*result.values()))
+        if self._decoder is None or not messages:
+            return result
+        values = [message.value for message in messages]
+        if (
+            self._decode_executor is not None
+            and len(values) >= self._decode_executor_min_batch
+        ):
+            try:
+                decoded = await asyncio.get_running_loop().run_in_executor(
+                    self._decode_executor, self._decoder, values
+                )
+            except Exception:
+                # Ошибочные значения ищутся в event loop'е, это редкий случай
+                decoded = self._decode_values(values)
+        else:
+            decoded = self._decode_values(values)
+        decoded_messages = iter(decoded)
+        return {
+            tp: [
+                decoders.DecodedRecord(
+                    **{
+                        **vars(message),
+                        "value": next(decoded_messages),
+                        "raw_value": message.value,
+                    }
+                )
+                for message in tp_messages
+            ]
+            for tp, tp_messages in result.items()
+        }
+
+    async def _process_batch(self, batch: Batch, on_batch: OnBatch) -> None:
+        messages = (
+            next(iter(batch.values()))
+            if len(batch) == 1
+            else list(itertools.chain(*batch.values()))
+        )
+        start = time.perf_counter()
+        await on_batch(messages)
+        if self._adaptive_fetch is not None:
+            self._adaptive_fetch.on_processed(
+                len(messages), time.perf_counter() - start
+            )
+        for tp, tp_messages in batch.items():
+            self._pending_offsets[tp] = tp_messages[-1].offset + 1
+        self._pending_messages += len(messages)
+        self.stats.messages += len(messages)
+        self.stats.batches += 1
+        self.metrics.observe_batch(len(messages))
+
+    async def _process_batch_task(
         self,
-        on_message: OnMessage,
-        timeout_ms: float = 0,
-        max_records: int | None = None,
-    ):
+        semaphore: asyncio.Semaphore,
+        batch: Batch,
+        on_batch: OnBatch,
+        messages: int,
+        size: int,
+    ) -> None:
+        try:
+            async with semaphore:
+                await self._process_batch(batch, on_batch)
+        except BaseException:
+            # Ошибка пробрасывается на следующей итерации цикла чтения, до этого
+            # следующие сообщения партиции не должны обработаться и закоммитить offset за ошибочным
+            self._failed_partitions.update(batch)
+            raise
+        finally:
+            self._in_flight_messages -= messages
+            self._in_flight_bytes -= size
+            self._in_flight_partitions.difference_update(batch)
+            self._resume(tp for tp in batch if tp not in self._backpressure_partitions)
+            self._apply_backpressure()
+
+    def _dispatch(
+        self, semaphore: asyncio.Semaphore, batch: Batch, on_batch: OnBatch
+    ) -> None:
+        """Process the batch in a separate task."""
+        # Пока пачка обрабатывается, новые сообщения ее партиций не читаются
+        self._kafka_consumer.pause(*batch)
+        messages, size = self._measure(batch)
+        self._in_flight_messages += messages
+        self._in_flight_bytes += size
+        self._in_flight_partitions.update(batch)
+        self._tasks.add(
+            asyncio.create_task(
+                self._process_batch_task(semaphore, batch, on_batch, messages, size)
+            )
+        )
+
+    def _dispatch_by_key(
+        self,
+        semaphore: asyncio.Semaphore,
+        tp: aiokafka.TopicPartition,
+        messages: list[aiokafka.ConsumerRecord],
+        on_batch: OnBatch,
+    ) -> None:
+        """Put messages into per-key queues, every queue is processed by its own task."""
+        tracker = self._trackers.setdefault(tp, OffsetTracker())
+        for message in messages:
+            tracker.add(message.offset)
+            self._in_flight_messages += 1
+            self._in_flight_bytes += self._message_size(message)
+            queue_key = (tp, message.key)
+            if (queue := self._key_queues.get(queue_key)) is not None:
+                queue.append(message)
+                continue
+            self._key_queues[queue_key] = collections.deque([message])
+            self._tasks.add(
+                asyncio.create_task(
+                    self._process_key_queue(semaphore, queue_key, on_batch)
+                )
+            )
+
+    async def _process_key_queue(
+        self,
+        semaphore: asyncio.Semaphore,
+        queue_key: tuple[aiokafka.TopicPartition, typing.Any],
+        on_batch: OnBatch,
+    ) -> None:
+        tp = queue_key[0]
+        queue = self._key_queues[queue_key]
+        try:
+            while queue:
+                message = queue[0]
+                async with semaphore:
+                    start = time.perf_counter()
+                    await on_batch([message])
+                    if self._adaptive_fetch is not None:
+                        self._adaptive_fetch.on_processed(
+                            1, time.perf_counter() - start
+                        )
+                queue.popleft()
+                self._in_flight_messages -= 1
+                self._in_flight_bytes -= self._message_size(message)
+                if (offset := self._trackers[tp].done(message.offset)) is not None:
+                    self._pending_offsets[tp] = offset
+                self._pending_messages += 1
+                self.stats.messages += 1
+                self.stats.batches += 1
+                self.metrics.observe_batch(1)
+        finally:
+            # Необработанные сообщения остаются незакоммиченными и будут прочитаны повторно
+            del self._key_queues[queue_key]
+            self._apply_backpressure()
+
+    @staticmethod
+    def _message_size(message: aiokafka.ConsumerRecord) -> int:
+        return max(message.serialized_value_size, 0) + max(
+            message.serialized_key_size, 0
+        )
+
+    def _measure(self, batch: Batch) -> tuple[int, int]:
+        messages = size = 0
+        for tp_messages in batch.values():
+            messages += len(tp_messages)
+            size += sum(map(self._message_size, tp_messages))
+        return messages, size
+
+    def _resume(self, partitions: typing.Iterable[aiokafka.TopicPartition]) -> None:
+        # После ребалансировки партиции могут быть уже не назначены этому consumer'у
+        assignment = self._kafka_consumer.assignment()
+        self._kafka_consumer.resume(
+            *(
+                tp
+                for tp in partitions
+                if tp in assignment and tp not in self._failed_partitions
+            )
+        )
+
+    def _is_over_limit(self, ratio: float = 1.0) -> bool:
+        return (
+            self._max_in_flight_messages is not None
+            and self._in_flight_messages > self._max_in_flight_messages * ratio
+        ) or (
+            self._max_in_flight_bytes is not None
+            and self._in_flight_bytes > self._max_in_flight_bytes * ratio
+        )
+
+    def _apply_backpressure(self) -> None:
+        """Pause all partitions while in-flight limits are exceeded."""
+        if not self._backpressure_partitions:
+            if self._is_over_limit():
+                self._backpressure_partitions = self._kafka_consumer.assignment()
+                logger.debug(
+                    f"In-flight limit exceeded, pause {len(self._backpressure_partitions)} partitions"
+                )
+                self._kafka_consumer.pause(*self._backpressure_partitions)
+        elif not self._is_over_limit(RESUME_RATIO):
+            partitions, self._backpressure_partitions = (
+                self._backpressure_partitions,
+                set(),
+            )
+            logger.debug(f"In-flight work drained, resume {len(partitions)} partitions")
+            self._resume(
+                tp for tp in partitions if tp not in self._in_flight_partitions
+            )
+
+    def _is_commit_due(self) -> bool:
+        if not self._pending_offsets:
+            return False
+        if self._commit_every is None and self._commit_interval_ms is None:
+            return True
+        if (
+            self._commit_every is not None
+            and self._pending_messages >= self._commit_every
+        ):
+            return True
+        return (
+            self._commit_interval_ms is not None
+            and (time.monotonic() - self._last_commit) * 1000
+            >= self._commit_interval_ms
+        )
+
+    async def _commit(self) -> None:
+        """Commit offsets of all processed messages with a single request."""
+        if not self._pending_offsets:
+            return
+        offsets, self._pending_offsets = self._pending_offsets, {}
+        self._pending_messages = 0
+        self._last_commit = time.monotonic()
+        logger.debug(f"Commit offsets {offsets}")
+        start = time.perf_counter()
+        try:
+            await self._kafka_consumer.commit(offsets)
+            self.stats.commits += 1
+            self._committed_offsets.update(offsets)
+        except Exception:
+            # Offset'ы, которые не удалось закоммитить, закоммитятся следующим коммитом
+            for tp, offset in offsets.items():
+                self._pending_offsets.setdefault(tp, offset)
+            raise
+        finally:
+            self.metrics.commit_latency.observe(time.perf_counter() - start)
+
+    async def _on_partitions_revoked(
+        self, revoked: typing.Collection[aiokafka.TopicPartition]
+    ) -> None:
+        """Wait for in-flight batches and commit processed offsets before a rebalance."""
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        try:
+            await self._commit()
+        except Exception as e:
+            logger.error(f"Failed to commit offsets of revoked partitions: {e}")
+        for tp in revoked:
+            self._pending_offsets.pop(tp, None)
+            self._trackers.pop(tp, None)
+            self._committed_offsets.pop(tp, None)
+
+    async def _on_partitions_assigned(
+        self, assigned: typing.Collection[aiokafka.TopicPartition]
+    ) -> None:
+        """Load committed offsets of assigned partitions for `lag`."""
+        for tp in assigned:
+            try:
+                committed = await self._kafka_consumer.committed(tp)
+            except Exception as e:
+                logger.warning(f"Failed to get the committed offset of {tp}: {e}")
+                continue
+            if committed is not None:
+                self._committed_offsets[tp] = committed
+
+    def _subscribe(self) -> None:
+        """Resubscribe to the same topics with the revocation listener."""
+        if topics := self._kafka_consumer.subscription():
+            self._kafka_consumer.subscribe(
+                topics=list(topics), listener=_RevocationListener(self)
+            )
+
+    def _check_tasks(self) -> None:
+        """Re-raise the error of a failed batch task."""
+        for task in [task for task in self._tasks if task.done()]:
+            self._tasks.discard(task)
+            task.result()
+
+    async def _fetch_adaptive(self) -> Batch:
+        """Fetch with the limit and the timeout of `AdaptiveFetch`."""
+        result = await self._kafka_consumer.getmany(
+            timeout_ms=self._adaptive_fetch.timeout_ms,
+            max_records=self._adaptive_fetch.records,
+        )
+        self._adaptive_fetch.on_fetch(
+            sum(map(len, result.values())), sum(self.lag().values())
+        )
+        return result
+
+    async def _fetch_batch(self, max_batch_size: int, max_wait_ms: float) -> Batch:
+        """Collect up to `max_batch_size` messages within `max_wait_ms`."""
+        batch: Batch = {}
+        size = 0
+        deadline = time.monotonic() + max_wait_ms / 1000
+        while (
+            size < max_batch_size
+            and (left_ms := (deadline - time.monotonic()) * 1000) > 0
+        ):
+            result = await self._kafka_consumer.getmany(
+                timeout_ms=left_ms, max_records=max_batch_size - size
+            )
+            for tp, messages in result.items():
+                batch.setdefault(tp, []).extend(messages)
+                size += len(messages)
+        return batch
+
+    async def _run(
+        self,
+        fetch: typing.Callable[[], typing.Awaitable[Batch]],
+        on_batch: OnBatch,
+        merged: bool = False,
+    ) -> None:
+        semaphore = asyncio.Semaphore(self._concurrency or 1)
+        self._start_requested = True
+        self._subscribe()
+        self._last_commit = time.monotonic()
         try:
             await self._kafka_consumer.start()
+            self._started.set()
             logger.debug("AioKafka consumer has been started")
-            while True:
-                result = await self._kafka_consumer.getmany(
-                    timeout_ms=timeout_ms,
-                    max_records=max_records,
-                )
+            self.metrics.last_progress = time.monotonic()
+            while not self._stop_requested:
+                self.metrics.last_poll = time.monotonic()
+                self._check_tasks()
+                result = await fetch()
                 for tp, messages in result.items():
                     logger.debug(f"Got {len(messages)} messages from {tp.topic} topic")
                     if messages:
-                        offset = messages[-1].offset + 1
-                        for message in messages:
-                            try:
-                                await on_message(message)
-                            except Exception as e:
-                                logger.error(
-                                    f"Failed to process message: {message.value}\ntopic: {message.topic}\n"
-                                    f"partition: {message.partition}\nCause: {e}",
-                                )
-                                raise
-                        logger.debug(f"Commit offset {offset}")
-                        await self._kafka_consumer.commit({tp: offset})
+                        # Без закоммиченного offset'а группы lag считается от первого прочитанного сообщения
+                        self._committed_offsets.setdefault(tp, messages[0].offset)
+                result = await self._decode(
+                    {tp: messages for tp, messages in result.items() if messages}
+                )
+                batches = (
+                    [result]
+                    if merged and result
+                    else [{tp: messages} for tp, messages in result.items()]
+                )
+                for batch in batches:
+                    if self._key_ordering:
+                        for tp, messages in batch.items():
+                            self._dispatch_by_key(semaphore, tp, messages, on_batch)
+                        continue
+                    if self._concurrency is None:
+                        await self._process_batch(batch, on_batch)
+                        continue
+                    self._dispatch(semaphore, batch, on_batch)
+                self._apply_backpressure()
+                if not result and self._tasks:
+                    await asyncio.wait(
+                        self._tasks,
+                        timeout=IDLE_WAIT_SECONDS,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                if self._is_commit_due():
+                    await self._commit()
+        finally:
+            try:
+                await self._drain_tasks()
+            finally:
+                # Коммит и остановка aiokafka consumer'а выполняются, даже если `stop` отменил
+                # ожидание пачек по таймауту, ошибка коммита не скрывает ошибку обработки
+                try:
+                    await self._commit()
+                except Exception as e:
+                    logger.error(f"Failed to commit offsets on shutdown: {e}")
+                finally:
+                    self._stop_requested = False
+                    self._failed_partitions.clear()
+                    self._started.clear()
+                    await self._kafka_consumer.stop()
+
+    def lag(self) -> dict[aiokafka.TopicPartition, int]:
+        """
+        Lag of assigned partitions: highwater minus the committed offset.
+
+        The committed offset is loaded when a partition is assigned, for a partition without
+        a committed offset the offset of the first fetched message is used. Partitions
+        without a known highwater or offset are skipped.
+        """
+        lag = {}
+        for tp in self._kafka_consumer.assignment():
+            highwater = self._kafka_consumer.highwater(tp)
+            committed = self._committed_offsets.get(tp)
+            if highwater is not None and committed is not None:
+                lag[tp] = max(highwater - committed, 0)
+        return lag
+
+    def health(self, stuck_timeout: float = 60) -> metrics.ConsumerHealth:
+        """Report a consumer that has work, but has not made progress for `stuck_timeout` seconds."""
+        now = time.monotonic()
+        last_poll = self.metrics.last_poll
+        last_progress = self.metrics.last_progress
+        lag = sum(self.lag().values())
+        if not self._start_requested:
+            status = "not_started"
+        elif not self._started.is_set() or last_poll is None:
+            status = "stopped"
+        elif now - last_poll > stuck_timeout:
+            # Цикл чтения не выполнялся, например, обработчик завис в последовательном режиме
+            status = "stuck"
+        elif not lag and not self._tasks and not self._in_flight_messages:
+            status = "idle"
+        elif last_progress is not None and now - last_progress > stuck_timeout:
+            status = "stuck"
+        else:
+            status = "ok"
+        return metrics.ConsumerHealth(
+            status=status,
+            last_poll_age=None if last_poll is None else now - last_poll,
+            last_progress_age=None if last_progress is None else now - last_progress,
+            lag=lag,
+        )
+
+    def request_stop(self) -> None:
+        """
+        Stop consuming after the current poll.
+
+        In-flight batches are processed and their offsets committed before the consumer stops.
+        """
+        self._stop_requested = True
+
+    async def _drain_tasks(self) -> None:
+        """Wait for batch tasks before the consumer is stopped, cancel them if the wait is cancelled."""
+        if not self._tasks:
+            return
+        try:
+            results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            # Незавершенные пачки не коммитятся, их сообщения будут прочитаны повторно
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.wait(self._tasks)
+            raise
+        finally:
+            self._tasks.clear()
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Batch processing failed on shutdown: {result}")
+
+    async def run(
+        self,
+        on_message: OnMessage,
+        timeout_ms: float = 0,
+        max_records: int | None = None,
+    ) -> None:
+        """Consume in the running event loop until `request_stop` or cancellation, see `consume`."""
+        if self._adaptive_fetch is not None:
+            fetch_messages = self._fetch_adaptive
+        else:
+            fetch_messages = functools.partial(
+                self._kafka_consumer.getmany,
+                timeout_ms=timeout_ms,
+                max_records=max_records,
+            )
+        await self._run(fetch_messages, self._message_handler(on_message))
+
+    async def run_batches(
+        self,
+        on_batch: OnBatch,
+        max_batch_size: int = 500,
+        max_wait_ms: float = 1000,
+        merged: bool = False,
+    ) -> None:
+        """Consume batches in the running event loop until `request_stop` or cancellation, see `consume_batches`."""
+        if self._key_ordering:
+            raise ValueError("key_ordering is only supported by `consume`")
+        await self._run(
+            functools.partial(self._fetch_batch, max_batch_size, max_wait_ms),
+            self._batch_handler(on_batch),
+            merged=merged,
+        )
+
+    async def start(
+        self,
+        on_message: OnMessage,
+        timeout_ms: float = 0,
+        max_records: int | None = None,
+    ) -> None:
+        """Start `run` as a background task, return once the aiokafka consumer has been started."""
+        await self._start(self.run(on_message, timeout_ms, max_records))
+
+    async def start_batches(
+        self,
+        on_batch: OnBatch,
+        max_batch_size: int = 500,
+        max_wait_ms: float = 1000,
+        merged: bool = False,
+    ) -> None:
+        """Start `run_batches` as a background task, return once the aiokafka consumer has been started."""
+        await self._start(
+            self.run_batches(on_batch, max_batch_size, max_wait_ms, merged)
+        )
+
+    async def _start(self, run: typing.Coroutine[typing.Any, typing.Any, None]) -> None:
+        if self._task is not None and not self._task.done():
+            run.close()
+            raise RuntimeError("Consumer is already running")
+        self._task = asyncio.create_task(run)
+        started = asyncio.create_task(self._started.wait())
+        try:
+            await asyncio.wait(
+                (self._task, started), return_when=asyncio.FIRST_COMPLETED
+            )
         finally:
-            await self._kafka_consumer.stop()
+            started.cancel()
+        if self._task.done():
+            # Ошибка подключения к Kafka или обработчика пробрасывается в вызывающий код
+            self._task.result()
 
-    def consume(self, on_message: OnMessage, timeout_ms: float = 0, max_records: int | None = None):
+    async def stop(self, timeout: float | None = None) -> None:
+        """
+        Stop the background task of `start`.
+
+        In-flight batches are processed and offsets committed, after `timeout` seconds the task is cancelled.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self.request_stop()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except TimeoutError:
+            logger.warning("Kafka consumer has not stopped in time, cancelling")
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Kafka consumer has failed: {e}")
+
+    def _run_until_complete(
+        self, run: typing.Coroutine[typing.Any, typing.Any, None]
+    ) -> None:
+        if self._loop is None:
+            asyncio.run(run)
+        else:
+            self._loop.run_until_complete(run)
+
+    def consume(
+        self,
+        on_message: OnMessage,
+        timeout_ms: float = 0,
+        max_records: int | None = None,
+    ):
         """
         Прослушивает и обрабатывает события, приходящие из специфицированных топиков kafka.
         Больше про семантики чтения можно прочитать тут https://docs.confluent.io/kafka/design/delivery-semantics.html.
         В нашем случае необходимо использовать At Least One.
         Больше про Consume-минг можно прочитать тут https://aiokafka.readthedocs.io/en/stable/consumer.html.
         """
-        self._loop.run_until_complete(self._consume(on_message, timeout_ms, max_records))
+        self._run_until_complete(self.run(on_message, timeout_ms, max_records))
+
+    def consume_batches(
+        self,
+        on_batch: OnBatch,
+        max_batch_size: int = 500,
+        max_wait_ms: float = 1000,
+        merged: bool = False,
+    ):
+        """
+        Прослушивает события и передает их обработчику пачками.
+        Пачка собирается, пока в ней меньше `max_batch_size` сообщений, но не дольше `max_wait_ms`.
+        По умолчанию обработчик вызывается отдельно для сообщений каждой партиции,
+        с `merged=True` - один раз для сообщений всех партиций.
+        Offset'ы коммитятся после успешной обработки пачки.
+        """
+        self._run_until_complete(
+            self.run_batches(on_batch, max_batch_size, max_wait_ms, merged)
+        )
@@ -0,0 +1,48 @@
+import aiokafka
+
+from fastapi_app.kafka import producer as kafka_producer
+
+__all__ = ("DeadLetterPublisher",)
+
+# Максимальная длина текста ошибки в заголовке
+MAX_ERROR_LENGTH = 1024
+
+
+class DeadLetterPublisher:
+    """
+    Publishes messages that failed processing to a dead letter topic, `OnDeadLetter` for `KafkaConsumer`.
+
+    The topic is `topic` or the source topic with `suffix`. Key, value and headers are kept,
+    the source topic, partition, offset and the error are added as `dlq.*` headers.
+    The message is sent with `send_and_wait`, so its offset is committed only after it is published.
+    """
+
+    def __init__(
+        self,
+        producer: aiokafka.AIOKafkaProducer | kafka_producer.KafkaProducer,
+        topic: str | None = None,
+        suffix: str = ".DLQ",
+    ):
+        self._producer = producer
+        self._topic = topic
+        self._suffix = suffix
+
+    async def __call__(
+        self, message: aiokafka.ConsumerRecord, error: Exception
+    ) -> None:
+        headers = [
+            *(message.headers or ()),
+            ("dlq.topic", message.topic.encode()),
+            ("dlq.partition", str(message.partition).encode()),
+            ("dlq.offset", str(message.offset).encode()),
+            (
+                "dlq.error",
+                f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH].encode(),
+            ),
+        ]
+        await self._producer.send_and_wait(
+            self._topic or f"{message.topic}{self._suffix}",
+            value=message.value,
+            key=message.key,
+            headers=headers,
+        )
@@ -0,0 +1,65 @@
+import dataclasses
+import typing
+
+import aiokafka
+import orjson
+import pydantic
+
+__all__ = (
+    "DecodeFailure",
+    "DecodedRecord",
+    "Decoder",
+    "OrjsonDecoder",
+    "PydanticDecoder",
+)
+
+# Декодирует значения пачки сообщений, должен быть picklable для `ProcessPoolExecutor`
+Decoder: typing.TypeAlias = typing.Callable[
+    [typing.Sequence[bytes | None]], list[typing.Any]
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class DecodeFailure:
+    """Value of a message that could not be decoded."""
+
+    raw: bytes | None
+    error: Exception
+
+
+@dataclasses.dataclass
+class DecodedRecord(aiokafka.ConsumerRecord):
+    """`ConsumerRecord` with a decoded `value`, `raw_value` is the value received from Kafka."""
+
+    raw_value: bytes | None = None
+
+
+class OrjsonDecoder:
+    """Decodes JSON values with orjson, `None` values are kept."""
+
+    def __call__(self, values: typing.Sequence[bytes | None]) -> list[typing.Any]:
+        return [None if value is None else orjson.loads(value) for value in values]
+
+
+class PydanticDecoder:
+    """
+    Validates JSON values as `type_` with a pydantic `TypeAdapter`.
+
+    Every value is validated with its own `validate_json` call, `None` values are validated as JSON null.
+    """
+
+    def __init__(self, type_: typing.Any):
+        self.type_ = type_
+        self._adapter = pydantic.TypeAdapter(type_)
+
+    def __getstate__(self) -> dict[str, typing.Any]:
+        # TypeAdapter не сериализуется pickle, в процессе пула он создается заново
+        return {"type_": self.type_}
+
+    def __setstate__(self, state: dict[str, typing.Any]) -> None:
+        self.__init__(state["type_"])
+
+    def __call__(self, values: typing.Sequence[bytes | None]) -> list[typing.Any]:
+        # Склеенные в один массив значения проверялись бы вместе: `[1` и `2]` дали бы один элемент
+        validate_json = self._adapter.validate_json
+        return [validate_json(b"null" if value is None else value) for value in values]
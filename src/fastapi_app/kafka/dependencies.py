@@ -4,7 +4,7 @@ import typing
 
 import aiokafka
 
-__all__ = ("kafka_consumer_factory",)
+__all__ = ("kafka_consumer_factory", "kafka_producer_factory")
 
 
 def kafka_consumer_factory(
@@ -16,7 +16,7 @@ def kafka_consumer_factory(
     bootstrap_servers: typing.Text,
     fetch_max_wait_ms: int,
     group_id: typing.Text,
-    loop: asyncio.AbstractEventLoop,
+    loop: asyncio.AbstractEventLoop | None = None,
     ssl_context: ssl.SSLContext | None = None,
 ) -> aiokafka.AIOKafkaConsumer:
     return aiokafka.AIOKafkaConsumer(
@@ -33,3 +33,31 @@ def kafka_consumer_factory(
         loop=loop,
         ssl_context=ssl_context,
     )
+
+
+def kafka_producer_factory(
+    security_protocol: str,
+    sasl_mechanism: str,
+    sasl_plain_username: str,
+    sasl_plain_password: str,
+    bootstrap_servers: str,
+    linger_ms: int = 5,
+    max_batch_size: int = 64 * 1024,
+    compression_type: str | None = None,
+    acks: int | str = "all",
+    enable_idempotence: bool = False,
+    ssl_context: ssl.SSLContext | None = None,
+) -> aiokafka.AIOKafkaProducer:
+    return aiokafka.AIOKafkaProducer(
+        security_protocol=security_protocol,
+        sasl_mechanism=sasl_mechanism,
+        sasl_plain_username=sasl_plain_username,
+        sasl_plain_password=sasl_plain_password,
+        bootstrap_servers=bootstrap_servers,
+        linger_ms=linger_ms,
+        max_batch_size=max_batch_size,
+        compression_type=compression_type,
+        acks=acks,
+        enable_idempotence=enable_idempotence,
+        ssl_context=ssl_context,
+    )
@@ -0,0 +1,66 @@
+__all__ = ("AdaptiveFetch",)
+
+# Вес нового наблюдения в скользящем среднем времени обработки сообщения
+EWMA_WEIGHT = 0.2
+
+
+class AdaptiveFetch:
+    """
+    Tunes `max_records` and `timeout_ms` of `getmany` for `KafkaConsumer`.
+
+    `max_records` doubles while there is a backlog (a full fetch or lag above the limit)
+    and is limited by the number of messages processed within `target_batch_ms`,
+    estimated from the average processing time of a message. A batch that took longer
+    than `target_batch_ms` shrinks the limit proportionally, so keep `target_batch_ms`
+    well below `max.poll.interval.ms`. While fetches return nothing the poll timeout
+    doubles from `min_timeout_ms` up to `max_timeout_ms`, the first message resets it to 0.
+    """
+
+    def __init__(
+        self,
+        min_records: int = 1,
+        max_records: int = 10_000,
+        initial_records: int = 100,
+        target_batch_ms: float = 1000,
+        min_timeout_ms: float = 10,
+        max_timeout_ms: float = 1000,
+    ):
+        self.min_records = min_records
+        self.max_records = max_records
+        self.target_batch_ms = target_batch_ms
+        self.min_timeout_ms = min_timeout_ms
+        self.max_timeout_ms = max_timeout_ms
+        self.records = max(min(initial_records, max_records), min_records)
+        self.timeout_ms = 0.0
+        self._message_ms: float | None = None
+        self._backlog = False
+
+    def on_fetch(self, fetched: int, lag: int = 0) -> None:
+        """Update the poll timeout and the backlog flag after a fetch."""
+        if fetched:
+            self.timeout_ms = 0.0
+        else:
+            self.timeout_ms = min(
+                max(self.timeout_ms * 2, self.min_timeout_ms), self.max_timeout_ms
+            )
+        self._backlog = fetched >= self.records or lag > self.records
+
+    def on_processed(self, messages: int, seconds: float) -> None:
+        """Update `records` after a batch of `messages` has been processed in `seconds`."""
+        if not messages:
+            return
+        batch_ms = seconds * 1000
+        message_ms = batch_ms / messages
+        if self._message_ms is None:
+            self._message_ms = message_ms
+        else:
+            self._message_ms += EWMA_WEIGHT * (message_ms - self._message_ms)
+
+        records: float = self.records
+        if batch_ms > self.target_batch_ms:
+            records = records * self.target_batch_ms / batch_ms
+        elif self._backlog:
+            records = records * 2
+        if self._message_ms > 0:
+            records = min(records, self.target_batch_ms / self._message_ms)
+        self.records = int(max(min(records, self.max_records), self.min_records))
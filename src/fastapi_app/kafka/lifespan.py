@@ -0,0 +1,53 @@
+import asyncio
+import contextlib
+import typing
+
+from starlette import types
+
+from fastapi_app.kafka import consumer, producer
+
+__all__ = ("ConsumerStarter", "lifespan")
+
+# Создает consumer в event loop'е приложения и запускает его через `KafkaConsumer.start`
+ConsumerStarter: typing.TypeAlias = typing.Callable[
+    [], typing.Awaitable[consumer.KafkaConsumer]
+]
+
+
+def lifespan(
+    *starters: ConsumerStarter,
+    lifespan_handler: types.Lifespan[types.AppType] | None = None,
+    stop_timeout: float | None = None,
+    producers: typing.Iterable[producer.KafkaProducer] = (),
+) -> types.Lifespan[types.AppType]:
+    """
+    Lifespan running Kafka consumers as background tasks of the application.
+
+    Consumers are started after `lifespan_handler` has been entered and stopped before it exits,
+    so handlers can use resources it initializes. On shutdown consumers finish in-flight batches
+    and commit offsets, consumers that have not stopped within `stop_timeout` seconds are cancelled.
+    `producers` are started before consumers and stopped after them.
+    """
+
+    @contextlib.asynccontextmanager
+    async def handler(app: types.AppType) -> typing.AsyncIterator[typing.Any]:
+        consumers: list[consumer.KafkaConsumer] = []
+
+        async def stop() -> None:
+            await asyncio.gather(
+                *(kafka_consumer.stop(stop_timeout) for kafka_consumer in consumers)
+            )
+
+        async with contextlib.AsyncExitStack() as stack:
+            state = None
+            if lifespan_handler is not None:
+                state = await stack.enter_async_context(lifespan_handler(app))
+            for kafka_producer in producers:
+                await kafka_producer.start()
+                stack.push_async_callback(kafka_producer.stop)
+            stack.push_async_callback(stop)
+            for start in starters:
+                consumers.append(await start())
+            yield state
+
+    return handler
@@ -0,0 +1,104 @@
+import bisect
+import collections
+import dataclasses
+import time
+import typing
+
+__all__ = ("ConsumerHealth", "ConsumerMetrics", "Histogram")
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+# Окно, за которое считается число сообщений в секунду
+RATE_WINDOW_SECONDS = 60
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, an observation is a single `bisect`."""
+
+    def __init__(self, buckets: typing.Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """`(upper bound, count)` pairs, the last bound is `inf`."""
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+@dataclasses.dataclass(frozen=True)
+class ConsumerHealth:
+    """
+    State of a `KafkaConsumer`.
+
+    `status` is `not_started` (never run), `stopped`, `idle` (nothing to process), `ok` or `stuck`
+    (there is work, but no batch has been processed or the poll loop has not run for `stuck_timeout` seconds).
+    A consumer that has not been started does not fail the health check.
+    """
+
+    status: str
+    last_poll_age: float | None
+    last_progress_age: float | None
+    lag: int
+
+    @property
+    def healthy(self) -> bool:
+        return self.status in ("not_started", "idle", "ok")
+
+
+class ConsumerMetrics:
+    """Batch size, handler and commit latency histograms and processing rate of a `KafkaConsumer`."""
+
+    def __init__(self) -> None:
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.handler_latency = Histogram(LATENCY_BUCKETS)
+        self.commit_latency = Histogram(LATENCY_BUCKETS)
+        self.last_poll: float | None = None
+        self.last_progress: float | None = None
+        # Отметки (время, число сообщений) не чаще раза в секунду
+        self._rate_samples: collections.deque[tuple[float, int]] = collections.deque()
+        self._messages = 0
+
+    def observe_batch(self, size: int) -> None:
+        now = time.monotonic()
+        self.batch_size.observe(size)
+        self.last_progress = now
+        self._messages += size
+        if not self._rate_samples or now - self._rate_samples[-1][0] >= 1:
+            self._rate_samples.append((now, self._messages))
+            while now - self._rate_samples[0][0] > RATE_WINDOW_SECONDS:
+                self._rate_samples.popleft()
+
+    def records_per_second(self) -> float:
+        """Processed messages per second over the last minute."""
+        if not self._rate_samples:
+            return 0.0
+        since, messages = self._rate_samples[0]
+        elapsed = time.monotonic() - since
+        if elapsed <= 0:
+            return 0.0
+        return (self._messages - messages) / elapsed
@@ -0,0 +1,165 @@
+import collections
+import dataclasses
+import typing
+
+import fastapi
+from fastapi import responses, status
+
+from fastapi_app.kafka import consumer, metrics
+
+__all__ = ("render_prometheus", "router")
+
+_COUNTERS = {
+    "messages": "Processed messages.",
+    "batches": "Processed batches.",
+    "commits": "Offset commits.",
+    "failures": "Failed handler calls and undecodable messages.",
+    "retries": "Handler retries.",
+    "dead_letters": "Messages sent to the dead letter.",
+}
+
+
+def _labels(**labels: typing.Any) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _identify(
+    consumers: typing.Iterable[consumer.KafkaConsumer],
+) -> list[tuple[consumer.KafkaConsumer, dict[str, typing.Any]]]:
+    """Consumers sorted by name with their labels, consumers with the same name also get an `instance` label."""
+    consumers = sorted(consumers, key=lambda item: (item.name, item.id))
+    names = collections.Counter(item.name for item in consumers)
+    return [
+        (
+            item,
+            {"consumer": item.name}
+            if names[item.name] == 1
+            else {"consumer": item.name, "instance": item.id},
+        )
+        for item in consumers
+    ]
+
+
+def _histogram(
+    lines: list[str],
+    name: str,
+    help_text: str,
+    histograms: typing.Iterable[tuple[dict[str, typing.Any], metrics.Histogram]],
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms:
+        for bound, count in histogram.cumulative():
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f'{name}_bucket{{{_labels(**labels)},le="{le}"}} {count}')
+        lines.append(f"{name}_sum{{{_labels(**labels)}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{_labels(**labels)}}} {histogram.count}")
+
+
+def render_prometheus(
+    consumers: typing.Iterable[consumer.KafkaConsumer] | None = None,
+) -> str:
+    """Metrics of `consumers` (all consumers of the process by default) in the Prometheus text format."""
+    identified = _identify(consumer._consumers if consumers is None else consumers)
+    lines: list[str] = []
+    for field, help_text in _COUNTERS.items():
+        name = f"kafka_consumer_{field}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(
+            f"{name}{{{_labels(**labels)}}} {getattr(item.stats, field)}"
+            for item, labels in identified
+        )
+
+    lines.append(
+        "# HELP kafka_consumer_records_per_second Processed messages per second over the last minute."
+    )
+    lines.append("# TYPE kafka_consumer_records_per_second gauge")
+    lines.extend(
+        f"kafka_consumer_records_per_second{{{_labels(**labels)}}} {item.metrics.records_per_second()}"
+        for item, labels in identified
+    )
+    lines.append(
+        "# HELP kafka_consumer_lag Highwater minus the committed offset of a partition."
+    )
+    lines.append("# TYPE kafka_consumer_lag gauge")
+    for item, labels in identified:
+        for tp, lag in sorted(item.lag().items()):
+            lines.append(
+                f"kafka_consumer_lag{{{_labels(**labels, topic=tp.topic, partition=tp.partition)}}} {lag}"
+            )
+    lines.append(
+        "# HELP kafka_consumer_healthy Whether the consumer is not started, idle or making progress."
+    )
+    lines.append("# TYPE kafka_consumer_healthy gauge")
+    lines.extend(
+        f"kafka_consumer_healthy{{{_labels(**labels)}}} {int(item.health().healthy)}"
+        for item, labels in identified
+    )
+
+    _histogram(
+        lines,
+        "kafka_consumer_batch_size",
+        "Messages per processed batch.",
+        ((labels, item.metrics.batch_size) for item, labels in identified),
+    )
+    _histogram(
+        lines,
+        "kafka_consumer_handler_latency_seconds",
+        "Duration of handler calls.",
+        ((labels, item.metrics.handler_latency) for item, labels in identified),
+    )
+    _histogram(
+        lines,
+        "kafka_consumer_commit_latency_seconds",
+        "Duration of offset commits.",
+        ((labels, item.metrics.commit_latency) for item, labels in identified),
+    )
+    return "\n".join(lines) + "\n"
+
+
+def router(
+    consumers: typing.Iterable[consumer.KafkaConsumer] | None = None,
+    metrics_path: str = "/metrics",
+    health_path: str = "/health/kafka",
+    stuck_timeout: float = 60,
+) -> fastapi.APIRouter:
+    """
+    Router with the Prometheus endpoint and the health check of `consumers` (all consumers of the process by default).
+
+    The health check responds 503 if any consumer is stopped or stuck for `stuck_timeout` seconds,
+    consumers that have not been started are reported as `not_started`. Entries are keyed by consumer name,
+    consumers with the same name are keyed as `name/instance`.
+    """
+    if consumers is not None:
+        consumers = list(consumers)
+    api_router = fastapi.APIRouter(tags=["kafka"])
+
+    @api_router.get(metrics_path, response_class=responses.PlainTextResponse)
+    async def kafka_metrics() -> responses.PlainTextResponse:
+        return responses.PlainTextResponse(
+            render_prometheus(consumers), media_type="text/plain; version=0.0.4"
+        )
+
+    @api_router.get(health_path)
+    async def kafka_health() -> responses.JSONResponse:
+        health = {
+            "/".join(str(label) for label in labels.values()): item.health(
+                stuck_timeout
+            )
+            for item, labels in _identify(
+                consumer._consumers if consumers is None else consumers
+            )
+        }
+        healthy = all(item.healthy for item in health.values())
+        return responses.JSONResponse(
+            {
+                name: {**dataclasses.asdict(item), "healthy": item.healthy}
+                for name, item in health.items()
+            },
+            status_code=status.HTTP_200_OK
+            if healthy
+            else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    return api_router
@@ -0,0 +1,33 @@
+import collections
+
+__all__ = ("OffsetTracker",)
+
+
+class OffsetTracker:
+    """
+    Tracks out-of-order processing of a partition.
+
+    Offsets are added in the order they were fetched and marked done in any order.
+    `done` returns the offset to commit: the next offset after the highest contiguous
+    processed one, so a commit never skips a message that is still being processed.
+    """
+
+    def __init__(self) -> None:
+        self._offsets: collections.deque[int] = collections.deque()
+        self._done: set[int] = set()
+
+    def __len__(self) -> int:
+        """Number of added, but not yet committable offsets."""
+        return len(self._offsets)
+
+    def add(self, offset: int) -> None:
+        self._offsets.append(offset)
+
+    def done(self, offset: int) -> int | None:
+        """Mark offset processed, return the new offset to commit if it has moved."""
+        self._done.add(offset)
+        last = None
+        while self._offsets and self._offsets[0] in self._done:
+            last = self._offsets.popleft()
+            self._done.discard(last)
+        return None if last is None else last + 1
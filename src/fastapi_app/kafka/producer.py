@@ -0,0 +1,106 @@
+import asyncio
+import dataclasses
+import logging
+import typing
+
+import aiokafka
+from aiokafka import structs
+
+__all__ = ("KafkaProducer", "ProducerRecord")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class ProducerRecord:
+    """Message to publish with `KafkaProducer.send_many`."""
+
+    value: bytes | None
+    key: bytes | None = None
+    headers: typing.Sequence[tuple[str, bytes]] | None = None
+    partition: int | None = None
+
+
+class KafkaProducer:
+    """
+    Kafka producer shared by the whole process.
+
+    The `aiokafka.AIOKafkaProducer` is created by `factory` in `start`, inside the running event loop,
+    e.g. by the application lifespan (see `kafka.lifespan`). The instance is a FastAPI dependency:
+    `producer: kafka.KafkaProducer = fastapi.Depends(producer)`.
+    """
+
+    def __init__(self, factory: typing.Callable[[], aiokafka.AIOKafkaProducer]):
+        self._factory = factory
+        self._producer: aiokafka.AIOKafkaProducer | None = None
+
+    def __call__(self) -> "KafkaProducer":
+        return self
+
+    @property
+    def started(self) -> bool:
+        return self._producer is not None
+
+    @property
+    def producer(self) -> aiokafka.AIOKafkaProducer:
+        if self._producer is None:
+            raise RuntimeError("Kafka producer is not started")
+        return self._producer
+
+    async def start(self) -> None:
+        if self._producer is not None:
+            return
+        producer = self._factory()
+        await producer.start()
+        self._producer = producer
+        logger.debug("AioKafka producer has been started")
+
+    async def stop(self) -> None:
+        """Flush pending messages and stop the producer."""
+        if self._producer is None:
+            return
+        producer, self._producer = self._producer, None
+        await producer.stop()
+        logger.debug("AioKafka producer has been stopped")
+
+    async def send_and_wait(
+        self,
+        topic: str,
+        value: bytes | None = None,
+        key: bytes | None = None,
+        partition: int | None = None,
+        timestamp_ms: int | None = None,
+        headers: typing.Sequence[tuple[str, bytes]] | None = None,
+    ) -> structs.RecordMetadata:
+        return await self.producer.send_and_wait(
+            topic,
+            value=value,
+            key=key,
+            partition=partition,
+            timestamp_ms=timestamp_ms,
+            headers=headers,
+        )
+
+    async def send_many(
+        self,
+        topic: str,
+        records: typing.Iterable[ProducerRecord],
+    ) -> list[structs.RecordMetadata]:
+        """
+        Publish records and wait for delivery of all of them.
+
+        Records are added to producer batches without waiting for each one,
+        so they are sent with a few requests instead of a request per record.
+        """
+        producer = self.producer
+        deliveries = [
+            await producer.send(
+                topic,
+                value=record.value,
+                key=record.key,
+                partition=record.partition,
+                headers=record.headers,
+            )
+            for record in records
+        ]
+        return list(await asyncio.gather(*deliveries))
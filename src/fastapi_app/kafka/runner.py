@@ -0,0 +1,220 @@
+import dataclasses
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import typing
+from multiprocessing import process
+
+from fastapi_app.kafka import consumer
+
+__all__ = ("ConsumerRunner", "WorkerStats")
+
+logger = logging.getLogger(__name__)
+
+# Как часто супервизор проверяет воркеров
+SUPERVISE_INTERVAL = 0.1
+
+
+@dataclasses.dataclass
+class WorkerStats:
+    """State and counters of a worker process, counters are the last reported by the worker."""
+
+    index: int
+    pid: int | None = None
+    restarts: int = 0
+    exit_code: int | None = None
+    messages: int = 0
+    batches: int = 0
+    commits: int = 0
+    failures: int = 0
+    retries: int = 0
+    dead_letters: int = 0
+
+
+def _report_stats(
+    index: int,
+    stats_queue: multiprocessing.Queue,
+    interval: float,
+    stopped: threading.Event,
+) -> None:
+    while not stopped.wait(interval):
+        stats_queue.put((index, consumer.collect_stats()))
+
+
+def _worker_main(
+    target: typing.Callable[[], None],
+    index: int,
+    stats_queue: multiprocessing.Queue,
+    stats_interval: float,
+) -> None:
+    def on_sigterm(signum, frame) -> None:
+        if not consumer._consumers:
+            # Consumer еще не создан, дожидаться нечего
+            raise SystemExit(0)
+        consumer.request_stop_all()
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    # Ctrl+C приходит всей группе процессов, останавливает воркеров супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stopped = threading.Event()
+    reporter = threading.Thread(
+        target=_report_stats,
+        args=(index, stats_queue, stats_interval, stopped),
+        daemon=True,
+    )
+    reporter.start()
+    try:
+        target()
+    finally:
+        stopped.set()
+        reporter.join()
+        stats_queue.put((index, consumer.collect_stats()))
+
+
+class ConsumerRunner:
+    """
+    Runs a consumer in `workers` processes.
+
+    `target` is a picklable function without arguments that creates a `KafkaConsumer`
+    and consumes, e.g. with `kafka.create(...)`. Workers use the same `group_id`,
+    so Kafka distributes partitions between them.
+
+    A worker that exits with a non-zero code is restarted after `restart_backoff` seconds,
+    doubled after each consecutive crash up to `max_restart_backoff`.
+    On SIGTERM or SIGINT (or `stop`) workers get SIGTERM, finish in-flight batches,
+    commit offsets and exit. Workers that have not exited within `stop_timeout` seconds are killed.
+    """
+
+    def __init__(
+        self,
+        target: typing.Callable[[], None],
+        workers: int | None = None,
+        restart_backoff: float = 1.0,
+        max_restart_backoff: float = 60.0,
+        stop_timeout: float = 30.0,
+        stats_interval: float = 5.0,
+    ):
+        self._target = target
+        self._workers = workers or os.cpu_count() or 1
+        self._restart_backoff = restart_backoff
+        self._max_restart_backoff = max_restart_backoff
+        self._stop_timeout = stop_timeout
+        self._stats_interval = stats_interval
+        self._context = multiprocessing.get_context("spawn")
+        self._stats_queue: multiprocessing.Queue = self._context.Queue()
+        self._processes: dict[int, process.BaseProcess] = {}
+        self._started_at: dict[int, float] = {}
+        self._restart_at: dict[int, float] = {}
+        # Число падений подряд, от него зависит задержка перезапуска
+        self._failures: dict[int, int] = {}
+        self._stats = {index: WorkerStats(index) for index in range(self._workers)}
+        self._stopping = threading.Event()
+
+    def stats(self) -> list[WorkerStats]:
+        self._read_stats()
+        return [dataclasses.replace(stats) for stats in self._stats.values()]
+
+    def stop(self) -> None:
+        """Request a graceful stop, `run` returns once all workers have exited."""
+        self._stopping.set()
+
+    def run(self) -> None:
+        """Start workers and supervise them until `stop` or all workers exit with code 0."""
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                handlers[signum] = signal.signal(
+                    signum, lambda signum, frame: self.stop()
+                )
+        try:
+            for index in range(self._workers):
+                self._start(index)
+            while not self._stopping.is_set() and (self._processes or self._restart_at):
+                self._supervise()
+                self._read_stats(timeout=SUPERVISE_INTERVAL)
+        finally:
+            self._shutdown()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def _start(self, index: int) -> None:
+        worker = self._context.Process(
+            target=_worker_main,
+            args=(self._target, index, self._stats_queue, self._stats_interval),
+            name=f"kafka-consumer-{index}",
+        )
+        worker.start()
+        self._processes[index] = worker
+        self._started_at[index] = time.monotonic()
+        self._stats[index].pid = worker.pid
+        self._stats[index].exit_code = None
+        logger.info(f"Kafka consumer worker {index} started, pid {worker.pid}")
+
+    def _supervise(self) -> None:
+        now = time.monotonic()
+        for index, worker in list(self._processes.items()):
+            if worker.is_alive():
+                continue
+            worker.join()
+            del self._processes[index]
+            self._stats[index].exit_code = worker.exitcode
+            if worker.exitcode == 0:
+                logger.info(f"Kafka consumer worker {index} finished")
+                continue
+            # Воркер, проработавший дольше максимальной задержки, считается стабильным
+            if now - self._started_at[index] > self._max_restart_backoff:
+                self._failures[index] = 0
+            backoff = min(
+                self._restart_backoff * 2 ** self._failures.get(index, 0),
+                self._max_restart_backoff,
+            )
+            self._failures[index] = self._failures.get(index, 0) + 1
+            self._restart_at[index] = now + backoff
+            logger.error(
+                f"Kafka consumer worker {index} exited with code {worker.exitcode}, restarting in {backoff:.1f}s",
+            )
+        for index, restart_at in list(self._restart_at.items()):
+            if restart_at <= now:
+                del self._restart_at[index]
+                self._stats[index].restarts += 1
+                self._start(index)
+
+    def _read_stats(self, timeout: float = 0) -> None:
+        """Apply counters reported by workers, waiting up to `timeout` seconds for the first report."""
+        block = timeout > 0
+        while True:
+            try:
+                index, stats = self._stats_queue.get(
+                    block=block, timeout=timeout if block else None
+                )
+            except queue.Empty:
+                return
+            for stats_field in dataclasses.fields(stats):
+                setattr(
+                    self._stats[index],
+                    stats_field.name,
+                    getattr(stats, stats_field.name),
+                )
+            block = False
+
+    def _shutdown(self) -> None:
+        self._restart_at.clear()
+        for worker in self._processes.values():
+            if worker.is_alive():
+                worker.terminate()
+        deadline = time.monotonic() + self._stop_timeout
+        for index, worker in self._processes.items():
+            worker.join(max(deadline - time.monotonic(), 0))
+            if worker.is_alive():
+                logger.warning(
+                    f"Kafka consumer worker {index} has not stopped in time, killing"
+                )
+                worker.kill()
+                worker.join()
+            self._stats[index].exit_code = worker.exitcode
+        self._processes.clear()
+        self._read_stats()
@@ -1,9 +1,17 @@
 from fastapi_app.logging.formatters import generate_log_config
+from fastapi_app.logging.handlers import BatchQueueHandler, OverflowPolicy
+from fastapi_app.logging.masking import DEFAULT_MASK_RULES, Masker
 from fastapi_app.logging.middleware import LoggingMiddleware
 from fastapi_app.logging.models import RequestJsonLogSchema
+from fastapi_app.logging.policy import LoggingPolicy
 
 __all__ = (
     "generate_log_config",
+    "BatchQueueHandler",
+    "OverflowPolicy",
+    "DEFAULT_MASK_RULES",
+    "Masker",
     "LoggingMiddleware",
+    "LoggingPolicy",
     "RequestJsonLogSchema",
 )
@@ -5,22 +5,53 @@ import sys
 import traceback
 import typing
 
-from fastapi_app.logging import loggers
-from fastapi_app.logging.models import BaseJsonLogSchema
+import orjson
+
+from fastapi_app.logging import handlers, loggers, masking
+from fastapi_app.logging.models import BaseJsonLogSchema, RawJSON
 
 __all__ = ("generate_log_config",)
 
+# Ключи лога в формате ECS, вычисляются один раз из алиасов BaseJsonLogSchema
+LOG_KEYS: dict[str, str] = {
+    name: field.alias or name for name, field in BaseJsonLogSchema.model_fields.items()
+}
+
+
+def json_default(obj: typing.Any) -> typing.Any:
+    """`default` hook of json.dumps for values json can't serialize."""
+    if isinstance(obj, RawJSON):
+        try:
+            return obj.loads()
+        except orjson.JSONDecodeError:
+            # Запись лога не должна теряться из-за невалидного тела
+            return obj.raw.decode(errors="replace")
+    return str(obj)
+
+
+def orjson_default(obj: typing.Any) -> typing.Any:
+    """`default` hook of orjson.dumps, embeds RawJSON as is."""
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.raw)
+    return str(obj)
+
 
 class JSONLogFormatter(logging.Formatter):
     """
     Custom class-formatter for writing logs to json
     """
 
-    def __init__(self, app_name: str | None = None, app_version: str | None = None):
+    def __init__(
+        self,
+        app_name: str | None = None,
+        app_version: str | None = None,
+        mask_rules: typing.Iterable[str] | None = masking.DEFAULT_MASK_RULES,
+    ):
         super().__init__()
 
         self.app_name = app_name
         self.app_version = app_version
+        self.masker = masking.Masker(mask_rules or ())
 
     def format(self, record: logging.LogRecord, *args, **kwargs) -> str:
         """
@@ -30,7 +61,7 @@ class JSONLogFormatter(logging.Formatter):
         :return: json string
         """
         log_object: dict = self._format_log_object(record)
-        return json.dumps(log_object, ensure_ascii=False)
+        return json.dumps(log_object, ensure_ascii=False, default=json_default)
 
     def _format_log_object(self, record: logging.LogRecord) -> dict:
         now = (
@@ -82,38 +113,144 @@ class JSONLogFormatter(logging.Formatter):
 
         # getting additional fields
         if hasattr(record, "request_json_fields"):
-            json_log_object.update(record.request_json_fields)
+            json_log_object.update(self._get_request_json_fields(record))
 
         return json_log_object
 
+    def _get_request_json_fields(self, record: logging.LogRecord) -> dict:
+        fields = record.request_json_fields
+        if self.masker and getattr(record, "to_mask", False):
+            return self.masker.mask_request_fields(fields)
+        return fields
+
+
+class FastJSONLogFormatter(JSONLogFormatter):
+    """
+    High-throughput formatter with the same output keys as `JSONLogFormatter`.
+
+    Builds the log object without `BaseJsonLogSchema`, caches the timestamp
+    string per second and serializes with orjson.
+    """
+
+    def __init__(
+        self,
+        app_name: str | None = None,
+        app_version: str | None = None,
+        mask_rules: typing.Iterable[str] | None = masking.DEFAULT_MASK_RULES,
+    ):
+        super().__init__(
+            app_name=app_name,
+            app_version=app_version,
+            mask_rules=mask_rules,
+        )
+        # (секунда, ISO строка) - присваивается целиком, поэтому безопасно для потоков
+        self._timestamp_cache: tuple[int, str] = (-1, "")
+
+    def format(self, record: logging.LogRecord, *args, **kwargs) -> str:
+        return self.format_bytes(record).decode()
+
+    def format_bytes(self, record: logging.LogRecord) -> bytes:
+        """
+        Formatting LogRecord to json bytes without decoding to str
+
+        :param record: logging.LogRecord
+        :return: json bytes
+        """
+        return orjson.dumps(self._format_log_object(record), default=orjson_default)
+
+    def _format_timestamp(self, created: float) -> str:
+        second = int(created)
+        cached_second, timestamp = self._timestamp_cache
+        if cached_second != second:
+            timestamp = datetime.datetime.fromtimestamp(second).astimezone().isoformat()
+            self._timestamp_cache = (second, timestamp)
+        return timestamp
+
+    def _format_log_object(self, record: logging.LogRecord) -> dict:
+        log_object = {
+            LOG_KEYS["timestamp"]: self._format_timestamp(record.created),
+            LOG_KEYS["thread"]: record.process,
+            LOG_KEYS["message"]: record.getMessage(),
+            LOG_KEYS["level_name"]: record.levelname,
+            LOG_KEYS["app_name"]: self.app_name,
+            LOG_KEYS["app_version"]: self.app_version,
+            LOG_KEYS["log_origin_function"]: record.funcName,
+            LOG_KEYS["log_origin_file_line"]: record.lineno,
+            LOG_KEYS["log_origin_file_name"]: record.filename,
+            LOG_KEYS["log_file_path"]: record.pathname,
+        }
+
+        span_id = getattr(record, "otelSpanID", None)
+        trace_id = getattr(record, "otelTraceID", None)
+        if span_id and trace_id:
+            log_object[LOG_KEYS["trace_id"]] = trace_id
+            log_object[LOG_KEYS["span_id"]] = span_id
+
+        log_object[LOG_KEYS["duration"]] = int(
+            getattr(record, "duration", record.msecs),
+        )
+
+        if record.exc_info:
+            log_object[LOG_KEYS["labels"]] = {
+                "exceptions": traceback.format_exception(*record.exc_info),
+            }
+        elif record.exc_text:
+            log_object[LOG_KEYS["labels"]] = {"exceptions": record.exc_text}
+
+        if hasattr(record, "props"):
+            log_object["props"] = record.props
+
+        # getting additional fields
+        if hasattr(record, "request_json_fields"):
+            log_object.update(self._get_request_json_fields(record))
+
+        return log_object
+
 
 def generate_log_config(
     logging_level: str,
     serialize: bool = False,
     app_name: str | None = None,
     app_version: str | None = None,
+    fast: bool = False,
+    queue_size: int | None = None,
+    queue_overflow: handlers.OverflowPolicy | str = handlers.OverflowPolicy.BLOCK,
+    mask_rules: typing.Iterable[str] | None = masking.DEFAULT_MASK_RULES,
+    enqueue: bool = False,
 ) -> dict[str, typing.Any]:
     handler = ["json"] if serialize else ["intercept"]
+    intercept_handler: dict[str, typing.Any] = {"()": loggers.ConsoleLogger}
+    if fast or enqueue:
+        intercept_handler = {"()": loggers.FastConsoleLogger, "enqueue": enqueue}
+    json_handler: dict[str, typing.Any] = {
+        "formatter": "json",
+        "class": "logging.StreamHandler",
+        "stream": sys.stdout,
+    }
+    if queue_size:
+        # Запись в stdout уходит в отдельный поток и не блокирует event loop
+        json_handler = {
+            "formatter": "json",
+            "()": handlers.BatchQueueHandler,
+            "stream": sys.stdout,
+            "max_size": queue_size,
+            "overflow_policy": queue_overflow,
+        }
 
     return {
         "version": 1,
         "disable_existing_loggers": False,
         "formatters": {
             "json": {
-                "()": JSONLogFormatter,
+                "()": FastJSONLogFormatter if fast else JSONLogFormatter,
                 "app_name": app_name,
                 "app_version": app_version,
+                "mask_rules": mask_rules,
             },
         },
         "handlers": {
-            "json": {
-                "formatter": "json",
-                "class": "logging.StreamHandler",
-                "stream": sys.stdout,
-            },
-            "intercept": {
-                "()": loggers.ConsoleLogger,
-            },
+            "json": json_handler,
+            "intercept": intercept_handler,
         },
         "loggers": {
             "root": {
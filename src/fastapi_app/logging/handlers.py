@@ -0,0 +1,156 @@
+import collections
+import enum
+import logging
+import sys
+import threading
+import typing
+
+__all__ = ("BatchQueueHandler", "OverflowPolicy")
+
+
+class OverflowPolicy(str, enum.Enum):
+    """What `BatchQueueHandler` does when its queue is full."""
+
+    # Ждать, пока writer освободит место
+    BLOCK = "block"
+    # Выбросить самую старую запись
+    DROP_OLDEST = "drop_oldest"
+    # Выбросить DEBUG запись (новую или самую старую из очереди), иначе самую старую
+    DROP_DEBUG_FIRST = "drop_debug_first"
+
+
+class BatchQueueHandler(logging.Handler):
+    """
+    Handler that moves writing out of the calling thread.
+
+    Records are put into a bounded queue, a dedicated writer thread formats
+    them in batches and writes every batch with a single `write` call.
+    The queue is drained on `flush` and `close`, `logging.shutdown` calls both at exit.
+    """
+
+    def __init__(
+        self,
+        stream: typing.TextIO | None = None,
+        max_size: int = 10_000,
+        batch_size: int = 512,
+        overflow_policy: OverflowPolicy | str = OverflowPolicy.BLOCK,
+    ):
+        super().__init__()
+        self.stream = stream or sys.stdout
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        # Количество выброшенных записей по уровням логирования
+        self.dropped: collections.Counter[str] = collections.Counter()
+
+        self._queue: collections.deque[logging.LogRecord] = collections.deque()
+        self._condition = threading.Condition(threading.Lock())
+        self._in_progress = 0
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            name=f"{self.__class__.__name__}-writer",
+            daemon=True,
+        )
+        self._writer.start()
+
+    @property
+    def dropped_total(self) -> int:
+        return sum(self.dropped.values())
+
+    def emit(self, record: logging.LogRecord) -> None:
+        with self._condition:
+            if self._closed:
+                self._drop(record)
+                return
+            if len(self._queue) >= self.max_size and not self._make_room(record):
+                return
+            self._queue.append(record)
+            self._condition.notify_all()
+
+    def _drop(self, record: logging.LogRecord) -> None:
+        self.dropped[record.levelname] += 1
+
+    def _make_room(self, record: logging.LogRecord) -> bool:
+        """Free a place in the full queue, returns False if the record itself is dropped."""
+        if self.overflow_policy is OverflowPolicy.BLOCK:
+            while len(self._queue) >= self.max_size and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                self._drop(record)
+                return False
+            return True
+
+        if self.overflow_policy is OverflowPolicy.DROP_DEBUG_FIRST:
+            if record.levelno <= logging.DEBUG:
+                self._drop(record)
+                return False
+            for index, queued in enumerate(self._queue):
+                if queued.levelno <= logging.DEBUG:
+                    del self._queue[index]
+                    self._drop(queued)
+                    return True
+
+        self._drop(self._queue.popleft())
+        return True
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(len(self._queue), self.batch_size))
+                ]
+                self._in_progress = len(batch)
+                # Будим производителей, ожидающих места в очереди
+                self._condition.notify_all()
+
+            self._write_batch(batch)
+
+            with self._condition:
+                self._in_progress = 0
+                self._condition.notify_all()
+
+    def _write_batch(self, batch: list[logging.LogRecord]) -> None:
+        format_bytes = getattr(self.formatter, "format_bytes", None)
+        buffer = getattr(self.stream, "buffer", None)
+        lines: list = []
+        for record in batch:
+            try:
+                if format_bytes is not None and buffer is not None:
+                    lines.append(format_bytes(record) + b"\n")
+                else:
+                    lines.append(self.format(record) + "\n")
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        try:
+            if isinstance(lines[0], bytes):
+                # Сбрасываем текстовый буфер, чтобы не перемешать вывод
+                self.stream.flush()
+                buffer.write(b"".join(lines))
+                buffer.flush()
+            else:
+                self.stream.write("".join(lines))
+                self.stream.flush()
+        except Exception:
+            self.handleError(batch[-1])
+
+    def flush(self) -> None:
+        """Wait until every queued record is written."""
+        with self._condition:
+            while (self._queue or self._in_progress) and self._writer.is_alive():
+                self._condition.wait(timeout=0.1)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._writer is not threading.current_thread():
+            self._writer.join()
+        super().close()
@@ -1,4 +1,5 @@
 import logging
+import sys
 import types
 import typing
 
@@ -22,3 +23,70 @@ class ConsoleLogger(logging.Handler):
             level,
             record.getMessage(),
         )
+
+
+class FastConsoleLogger(logging.Handler):
+    """
+    Intercept handler with low overhead per record.
+
+    Loguru levels are cached per levelno and the caller is taken from the fields
+    already captured by `logging.LogRecord` instead of walking Python frames.
+    With `enqueue=True` the default loguru sink is replaced with a stderr sink
+    that writes from loguru's background thread.
+    """
+
+    def __init__(self, level: int | str = logging.NOTSET, enqueue: bool = False):
+        super().__init__(level=level)
+        self._levels: dict[int, str | int] = {}
+        # Текущая запись, emit вызывается под блокировкой handler'а
+        self._record: logging.LogRecord | None = None
+        self._logger = loguru.logger.patch(self._patch)
+        self._sink_id: int | None = None
+        if enqueue:
+            try:
+                loguru.logger.remove(0)
+            except ValueError:
+                pass
+            self._sink_id = loguru.logger.add(sys.stderr, enqueue=True)
+
+    def _get_level(self, record: logging.LogRecord) -> str | int:
+        try:
+            return self._levels[record.levelno]
+        except KeyError:
+            try:
+                level: str | int = loguru.logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+            self._levels[record.levelno] = level
+            return level
+
+    def _patch(self, loguru_record: dict) -> None:
+        record = self._record
+        if record is None:
+            return
+        loguru_record.update(
+            name=record.name,
+            function=record.funcName,
+            line=record.lineno,
+            module=record.module,
+            file=type(loguru_record["file"])(record.filename, record.pathname),
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._record = record
+        try:
+            logger = self._logger
+            if record.exc_info:
+                logger = logger.opt(exception=record.exc_info)
+            logger.log(self._get_level(record), record.getMessage())
+        except Exception:
+            self.handleError(record)
+        finally:
+            self._record = None
+
+    def close(self) -> None:
+        if self._sink_id is not None:
+            # Дожидается записи всей очереди loguru
+            loguru.logger.remove(self._sink_id)
+            self._sink_id = None
+        super().close()
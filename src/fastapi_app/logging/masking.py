@@ -0,0 +1,229 @@
+import re
+import typing
+
+import orjson
+
+from fastapi_app.logging.models import RawJSON
+
+__all__ = ("DEFAULT_MASK_RULES", "Masker")
+
+DEFAULT_MASK_RULES = (
+    "*.password",
+    "*.token",
+    "*.access_token",
+    "*.refresh_token",
+    "*.secret",
+    "*.api_key",
+    "headers.authorization",
+    "headers.cookie",
+    "headers.set-cookie",
+    "headers.x-api-key",
+)
+MASK = "***"
+# Маркер листа в дереве путей
+_LEAF = "\0"
+
+BODY_FIELDS = ("http.request.body.content", "http.response.body.content")
+HEADERS_FIELDS = ("http.request.headers", "http.response.headers")
+
+# Значение после ключа: `: "строка"`, `: 123`, `: true`, `: {` или `: [`,
+# строка, оборванная в конце обрезанного тела, тоже считается значением
+RAW_VALUE_PATTERN = re.compile(
+    rb'\s*:\s*(?:(?P<nested>[\[{])|(?P<value>"(?:[^"\\]|\\.)*(?:"|\\?\Z)|[^\s,}\]]+))',
+)
+# Маркер обрезанного тела, который добавляет LoggingMiddleware
+TRUNCATED_PATTERN = re.compile(r"<truncated: \d+ bytes>\Z")
+BACKSLASH = ord("\\")
+NESTED = object()
+
+PathTree: typing.TypeAlias = dict[str, "PathTree"]
+
+
+class Masker:
+    """
+    Masks sensitive fields of logged request/response bodies and headers.
+
+    Rules are compiled once:
+    * `password` or `*.password` - field with this name at any depth of a body or headers;
+    * `headers.authorization` - header;
+    * `body.user.password` - exact path in a body, `*` matches any single key.
+
+    Names are case-insensitive. Raw JSON bodies are masked with a single regex pass
+    over the bytes, they are parsed only for `body.` path rules or nested masked values.
+    """
+
+    def __init__(self, rules: typing.Iterable[str], mask: str = MASK):
+        self.mask = mask
+        names: set[str] = set()
+        tree: PathTree = {}
+        for rule in rules:
+            parts = rule.strip().lower().split(".")
+            if len(parts) == 1 or (len(parts) == 2 and parts[0] == "*"):
+                names.add(parts[-1])
+                continue
+            node = tree
+            for part in parts:
+                node = node.setdefault(part, {})
+            node[_LEAF] = {}
+
+        self._names = frozenset(names)
+        header_tree = tree.get("headers", {})
+        self._header_names = self._names | {
+            name for name, node in header_tree.items() if _LEAF in node
+        }
+        self._body_tree: PathTree | None = tree.get("body")
+        self._mask_json = orjson.dumps(mask)
+        # Искомые подстроки: `name"`, без тех, что уже покрыты более короткими
+        # (`token"` находит и `access_token"`), ключ затем проверяется целиком
+        needles = sorted({name.encode() + b'"' for name in self._names}, key=len)
+        self._needles = tuple(
+            needle
+            for index, needle in enumerate(needles)
+            if not any(needle.endswith(shorter) for shorter in needles[:index])
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self._names or self._body_tree or self._header_names)
+
+    def mask_request_fields(self, fields: dict) -> dict:
+        """Mask bodies and headers in `request_json_fields` of a log record."""
+        result = fields
+        for key in BODY_FIELDS:
+            value = fields.get(key)
+            if value is None:
+                continue
+            if isinstance(value, str):
+                masked = self.mask_truncated(value)
+            else:
+                masked = self.mask_body(value)
+            if masked is not value:
+                result = dict(result) if result is fields else result
+                result[key] = masked
+        for key in HEADERS_FIELDS:
+            value = fields.get(key)
+            if not value:
+                continue
+            masked = self.mask_headers(value)
+            if masked is not value:
+                result = dict(result) if result is fields else result
+                result[key] = masked
+        return result
+
+    def mask_headers(self, headers: typing.Mapping[str, str]) -> typing.Mapping:
+        if not any(name.lower() in self._header_names for name in headers):
+            return headers
+        return {
+            name: self.mask if name.lower() in self._header_names else value
+            for name, value in headers.items()
+        }
+
+    def mask_body(self, body: typing.Any) -> typing.Any:
+        """Mask a body, returns the same object if nothing was masked."""
+        if isinstance(body, RawJSON):
+            return self.mask_raw(body)
+        return self._mask_value(body, self._body_tree)
+
+    def mask_raw(self, body: RawJSON) -> RawJSON:
+        if self._body_tree is None:
+            spans = self._find_raw_values(body.raw)
+            if spans is None:
+                return body
+            if spans is not NESTED:
+                return RawJSON(self._replace_spans(body.raw, spans))
+
+        # Правила путей и вложенные объекты требуют полного разбора тела
+        parsed = body.loads()
+        masked = self._mask_value(parsed, self._body_tree)
+        return body if masked is parsed else RawJSON(orjson.dumps(masked))
+
+    def mask_truncated(self, body: str) -> str:
+        """Mask the JSON prefix of a truncated body.
+
+        The prefix can't be parsed, so it is dropped if it has to be:
+        for `body.` path rules or nested masked values.
+        """
+        marker = TRUNCATED_PATTERN.search(body)
+        if marker is None or not marker.start():
+            return body
+        if self._body_tree is not None:
+            return marker.group()
+        prefix = body[: marker.start()].encode()
+        spans = self._find_raw_values(prefix)
+        if spans is None:
+            return body
+        if spans is NESTED:
+            return marker.group()
+        return (
+            self._replace_spans(prefix, spans).decode(errors="replace") + marker.group()
+        )
+
+    def _replace_spans(self, raw: bytes, spans: list[tuple[int, int]]) -> bytes:
+        parts, position = [], 0
+        for start, end in spans:
+            parts += (raw[position:start], self._mask_json)
+            position = end
+        parts.append(raw[position:])
+        return b"".join(parts)
+
+    def _find_raw_values(self, raw: bytes) -> list[tuple[int, int]] | object | None:
+        """Find spans of masked values in raw JSON without parsing it.
+
+        Returns None if there is nothing to mask and NESTED if a masked value
+        is an object or an array.
+        """
+        if not self._needles:
+            return None
+        lowered = raw.lower()
+        spans: list[tuple[int, int]] = []
+        for needle in self._needles:
+            position = lowered.find(needle)
+            while position != -1:
+                key_end = position + len(needle) - 1
+                key_start = lowered.rfind(b'"', 0, position)
+                position = lowered.find(needle, key_end + 1)
+                if key_start == -1 or (key_start and raw[key_start - 1] == BACKSLASH):
+                    continue
+                if lowered[key_start + 1 : key_end].decode(errors="replace") not in (
+                    self._names
+                ):
+                    continue
+                match = RAW_VALUE_PATTERN.match(raw, key_end + 1)
+                if match is None:
+                    continue
+                if match.group("nested"):
+                    return NESTED
+                spans.append(match.span("value"))
+        if not spans:
+            return None
+        spans.sort()
+        return spans
+
+    def _mask_value(self, value: typing.Any, node: PathTree | None) -> typing.Any:
+        if node is None and not self._names:
+            return value
+        if isinstance(value, list):
+            result = value
+            for index, item in enumerate(value):
+                masked = self._mask_value(item, node)
+                if masked is not item:
+                    result = list(value) if result is value else result
+                    result[index] = masked
+            return result
+
+        if not isinstance(value, dict):
+            return value
+
+        result = value
+        for key, item in value.items():
+            lowered = key.lower() if isinstance(key, str) else key
+            child = None
+            if node is not None:
+                child = node.get(lowered) or node.get("*")
+            if lowered in self._names or (child is not None and _LEAF in child):
+                masked = self.mask
+            else:
+                masked = self._mask_value(item, child)
+            if masked is not item:
+                result = dict(value) if result is value else result
+                result[key] = masked
+        return result
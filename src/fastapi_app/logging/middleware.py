@@ -5,98 +5,104 @@ import time
 import typing
 
 import orjson
-from fastapi import requests, responses
-from starlette import types
-from starlette.middleware.base import RequestResponseEndpoint
+from starlette import datastructures, requests, types
 
 from fastapi_app.exception_handlers import exceptions
-from fastapi_app.logging.models import RequestJsonLogSchema
+from fastapi_app.logging import timing
+from fastapi_app.logging.models import RawJSON, RequestJsonLogSchema
+from fastapi_app.logging.policy import (  # noqa: F401
+    ADMIN_ROUTE,
+    BODY_CAPTURE_LIMIT,
+    PASS_ROUTES,
+    LoggingPolicy,
+)
 
 __all__ = ("LoggingMiddleware",)
 
 EMPTY_VALUE = ""
 PORT = "8000"
-PASS_ROUTES = [
-    "/openapi.json",
-    "/docs",
-    "/health/database",
-    "/health/redis",
-]
-ADMIN_ROUTE = "/admin"
+
+# Ключи лога запроса, вычисляются один раз из алиасов RequestJsonLogSchema
+REQUEST_LOG_KEYS: dict[str, str] = {
+    name: field.alias or name
+    for name, field in RequestJsonLogSchema.model_fields.items()
+}
+JSON_BRACKETS = {ord("{"): ord("}"), ord("["): ord("]")}
+JSON_WHITESPACE = frozenset(b" \t\r\n")
 
 logger = logging.getLogger(__name__)
 
 
-@dataclasses.dataclass
-class ReceiveProxy:
-    """Proxy to starlette.types.Receive.__call__ with caching first receive call.
-    https://github.com/tiangolo/fastapi/issues/394#issuecomment-994665859
+class BodyCapture:
+    """Bounded copy of a streamed HTTP body.
+
+    Only the first `limit` bytes are kept, the rest is only counted,
+    so memory per request does not depend on the payload size.
     """
 
-    receive: types.Receive
-    cached_body: bytes
-    _is_first_call: typing.ClassVar[bool] = True
+    __slots__ = ("limit", "buffer", "size")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.buffer = bytearray()
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        free = self.limit - len(self.buffer)
+        if free > 0 and chunk:
+            self.buffer += chunk[:free]
 
-    async def __call__(self):
-        # First call will be for getting request body => returns cached result
-        if self._is_first_call:
-            self._is_first_call = False
-            return {
-                "type": "http.request",
-                "body": self.cached_body,
-                "more_body": False,
-            }
+    @property
+    def truncated(self) -> bool:
+        return self.size > len(self.buffer)
 
-        return await self.receive()
+
+@dataclasses.dataclass
+class RequestLogState:
+    """Per-request state collected by `receive`/`send` wrappers."""
+
+    request_body: BodyCapture | None
+    timings: timing.RequestTimings = dataclasses.field(
+        default_factory=timing.RequestTimings,
+    )
+    response_body: BodyCapture | None = None
+    status_code: int = 0
+    response_headers: datastructures.Headers | None = None
+    response_started: bool = False
+    sampled: bool = True
+    capture_body: bool = True
 
 
 class LoggingMiddleware:
-    """Middleware that saves logs to JSON
-    The main problem is
-    After getting request_body
-        body = await request.body()
-    Body is removed from requests. I found solution as ReceiveProxy
+    """Pure ASGI middleware that writes request/response logs in JSON.
+
+    Request and response bodies are passed through chunk by chunk,
+    only a bounded prefix of each body is copied into the log record.
+    What is logged is decided by `LoggingPolicy`.
     """
 
+    def __init__(
+        self,
+        app: types.ASGIApp,
+        policy: LoggingPolicy | None = None,
+    ) -> None:
+        self.app = app
+        self.policy = policy or LoggingPolicy()
+
     @staticmethod
-    async def get_protocol(request: requests.Request) -> str:
-        protocol = str(request.scope.get("type", ""))
-        http_version = str(request.scope.get("http_version", ""))
+    def get_protocol(scope: types.Scope) -> str:
+        protocol = str(scope.get("type", ""))
+        http_version = str(scope.get("http_version", ""))
         if protocol.lower() == "http" and http_version:
             return f"{protocol.upper()}/{http_version}"
         return EMPTY_VALUE
 
-    async def get_request_body(self, request: requests.Request) -> typing.Dict | str:
-        """Get request body, handling binary content types safely."""
-        request_content_type = request.headers.get("content-type", "")
-
-        # Check if request contains binary data that shouldn't be logged
-        if self._is_binary_content_type(request_content_type):
-            # For binary requests (multipart/form-data, images, etc.), don't read body
-            # Return placeholder instead to avoid UnicodeDecodeError
-            # Don't create ReceiveProxy since we're not reading the body
-            return f"<binary data: {request_content_type.split(';')[0]}>"
-
-        # For non-binary requests, read and parse body as usual
-        body_bytes = await request.body()
-        body = self.try_to_loads(body_bytes)
-
-        # Ensure body is never bytes - convert to string if needed
-        if isinstance(body, bytes):
-            body = "<non-json binary data>"
-
-        # Create ReceiveProxy with original bytes for request replay
-        request._receive = ReceiveProxy(  # pyright: ignore[reportArgumentType]
-            receive=request.receive,
-            cached_body=body_bytes,
-        )
-        return body
-
     def try_to_loads(self, data) -> typing.Dict | str:
         """Try to parse JSON, return string if not JSON or if data is bytes."""
         try:
             # If data is bytes, try to decode as JSON
-            if isinstance(data, bytes):
+            if isinstance(data, (bytes, bytearray)):
                 try:
                     return orjson.loads(data)
                 except (orjson.JSONDecodeError, UnicodeDecodeError):
@@ -112,10 +118,49 @@ class LoggingMiddleware:
             return data
         except Exception:
             # Fallback: return string representation or placeholder
-            if isinstance(data, bytes):
+            if isinstance(data, (bytes, bytearray)):
                 return "<non-json binary data>"
             return str(data) if data else ""
 
+    @staticmethod
+    def get_raw_json(body: bytearray, content_type: str) -> RawJSON | None:
+        """Validate a JSON object or array body to embed it into the log line as is.
+
+        The body is parsed once to validate it, but it is not re-encoded.
+        """
+        if "json" not in content_type:
+            return None
+        start, end = 0, len(body) - 1
+        while start < end and body[start] in JSON_WHITESPACE:
+            start += 1
+        while end > start and body[end] in JSON_WHITESPACE:
+            end -= 1
+        if start >= end or JSON_BRACKETS.get(body[start]) != body[end]:
+            return None
+        raw = bytes(body[start : end + 1])
+        try:
+            # Без проверки тело вида `{...}, "key": {...}` подменило бы поля лога
+            orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return None
+        return RawJSON(raw)
+
+    def get_body_content(
+        self,
+        capture: BodyCapture | None,
+        content_type: str,
+    ) -> dict | str | RawJSON:
+        """Convert captured body prefix to the log representation."""
+        if capture is None:
+            return f"<binary data: {content_type.split(';')[0]}>"
+        if capture.truncated:
+            # Обрезанный JSON не распарсить, логируем начало тела как текст
+            prefix = bytes(capture.buffer).decode(errors="replace")
+            return f"{prefix}<truncated: {capture.size} bytes>"
+        if raw := self.get_raw_json(capture.buffer, content_type):
+            return raw
+        return self.try_to_loads(capture.buffer)
+
     @staticmethod
     def _is_binary_content_type(content_type: str) -> bool:
         """Check if content type is binary (image, video, audio, multipart, etc.)"""
@@ -143,101 +188,187 @@ class LoggingMiddleware:
 
     async def __call__(
         self,
-        request: requests.Request,
-        call_next: RequestResponseEndpoint,
-        *args,
-        **kwargs,
-    ):
-        # logger.debug(f"Started Middleware: {__name__}")
-        start_time = time.time()
+        scope: types.Scope,
+        receive: types.Receive,
+        send: types.Send,
+    ) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # pass /openapi.json /docs /admin
+        path = scope["path"]
+        if self.policy.is_excluded(path):
+            return await self.app(scope, receive, send)
+
+        start_ns = time.perf_counter_ns()
+        response_start_ns = 0
         exception_object = None
-        request_body = await self.get_request_body(request)
-        request_headers: typing.Dict = dict(request.headers.items())
+        request_headers = datastructures.Headers(scope=scope)
+        request_content_type = request_headers.get("content-type", EMPTY_VALUE)
+        max_body_bytes = self.policy.max_body_bytes
+        state = RequestLogState(
+            request_body=None
+            if max_body_bytes <= 0 or self._is_binary_content_type(request_content_type)
+            else BodyCapture(max_body_bytes),
+        )
+
+        async def receive_wrapper() -> types.Message:
+            receive_start_ns = time.perf_counter_ns()
+            message = await receive()
+            if message["type"] == "http.request":
+                state.timings.add(
+                    "request_body",
+                    time.perf_counter_ns() - receive_start_ns,
+                )
+                if state.request_body is not None:
+                    state.request_body.feed(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: types.Message) -> None:
+            nonlocal response_start_ns
+            if message["type"] == "http.response.start":
+                response_start_ns = time.perf_counter_ns()
+                state.timings.add(
+                    "handler",
+                    response_start_ns
+                    - start_ns
+                    - state.timings.phases.get("request_body", 0),
+                )
+                if self.policy.server_timing:
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (
+                                b"server-timing",
+                                state.timings.server_timing().encode("latin-1"),
+                            ),
+                        ],
+                    }
+                state.response_started = True
+                state.status_code = message["status"]
+                state.response_headers = datastructures.Headers(
+                    raw=message.get("headers", []),
+                )
+                state.sampled = self.policy.is_sampled(path, state.status_code)
+                state.capture_body = state.sampled and self.policy.capture_body(
+                    state.status_code,
+                )
+                response_content_type = state.response_headers.get("content-type", "")
+                if state.capture_body and not self._is_binary_content_type(
+                    response_content_type,
+                ):
+                    state.response_body = BodyCapture(max_body_bytes)
+            elif (
+                message["type"] == "http.response.body"
+                and state.response_body is not None
+            ):
+                state.response_body.feed(message.get("body", b""))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body",
+                False,
+            ):
+                state.timings.add(
+                    "response", time.perf_counter_ns() - response_start_ns
+                )
 
-        # Response Side
         try:
-            response = await call_next(request)
+            with timing.activate(state.timings):
+                await self.app(scope, receive_wrapper, send_wrapper)
         except Exception as ex:
             logger.error(f"Exception: {ex}")
-            response = exceptions.python_base_error_handler(request, ex)
-            response_body = response.body
+            if state.response_started:
+                raise
             exception_object = ex
-            response_headers = {}
-        else:
-            response_headers = dict(response.headers.items())
-            response_body = b""
-            original_media_type = response.headers.get("content-type", "")
-
-            async for chunk in response.body_iterator:
-                response_body += chunk
-
-            # Preserve original media type, don't force application/json
-            media_type = (
-                original_media_type.split(";")[0] if original_media_type else None
+            response = exceptions.python_base_error_handler(
+                requests.Request(scope),
+                ex,
             )
-            if not media_type:
-                # Try to get from response if available
-                if hasattr(response, "media_type") and response.media_type:
-                    media_type = response.media_type
-                else:
-                    media_type = "application/json"
-
-            response = responses.Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=media_type,
-            )
-
-        # pass /openapi.json /docs /admin
-        if request.url.path in PASS_ROUTES:
-            return response
-        if request.url.path.startswith(ADMIN_ROUTE):
-            return response
+            await response(scope, receive, send_wrapper)
 
-        duration: int = math.ceil((time.time() - start_time) * 1000)
+        duration: int = math.ceil((time.perf_counter_ns() - start_ns) / 1_000_000)
+        self.log_request(scope, request_headers, state, duration, exception_object)
 
-        # Check if response is binary (image, video, etc.)
-        response_media_type = (
-            response.headers.get("content-type", "").split(";")[0].lower()
+    def log_request(
+        self,
+        scope: types.Scope,
+        request_headers: datastructures.Headers,
+        state: RequestLogState,
+        duration: int,
+        exception_object: Exception | None,
+    ) -> None:
+        if not state.response_started or not state.sampled:
+            return
+        log_start_ns = time.perf_counter_ns()
+        request = requests.Request(scope)
+        response_headers = state.response_headers or datastructures.Headers()
+        request_content_type = request_headers.get("content-type", EMPTY_VALUE)
+        response_content_type = response_headers.get("content-type", EMPTY_VALUE)
+
+        request_body_bytes = (
+            state.request_body.size
+            if state.request_body and state.request_body.size
+            else int(request_headers.get("content-length", 0))
         )
-        is_binary_response = self._is_binary_content_type(response_media_type)
-
-        # For binary responses, don't try to parse as JSON
-        if is_binary_response:
-            response_body_content = f"<binary data: {response_media_type}>"
+        response_body_bytes = (
+            state.response_body.size
+            if state.response_body
+            else int(response_headers.get("content-length", 0))
+        )
+        if state.capture_body:
+            request_body_content = self.get_body_content(
+                state.request_body,
+                request_content_type,
+            )
+            response_body_content = self.get_body_content(
+                state.response_body,
+                response_content_type,
+            )
         else:
-            response_body_content = self.try_to_loads(response_body)
+            request_body_content = response_body_content = EMPTY_VALUE
 
-        # Ensure request_body is never bytes - convert to string if needed
-        # This is a safety check in case bytes somehow got through
-        if isinstance(request_body, bytes):
-            request_body = "<non-json binary data>"
+        request_headers_content = response_headers_content = None
+        if self.policy.capture_headers:
+            request_headers_content = dict(request_headers.items())
+            response_headers_content = dict(response_headers.items())
 
-        # Initializing of json fields
-        request_json_fields = RequestJsonLogSchema(
+        # Initializing of json fields, same as RequestJsonLogSchema.model_dump(by_alias=True)
+        request_json_fields = {
             # Request side
-            url_path=str(request.url.path),
-            url_query=str(request.url.query),
-            http_request_referer=request_headers.get("referer", EMPTY_VALUE),
-            http_request_method=request.method,
-            http_request_mime_type=request_headers.get("content-type", EMPTY_VALUE),
-            http_request_idempotency_key=request_headers.get(
+            REQUEST_LOG_KEYS["url_path"]: request.url.path,
+            REQUEST_LOG_KEYS["url_query"]: request.url.query,
+            REQUEST_LOG_KEYS["http_request_method"]: request.method,
+            REQUEST_LOG_KEYS["http_request_mime_type"]: request_content_type,
+            REQUEST_LOG_KEYS["http_request_idempotency_key"]: request_headers.get(
                 "idempotency-key",
                 EMPTY_VALUE,
             ),
-            http_request_body_content=request_body,
-            http_request_body_bytes=int(request_headers.get("content-length", 0)),
+            REQUEST_LOG_KEYS["http_request_body_content"]: request_body_content,
+            REQUEST_LOG_KEYS["http_request_body_bytes"]: request_body_bytes,
+            REQUEST_LOG_KEYS["http_request_referer"]: request_headers.get(
+                "referer",
+                EMPTY_VALUE,
+            ),
             # Response side
-            http_response_status_code=response.status_code,
-            http_response_body_bytes=int(response_headers.get("content-length", 0)),
-            http_response_body_content=response_body_content,
-            duration=duration,
-        ).model_dump(mode="json", by_alias=True)
+            REQUEST_LOG_KEYS["http_response_status_code"]: state.status_code,
+            REQUEST_LOG_KEYS["http_response_body_content"]: response_body_content,
+            REQUEST_LOG_KEYS["http_response_body_bytes"]: response_body_bytes,
+            REQUEST_LOG_KEYS["http_response_mime_type"]: None,
+            REQUEST_LOG_KEYS["http_request_headers"]: request_headers_content,
+            REQUEST_LOG_KEYS["http_response_headers"]: response_headers_content,
+            REQUEST_LOG_KEYS["user_id"]: None,
+            REQUEST_LOG_KEYS["user_domain"]: None,
+            REQUEST_LOG_KEYS["operation"]: None,
+        }
+        state.timings.add("log", time.perf_counter_ns() - log_start_ns)
+        request_json_fields[REQUEST_LOG_KEYS["timings"]] = (
+            state.timings.as_milliseconds()
+        )
 
         message = (
-            f'{"Error" if exception_object else "Answer"} '
-            f"code: {response.status_code} "
+            f"{'Error' if exception_object else 'Answer'} "
+            f"code: {state.status_code} "
             f'request url: {request.method} "{str(request.url)}" '
             f"duration: {duration} ms "
         )
@@ -246,7 +377,7 @@ class LoggingMiddleware:
             extra={
                 "request_json_fields": request_json_fields,
                 "to_mask": True,
+                "duration": duration,
             },
             exc_info=exception_object,
         )
-        return response
@@ -1,8 +1,29 @@
 import typing
 
+import orjson
 import pydantic
 
 
+class RawJSON:
+    """
+    Already serialized JSON, embedded into the log line without re-encoding
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RawJSON) and self.raw == other.raw
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.raw!r})"
+
+    def loads(self) -> typing.Any:
+        return orjson.loads(self.raw)
+
+
 class BaseJsonLogSchema(pydantic.BaseModel):
     """
     Main log in JSON format
@@ -63,8 +84,10 @@ class RequestJsonLogSchema(pydantic.BaseModel):
     http_request_idempotency_key: typing.Text = pydantic.Field(
         alias="http.request.idempotency_key",
     )
-    http_request_body_content: typing.Union[typing.Dict, bytes, str] = pydantic.Field(
-        alias="http.request.body.content",
+    http_request_body_content: typing.Union[typing.Dict, bytes, str, RawJSON] = (
+        pydantic.Field(
+            alias="http.request.body.content",
+        )
     )
     http_request_body_bytes: pydantic.NonNegativeInt = pydantic.Field(
         alias="http.request.body.bytes",
@@ -74,10 +97,10 @@ class RequestJsonLogSchema(pydantic.BaseModel):
     http_response_status_code: pydantic.PositiveInt = pydantic.Field(
         alias="http.response.status_code",
     )
-    http_response_body_content: typing.Union[typing.Dict, bytes, typing.List] = (
-        pydantic.Field(
-            alias="http.response.body.content",
-        )
+    http_response_body_content: typing.Union[
+        typing.Dict, bytes, str, typing.List, RawJSON
+    ] = pydantic.Field(
+        alias="http.response.body.content",
     )
     http_response_body_bytes: pydantic.NonNegativeInt = pydantic.Field(
         alias="http.response.body.bytes",
@@ -87,8 +110,26 @@ class RequestJsonLogSchema(pydantic.BaseModel):
         alias="http.response.mime_type",
         default=None,
     )
+    http_request_headers: typing.Dict[typing.Text, typing.Text] | None = pydantic.Field(
+        alias="http.request.headers",
+        default=None,
+    )
+    http_response_headers: typing.Dict[typing.Text, typing.Text] | None = (
+        pydantic.Field(
+            alias="http.response.headers",
+            default=None,
+        )
+    )
     user_id: typing.Text | None = pydantic.Field(alias="user.id", default=None)
     user_domain: typing.Text | None = pydantic.Field(alias="user.domain", default=None)
     operation: typing.Text | None = None
+    timings: typing.Dict[typing.Text, float] | None = pydantic.Field(
+        alias="http.server.timings",
+        default=None,
+        description="Request phase durations in ms",
+    )
 
-    model_config = pydantic.ConfigDict(populate_by_name=True)
+    model_config = pydantic.ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+    )
@@ -0,0 +1,110 @@
+import dataclasses
+import random
+import typing
+
+__all__ = ("LoggingPolicy",)
+
+PASS_ROUTES = (
+    "/openapi.json",
+    "/docs",
+    "/health/database",
+    "/health/redis",
+)
+ADMIN_ROUTE = "/admin"
+# Максимальное количество байт тела запроса/ответа, попадающее в лог
+BODY_CAPTURE_LIMIT = 16 * 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class LoggingPolicy:
+    """
+    Request/response logging policy of `LoggingMiddleware`.
+
+    Status classes are the first digit of the status code: `2` for 2xx, `5` for 5xx.
+
+    ## Пример использования
+
+    ```python
+    policy = LoggingPolicy(
+        max_body_bytes=4096,
+        body_status_classes={4, 5},
+        sample_rates={2: 0.01, 5: 1.0},
+        route_sample_rates={"/orders": {2: 0.1}},
+    )
+    ```
+    """
+
+    # Сколько байт каждого тела попадает в лог, 0 - тела не логируются
+    max_body_bytes: int = BODY_CAPTURE_LIMIT
+    # Для каких классов статусов логируются тела, None - для всех
+    body_status_classes: typing.Collection[int] | None = None
+    # Доля логируемых запросов по классу статуса, по умолчанию 1.0
+    sample_rates: typing.Mapping[int, float] = dataclasses.field(default_factory=dict)
+    # Доли по префиксу пути, перекрывают `sample_rates` для указанных классов
+    route_sample_rates: typing.Mapping[str, typing.Mapping[int, float]] = (
+        dataclasses.field(default_factory=dict)
+    )
+    # Пути, которые не логируются (точное совпадение)
+    excluded_routes: typing.Collection[str] = PASS_ROUTES
+    # Префиксы путей, которые не логируются
+    excluded_prefixes: typing.Collection[str] = (ADMIN_ROUTE,)
+    # Логировать заголовки запроса и ответа (маскируются правилами `headers.*`)
+    capture_headers: bool = False
+    # Добавлять заголовок `Server-Timing` с фазами, завершенными до ответа
+    server_timing: bool = False
+
+    _excluded_routes: frozenset[str] = dataclasses.field(init=False, repr=False)
+    _excluded_prefixes: tuple[str, ...] = dataclasses.field(init=False, repr=False)
+    _body_status_classes: frozenset[int] | None = dataclasses.field(
+        init=False,
+        repr=False,
+    )
+    _route_sample_rates: tuple[tuple[str, dict[int, float]], ...] = dataclasses.field(
+        init=False,
+        repr=False,
+    )
+
+    def __post_init__(self) -> None:
+        # Компилируем правила один раз, чтобы не делать этого на каждый запрос
+        compiled = {
+            "_excluded_routes": frozenset(self.excluded_routes),
+            "_excluded_prefixes": tuple(self.excluded_prefixes),
+            "_body_status_classes": None
+            if self.body_status_classes is None
+            else frozenset(self.body_status_classes),
+            # Самый длинный префикс проверяется первым
+            "_route_sample_rates": tuple(
+                (prefix, {**self.sample_rates, **rates})
+                for prefix, rates in sorted(
+                    self.route_sample_rates.items(),
+                    key=lambda item: len(item[0]),
+                    reverse=True,
+                )
+            ),
+        }
+        for name, value in compiled.items():
+            object.__setattr__(self, name, value)
+
+    def is_excluded(self, path: str) -> bool:
+        return path in self._excluded_routes or path.startswith(self._excluded_prefixes)
+
+    def sample_rate(self, path: str, status_code: int) -> float:
+        rates = self.sample_rates
+        for prefix, route_rates in self._route_sample_rates:
+            if path.startswith(prefix):
+                rates = route_rates
+                break
+        return rates.get(status_code // 100, 1.0)
+
+    def is_sampled(self, path: str, status_code: int) -> bool:
+        rate = self.sample_rate(path, status_code)
+        if rate >= 1.0:
+            return True
+        return rate > 0.0 and random.random() < rate
+
+    def capture_body(self, status_code: int) -> bool:
+        if self.max_body_bytes <= 0:
+            return False
+        if self._body_status_classes is None:
+            return True
+        return status_code // 100 in self._body_status_classes
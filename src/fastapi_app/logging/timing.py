@@ -0,0 +1,88 @@
+"""
+Per-request phase timings.
+
+`LoggingMiddleware` opens a `RequestTimings` for every request, dependencies
+and handlers add their own spans to it:
+
+```python
+from fastapi_app.logging import timing
+
+async def get_user(user_id: int):
+    with timing.span("db"):
+        return await repository.get(user_id)
+```
+
+Span names go to the `Server-Timing` header as is, so they must be tokens
+without spaces, commas and semicolons.
+"""
+
+import contextlib
+import contextvars
+import time
+import typing
+
+__all__ = ("RequestTimings", "current", "record", "span")
+
+
+class RequestTimings:
+    """Phase durations of a single request in nanoseconds."""
+
+    __slots__ = ("phases",)
+
+    def __init__(self) -> None:
+        self.phases: dict[str, int] = {}
+
+    def add(self, name: str, duration_ns: int) -> None:
+        self.phases[name] = self.phases.get(name, 0) + duration_ns
+
+    def as_milliseconds(self) -> dict[str, float]:
+        return {name: round(ns / 1_000_000, 3) for name, ns in self.phases.items()}
+
+    def server_timing(self) -> str:
+        """Value of the `Server-Timing` header."""
+        return ", ".join(
+            f"{name};dur={ns / 1_000_000:.3f}" for name, ns in self.phases.items()
+        )
+
+
+_request_timings: contextvars.ContextVar[RequestTimings | None] = (
+    contextvars.ContextVar("request_timings", default=None)
+)
+
+
+def current() -> RequestTimings | None:
+    return _request_timings.get()
+
+
+@contextlib.contextmanager
+def activate(timings: RequestTimings) -> typing.Iterator[RequestTimings]:
+    """Make `timings` current for the wrapped code, used by `LoggingMiddleware`."""
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def record(name: str, duration_ns: int) -> None:
+    """Add an already measured duration to the current request."""
+    if (timings := _request_timings.get()) is not None:
+        timings.add(name, duration_ns)
+
+
+@contextlib.contextmanager
+def span(name: str) -> typing.Iterator[None]:
+    """Measure the wrapped block with `perf_counter_ns` as phase `name`.
+
+    Does nothing outside of a request handled by `LoggingMiddleware`.
+    Repeated spans with the same name are summed.
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter_ns() - start)
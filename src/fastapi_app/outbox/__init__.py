@@ -0,0 +1,11 @@
+from fastapi_app.outbox.models import add_event, add_events, metadata, outbox_table
+from fastapi_app.outbox.relay import OutboxRelay, lifespan
+
+__all__ = (
+    "OutboxRelay",
+    "add_event",
+    "add_events",
+    "lifespan",
+    "metadata",
+    "outbox_table",
+)
@@ -0,0 +1,82 @@
+import typing
+
+import sqlalchemy as sa
+from sqlalchemy.ext import asyncio as sa_asyncio
+
+__all__ = ("add_event", "add_events", "metadata", "outbox_table")
+
+metadata = sa.MetaData()
+
+outbox_table = sa.Table(
+    "outbox",
+    metadata,
+    sa.Column(
+        "id",
+        sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    ),
+    sa.Column("topic", sa.String(255), nullable=False),
+    sa.Column("key", sa.LargeBinary, nullable=True),
+    sa.Column("value", sa.LargeBinary, nullable=True),
+    sa.Column("headers", sa.JSON, nullable=True),
+    sa.Column(
+        "created_at",
+        sa.DateTime(timezone=True),
+        nullable=False,
+        server_default=sa.func.now(),
+    ),
+    sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+)
+
+# Relay выбирает только неотправленные события, частичный индекс остается маленьким
+sa.Index(
+    "ix_outbox_unsent",
+    outbox_table.c.id,
+    postgresql_where=outbox_table.c.sent_at.is_(None),
+    sqlite_where=outbox_table.c.sent_at.is_(None),
+)
+
+Session: typing.TypeAlias = sa_asyncio.AsyncSession | sa_asyncio.AsyncConnection
+
+
+def _row(
+    topic: str,
+    value: bytes | None,
+    key: bytes | None = None,
+    headers: typing.Mapping[str, str] | None = None,
+) -> dict[str, typing.Any]:
+    return {
+        "topic": topic,
+        "key": key,
+        "value": value,
+        "headers": dict(headers) if headers else None,
+    }
+
+
+async def add_event(
+    session: Session,
+    topic: str,
+    value: bytes | None,
+    key: bytes | None = None,
+    headers: typing.Mapping[str, str] | None = None,
+    table: sa.Table = outbox_table,
+) -> None:
+    """
+    Add an event to the outbox within the current transaction of `session`.
+
+    The event is published by `OutboxRelay` only if the transaction is committed.
+    """
+    await session.execute(sa.insert(table).values(**_row(topic, value, key, headers)))
+
+
+async def add_events(
+    session: Session,
+    topic: str,
+    events: typing.Iterable[tuple[bytes | None, bytes | None]],
+    table: sa.Table = outbox_table,
+) -> None:
+    """Add `(key, value)` events of one topic to the outbox with a single statement."""
+    rows = [_row(topic, value, key) for key, value in events]
+    if rows:
+        await session.execute(sa.insert(table), rows)
@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import signal
+import typing
+
+import sqlalchemy as sa
+from sqlalchemy.ext import asyncio as sa_asyncio
+from starlette import types
+
+from fastapi_app.outbox import models
+
+if typing.TYPE_CHECKING:
+    from fastapi_app.kafka import producer
+
+__all__ = ("OutboxRelay", "lifespan")
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Publishes outbox events to Kafka.
+
+    Every iteration claims up to `batch_size` unsent rows with `SELECT ... FOR UPDATE SKIP LOCKED`,
+    so several relays can run at once, publishes them with `KafkaProducer.send_many` and marks
+    them sent (or deletes them with `delete_sent`) in the same transaction. Events are published
+    at least once: if the transaction fails after publishing, they are published again.
+    When there are no more events the relay waits `poll_interval` seconds.
+    A producer that is not started yet is started by the relay and stopped when it stops,
+    a producer started elsewhere (e.g. by `kafka_producers` of the application) is left running.
+    """
+
+    def __init__(
+        self,
+        engine: sa_asyncio.AsyncEngine,
+        kafka_producer: "producer.KafkaProducer",
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        delete_sent: bool = False,
+        table: sa.Table = models.outbox_table,
+    ):
+        self._engine = engine
+        self._producer = kafka_producer
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._delete_sent = delete_sent
+        self._table = table
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of events, return the number of published events."""
+        table = self._table
+        async with self._engine.begin() as connection:
+            rows = (
+                await connection.execute(
+                    sa.select(
+                        table.c.id,
+                        table.c.topic,
+                        table.c.key,
+                        table.c.value,
+                        table.c.headers,
+                    )
+                    .where(table.c.sent_at.is_(None))
+                    .order_by(table.c.id)
+                    .limit(self._batch_size)
+                    .with_for_update(skip_locked=True),
+                )
+            ).all()
+            if not rows:
+                return 0
+            await self._publish(rows)
+            ids = [row.id for row in rows]
+            if self._delete_sent:
+                await connection.execute(sa.delete(table).where(table.c.id.in_(ids)))
+            else:
+                await connection.execute(
+                    sa.update(table)
+                    .where(table.c.id.in_(ids))
+                    .values(sent_at=sa.func.now())
+                )
+        return len(rows)
+
+    async def _publish(self, rows: typing.Sequence[sa.Row]) -> None:
+        from fastapi_app.kafka import producer
+
+        # Порядок событий внутри топика сохраняется, топики отправляются параллельно
+        by_topic = itertools.groupby(
+            sorted(rows, key=lambda row: (row.topic, row.id)), key=lambda row: row.topic
+        )
+        await asyncio.gather(
+            *(
+                self._producer.send_many(
+                    topic,
+                    [
+                        producer.ProducerRecord(
+                            row.value,
+                            key=row.key,
+                            headers=[
+                                (name, value.encode())
+                                for name, value in (row.headers or {}).items()
+                            ],
+                        )
+                        for row in topic_rows
+                    ],
+                )
+                for topic, topic_rows in by_topic
+            ),
+        )
+
+    async def run(self) -> None:
+        """Relay events until `stop`."""
+        owns_producer = not self._producer.started
+        await self._producer.start()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    published = await self.relay_batch()
+                except Exception as e:
+                    logger.error(f"Failed to relay outbox events: {e}")
+                    published = 0
+                if published < self._batch_size:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(
+                            self._stopping.wait(), self._poll_interval
+                        )
+        finally:
+            if owns_producer:
+                await self._producer.stop()
+
+    async def start(self) -> None:
+        """Start `run` as a background task."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the background task after the current batch."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._stopping.set()
+        await task
+
+    def serve(self) -> None:
+        """Run the relay as a standalone process until SIGTERM or SIGINT."""
+
+        async def main() -> None:
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, self._stopping.set)
+            try:
+                await self.run()
+            finally:
+                await self._engine.dispose()
+
+        asyncio.run(main())
+
+
+def lifespan(
+    *relays: OutboxRelay,
+    lifespan_handler: types.Lifespan[types.AppType] | None = None,
+) -> types.Lifespan[types.AppType]:
+    """Lifespan running outbox relays as background tasks, they are stopped before `lifespan_handler` exits."""
+
+    @contextlib.asynccontextmanager
+    async def handler(app: types.AppType) -> typing.AsyncIterator[typing.Any]:
+        async with contextlib.AsyncExitStack() as stack:
+            state = None
+            if lifespan_handler is not None:
+                state = await stack.enter_async_context(lifespan_handler(app))
+            for relay in relays:
+                await relay.start()
+                stack.push_async_callback(relay.stop)
+            yield state
+
+    return handler
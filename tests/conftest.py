@@ -1,16 +1,23 @@
 import asyncio
 import os
+import typing
 
+import fakeredis
 import fastapi
 import httpx
 import pytest
 from fastapi import responses, status
+from idempotency_header_middleware.backends import base
 from opentelemetry.sdk import trace
 from opentelemetry.sdk.trace import export
 from opentelemetry.sdk.trace.export import in_memory_span_exporter
+from sqlalchemy.ext import asyncio as sa_asyncio
 
 import fastapi_app
-from tests.mock import idempotency_mock_api
+from fastapi_app.idempotency import backends
+from fastapi_app.logging import LoggingPolicy
+from fastapi_app.outbox import models as outbox_models
+from tests.mock import idempotency_mock_api, logging_mock_api
 
 
 @pytest.fixture(scope="session")
@@ -74,11 +81,53 @@ def api_with_auth() -> httpx.AsyncClient:
     return get_test_client(app)
 
 
+@pytest.fixture
+def api_with_logging() -> httpx.AsyncClient:
+    return get_test_client(logging_mock_api.create_app())
+
+
+@pytest.fixture
+def api_with_logging_policy() -> typing.Callable[[LoggingPolicy], httpx.AsyncClient]:
+    def factory(policy: LoggingPolicy) -> httpx.AsyncClient:
+        return get_test_client(logging_mock_api.create_app(policy))
+
+    return factory
+
+
 @pytest.fixture
 def api_with_idempotency() -> httpx.AsyncClient:
     return get_test_client(idempotency_mock_api.mock_app)
 
 
+@pytest.fixture
+def redis_backend() -> backends.RedisBackend:
+    return backends.RedisBackend(fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture
+def api_with_redis_idempotency(redis_backend) -> httpx.AsyncClient:
+    return get_test_client(idempotency_mock_api.create_app(redis_backend))
+
+
+@pytest.fixture
+def api_with_idempotency_backend() -> typing.Callable[..., httpx.AsyncClient]:
+    def factory(backend: base.Backend, **kwargs) -> httpx.AsyncClient:
+        return get_test_client(idempotency_mock_api.create_app(backend, **kwargs))
+
+    return factory
+
+
+@pytest.fixture
+async def outbox_engine(tmp_path) -> typing.AsyncIterator[sa_asyncio.AsyncEngine]:
+    engine = sa_asyncio.create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'outbox.db'}"
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(outbox_models.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
 @pytest.fixture
 def api_with_sentry() -> httpx.AsyncClient:
     app = fastapi_app.create(
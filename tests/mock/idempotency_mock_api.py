@@ -1,34 +1,74 @@
+import asyncio
 import uuid
 
+import fastapi
 import pydantic
 from fastapi import responses, status
 from idempotency_header_middleware import backends
+from idempotency_header_middleware.backends import base
 
 import fastapi_app
+from fastapi_app.idempotency import cache
 
 mock_storage = set()
-mock_app = fastapi_app.create(
-    debug=True,
-    description="Mock API",
-    middlewares=[],
-    startup_tasks=[],
-    shutdown_tasks=[],
-    global_dependencies=[],
-    idempotency_require=True,
-    idempotency_backed=backends.MemoryBackend(),
-    idempotency_methods=["POST", "DELETE", "PUT"],
-    auth_require=False,
-)
+# Значения `bar`, с которыми был вызван медленный обработчик
+slow_calls = []
 
 
 class Foo(pydantic.BaseModel):
     bar: uuid.UUID
 
 
-@mock_app.post("/idempotency", status_code=status.HTTP_200_OK)
-async def mock_create_something(body: Foo):
-    if body.bar in mock_storage:
-        return responses.JSONResponse({}, status_code=status.HTTP_409_CONFLICT)
-    else:
-        mock_storage.add(body.bar)
-        return responses.JSONResponse({}, status_code=status.HTTP_200_OK)
+def create_app(
+    backend: base.Backend,
+    response_cache: cache.ResponseCache | None = None,
+    wait_timeout: float | None = None,
+    max_body_bytes: int | None = 1024 * 1024,
+) -> fastapi.FastAPI:
+    app = fastapi_app.create(
+        debug=True,
+        description="Mock API",
+        middlewares=[],
+        startup_tasks=[],
+        shutdown_tasks=[],
+        global_dependencies=[],
+        idempotency_require=True,
+        idempotency_backed=backend,
+        idempotency_methods=["POST", "DELETE", "PUT"],
+        idempotency_cache=response_cache,
+        idempotency_wait_timeout=wait_timeout,
+        idempotency_max_body_bytes=max_body_bytes,
+        auth_require=False,
+    )
+
+    @app.post("/idempotency", status_code=status.HTTP_200_OK)
+    async def mock_create_something(body: Foo):
+        if body.bar in mock_storage:
+            return responses.JSONResponse({}, status_code=status.HTTP_409_CONFLICT)
+        else:
+            mock_storage.add(body.bar)
+            return responses.JSONResponse({}, status_code=status.HTTP_200_OK)
+
+    @app.post("/idempotency/stream", status_code=status.HTTP_201_CREATED)
+    async def mock_stream_something():
+        async def chunks():
+            for index in range(3):
+                yield f"{uuid.uuid4()}-{index};".encode()
+
+        return responses.StreamingResponse(
+            chunks(),
+            status_code=status.HTTP_201_CREATED,
+            media_type="text/csv",
+            headers={"ETag": str(uuid.uuid4()), "X-Request-Id": str(uuid.uuid4())},
+        )
+
+    @app.post("/idempotency/slow", status_code=status.HTTP_200_OK)
+    async def mock_slow_something(body: Foo):
+        slow_calls.append(body.bar)
+        await asyncio.sleep(0.05)
+        return {"bar": str(body.bar), "call": len(slow_calls)}
+
+    return app
+
+
+mock_app = create_app(backends.MemoryBackend())
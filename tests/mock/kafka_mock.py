@@ -0,0 +1,257 @@
+import asyncio
+import typing
+
+from aiokafka import structs
+
+TOPIC = "topic"
+
+
+def make_record(
+    partition: int,
+    offset: int,
+    value: bytes = b"{}",
+    key: bytes | None = None,
+    topic: str = TOPIC,
+) -> structs.ConsumerRecord:
+    return structs.ConsumerRecord(
+        topic=topic,
+        partition=partition,
+        offset=offset,
+        timestamp=0,
+        timestamp_type=0,
+        key=key,
+        value=value,
+        checksum=None,
+        serialized_key_size=len(key or b""),
+        serialized_value_size=len(value),
+        headers=[],
+    )
+
+
+class FakeAIOKafkaConsumer:
+    """In-memory stand-in of `aiokafka.AIOKafkaConsumer` with a fixed assignment."""
+
+    def __init__(self, partitions: int = 1, topic: str = TOPIC):
+        self.topic = topic
+        self.records: dict[structs.TopicPartition, list[structs.ConsumerRecord]] = {
+            structs.TopicPartition(topic, partition): []
+            for partition in range(partitions)
+        }
+        self.positions = {tp: 0 for tp in self.records}
+        self.paused_partitions: set[structs.TopicPartition] = set()
+        self.commits: list[dict[structs.TopicPartition, int]] = []
+        self.listener = None
+        self.started = False
+        self.stopped = False
+        self._produced = asyncio.Event()
+
+    def produce(
+        self, partition: int, value: bytes = b"{}", key: bytes | None = None
+    ) -> structs.ConsumerRecord:
+        tp = structs.TopicPartition(self.topic, partition)
+        record = make_record(partition, len(self.records[tp]), value, key, self.topic)
+        self.records[tp].append(record)
+        self._produced.set()
+        return record
+
+    @property
+    def committed_offsets(self) -> dict[structs.TopicPartition, int]:
+        offsets: dict[structs.TopicPartition, int] = {}
+        for commit in self.commits:
+            offsets.update(commit)
+        return offsets
+
+    def is_committed(self) -> bool:
+        """All produced records are committed."""
+        committed = self.committed_offsets
+        return all(
+            committed.get(tp, 0) == len(records) for tp, records in self.records.items()
+        )
+
+    async def start(self) -> None:
+        self.started = True
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+    async def committed(self, partition: structs.TopicPartition) -> int | None:
+        return self.committed_offsets.get(partition)
+
+    def subscription(self) -> set[str]:
+        return {self.topic}
+
+    def subscribe(self, topics=(), pattern=None, listener=None) -> None:
+        self.listener = listener
+
+    async def revoke(self, *partitions: structs.TopicPartition) -> None:
+        """Revoke partitions as a rebalance would, they are assigned back right after."""
+        if self.listener is not None:
+            await self.listener.on_partitions_revoked(set(partitions))
+            await self.listener.on_partitions_assigned(set(partitions))
+
+    def assignment(self) -> set[structs.TopicPartition]:
+        return set(self.records)
+
+    def highwater(self, partition: structs.TopicPartition) -> int | None:
+        return len(self.records[partition]) if partition in self.records else None
+
+    def pause(self, *partitions: structs.TopicPartition) -> None:
+        self.paused_partitions.update(partitions)
+
+    def resume(self, *partitions: structs.TopicPartition) -> None:
+        self.paused_partitions.difference_update(partitions)
+
+    def paused(self) -> set[structs.TopicPartition]:
+        return set(self.paused_partitions)
+
+    async def commit(
+        self, offsets: dict[structs.TopicPartition, int] | None = None
+    ) -> None:
+        self.commits.append(dict(offsets or {}))
+
+    async def getmany(
+        self,
+        *partitions: structs.TopicPartition,
+        timeout_ms: float = 0,
+        max_records: int | None = None,
+    ) -> dict[structs.TopicPartition, list[structs.ConsumerRecord]]:
+        result = self._take(partitions, max_records)
+        if not result and timeout_ms:
+            # Как и настоящий consumer, ждем новых сообщений не дольше timeout_ms
+            self._produced.clear()
+            try:
+                await asyncio.wait_for(self._produced.wait(), timeout_ms / 1000)
+            except TimeoutError:
+                pass
+            result = self._take(partitions, max_records)
+        await asyncio.sleep(0)
+        return result
+
+    def _take(
+        self,
+        partitions: tuple[structs.TopicPartition, ...],
+        max_records: int | None,
+    ) -> dict[structs.TopicPartition, list[structs.ConsumerRecord]]:
+        result: dict[structs.TopicPartition, list[structs.ConsumerRecord]] = {}
+        left = max_records if max_records is not None else float("inf")
+        for tp in partitions or self.records:
+            if tp in self.paused_partitions or left <= 0:
+                continue
+            position = self.positions[tp]
+            records = self.records[tp][
+                position : position + int(min(left, len(self.records[tp])))
+            ]
+            if records:
+                result[tp] = records
+                self.positions[tp] += len(records)
+                left -= len(records)
+        return result
+
+
+class FakeAIOKafkaProducer:
+    """In-memory stand-in of `aiokafka.AIOKafkaProducer`, keeps sent messages."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent: list[dict[str, typing.Any]] = []
+        self.started = False
+        self.stopped = False
+
+    async def start(self) -> None:
+        self.started = True
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+    async def send(
+        self,
+        topic: str,
+        value=None,
+        key=None,
+        partition=None,
+        timestamp_ms=None,
+        headers=None,
+    ):
+        if self.fail:
+            raise ConnectionError("Kafka is unavailable")
+        # Без сериализатора aiokafka принимает только bytes
+        for data in (value, key):
+            if data is not None and not isinstance(
+                data, (bytes, bytearray, memoryview)
+            ):
+                raise TypeError(
+                    f"a bytes-like object is required, not '{type(data).__name__}'"
+                )
+        tp = structs.TopicPartition(topic, partition or 0)
+        self.sent.append(
+            {"topic": topic, "value": value, "key": key, "headers": list(headers or [])}
+        )
+        delivery = asyncio.get_running_loop().create_future()
+        # Как и настоящий producer, подтверждает доставку после отправки пачки
+        asyncio.get_running_loop().call_soon(
+            delivery.set_result,
+            structs.RecordMetadata(
+                topic, partition or 0, tp, len(self.sent) - 1, -1, 0, -1
+            ),
+        )
+        return delivery
+
+    async def send_and_wait(
+        self,
+        topic: str,
+        value=None,
+        key=None,
+        partition=None,
+        timestamp_ms=None,
+        headers=None,
+    ):
+        return await (
+            await self.send(topic, value, key, partition, timestamp_ms, headers)
+        )
+
+
+async def consume_until(
+    consume: typing.Awaitable[None],
+    condition: typing.Callable[[], bool],
+    timeout: float = 5,
+) -> None:
+    """Run `consume` until `condition` is true, then cancel it."""
+    task = asyncio.ensure_future(consume)
+    try:
+        async with asyncio.timeout(timeout):
+            while not condition():
+                if task.done():
+                    task.result()
+                await asyncio.sleep(0.001)
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+# Цели `kafka.ConsumerRunner`, функции модуля, чтобы их можно было передать в spawn-процесс
+RUNNER_MESSAGES = 10
+
+
+def consume_forever() -> None:
+    """Consume `RUNNER_MESSAGES` messages of a fake consumer, then wait for new ones until stopped."""
+    from fastapi_app import kafka
+
+    fake = FakeAIOKafkaConsumer(partitions=2)
+    for index in range(RUNNER_MESSAGES):
+        fake.produce(index % 2)
+
+    async def on_message(message: structs.ConsumerRecord) -> None:
+        pass
+
+    kafka.KafkaConsumer(fake).consume(on_message, timeout_ms=10)
+
+
+def crash() -> None:
+    raise RuntimeError("Worker crashed")
+
+
+def finish() -> None:
+    pass
@@ -0,0 +1,41 @@
+import asyncio
+
+import fastapi
+from fastapi import responses
+
+import fastapi_app
+from fastapi_app import logging
+from fastapi_app.logging import timing
+
+
+def create_app(logging_policy: logging.LoggingPolicy | None = None) -> fastapi.FastAPI:
+    app = fastapi_app.create(
+        title="Test",
+        debug=True,
+        description="Logging test API",
+        logging_policy=logging_policy,
+    )
+
+    @app.post("/echo")
+    async def echo_route(body: dict):
+        return body
+
+    @app.get("/stream")
+    async def stream_route():
+        async def chunks():
+            for _ in range(10):
+                yield b"x" * 1024
+
+        return responses.StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/timed")
+    async def timed_route():
+        with timing.span("db"):
+            await asyncio.sleep(0.001)
+        return {"status": "ok"}
+
+    @app.get("/error_route")
+    async def error_route():
+        raise RuntimeError("Test Error")
+
+    return app
@@ -0,0 +1,207 @@
+import dataclasses
+import uuid
+
+import orjson
+from fastapi import status
+
+from fastapi_app.idempotency import backends
+from tests.mock import idempotency_mock_api
+
+
+class TestRedisBackend:
+    async def test_get_or_lock_positive(self, redis_backend):
+        key = str(uuid.uuid4())
+
+        assert await redis_backend.get_or_lock(key) == (None, False)
+        assert await redis_backend.get_or_lock(key) == (None, True)
+
+        stored = backends.StoredResponse(
+            201, b'{"id":1}', ((b"content-type", b"application/json"),)
+        )
+        await redis_backend.store_response(key, stored)
+
+        assert await redis_backend.get_or_lock(key) == (stored, False)
+
+    async def test_lock_expiry_positive(self, redis_backend):
+        key = str(uuid.uuid4())
+        await redis_backend.get_or_lock(key)
+
+        _, lock_key = redis_backend._get_keys(key)
+
+        assert 0 < await redis_backend.redis.ttl(lock_key) <= redis_backend.lock_expiry
+
+    async def test_clear_idempotency_key_positive(self, redis_backend):
+        key = str(uuid.uuid4())
+        assert not await redis_backend.store_idempotency_key(key)
+        assert await redis_backend.store_idempotency_key(key)
+
+        await redis_backend.clear_idempotency_key(key)
+
+        assert await redis_backend.get_or_lock(key) == (None, False)
+
+    async def test_store_response_data_positive(self, redis_backend):
+        key = str(uuid.uuid4())
+        await redis_backend.get_or_lock(key)
+
+        await redis_backend.store_response_data(key, {"id": 1}, 200)
+
+        response_key, lock_key = redis_backend._get_keys(key)
+        assert not await redis_backend.redis.exists(lock_key)
+        assert 0 < await redis_backend.redis.ttl(response_key) <= redis_backend.expiry
+        response = await redis_backend.get_stored_response(key)
+        assert orjson.loads(response.body) == {"id": 1}
+        assert response.headers["content-type"] == "application/json"
+
+    async def test_get_stored_response_negative(self, redis_backend):
+        assert await redis_backend.get_stored_response(str(uuid.uuid4())) is None
+
+    def test_from_url_shared_pool_positive(self):
+        first = backends.RedisBackend.from_url("redis://localhost:6379/15")
+        second = backends.RedisBackend.from_url(
+            "redis://localhost:6379/15", prefix="other"
+        )
+
+        assert first.redis.connection_pool is second.redis.connection_pool
+        assert second.prefix == "other"
+
+
+class TestRedisIdempotencyMiddleware:
+    async def test_replay_positive(self, api_with_redis_idempotency):
+        body = idempotency_mock_api.Foo(bar=uuid.uuid4())
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        first = await api_with_redis_idempotency.post(
+            "/idempotency",
+            headers=headers,
+            json=body.model_dump(mode="json"),
+        )
+
+        second = await api_with_redis_idempotency.post(
+            "/idempotency",
+            headers=headers,
+            json=body.model_dump(mode="json"),
+        )
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert second.json() == first.json()
+
+    async def test_replay_chunked_positive(self, api_with_redis_idempotency):
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        first = await api_with_redis_idempotency.post(
+            "/idempotency/stream", headers=headers
+        )
+
+        second = await api_with_redis_idempotency.post(
+            "/idempotency/stream", headers=headers
+        )
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.content == first.content
+        assert second.content.count(b";") == 3
+        assert second.headers["content-type"] == first.headers["content-type"]
+        assert second.headers["etag"] == first.headers["etag"]
+        assert second.headers["content-length"] == str(len(first.content))
+        assert "x-request-id" not in second.headers
+
+    async def test_max_body_bytes_negative(
+        self, api_with_idempotency_backend, redis_backend
+    ):
+        # Каждая часть потокового ответа занимает 39 байт
+        client = api_with_idempotency_backend(redis_backend, max_body_bytes=50)
+        key = str(uuid.uuid4())
+        headers = {"Idempotency-Key": key}
+
+        first = await client.post("/idempotency/stream", headers=headers)
+        second = await client.post("/idempotency/stream", headers=headers)
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert first.content.count(b";") == second.content.count(b";") == 3
+        assert second.content != first.content
+        assert "idempotent-replayed" not in second.headers
+        assert await redis_backend.get_or_lock(key) == (None, False)
+
+    async def test_pending_negative(self, api_with_redis_idempotency, redis_backend):
+        key = str(uuid.uuid4())
+        await redis_backend.get_or_lock(key)
+
+        response = await api_with_redis_idempotency.post(
+            "/idempotency",
+            headers={"Idempotency-Key": key},
+            json=idempotency_mock_api.Foo(bar=uuid.uuid4()).model_dump(mode="json"),
+        )
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+
+class TestMemoryBackend:
+    async def test_get_or_lock_positive(self):
+        backend = backends.MemoryBackend()
+        stored = backends.StoredResponse(
+            201, b'{"id":1}', ((b"content-type", b"application/json"),)
+        )
+
+        assert await backend.get_or_lock("key") == (None, False)
+        assert await backend.get_or_lock("key") == (None, True)
+        await backend.store_response("key", stored)
+
+        assert await backend.get_or_lock("key") == (stored, False)
+        assert backend.stats.entries == 1
+
+    async def test_compression_positive(self):
+        backend = backends.MemoryBackend(compress_threshold=100)
+        body = b'{"items":[' + b'{"id":1},' * 1000 + b"]}"
+
+        await backend.store_response("large", backends.StoredResponse(200, body))
+        await backend.store_response("small", backends.StoredResponse(200, b"{}"))
+
+        assert (await backend.get_response("large")).body == body
+        assert backend.stats.compressed_entries == 1
+        assert backend.stats.stored_bytes < len(body)
+
+    async def test_expiry_negative(self):
+        backend = backends.MemoryBackend(expiry=1, lock_expiry=1)
+        await backend.store_response("key", backends.StoredResponse(200, b"{}"))
+        await backend.store_idempotency_key("pending")
+        backend._responses["key"] = dataclasses.replace(
+            backend._responses["key"], expires_at=0
+        )
+        backend._locks["pending"] = 0
+
+        assert await backend.get_response("key") is None
+        assert not await backend.store_idempotency_key("pending")
+        assert backend.stats.expirations == 1
+        assert backend.stats.entries == backend.stats.stored_bytes == 0
+
+    async def test_eviction_negative(self):
+        backend = backends.MemoryBackend(max_entries=2)
+        for key in ("first", "second"):
+            await backend.store_response(key, backends.StoredResponse(200, b"{}"))
+
+        await backend.get_response("first")
+        await backend.store_response("third", backends.StoredResponse(200, b"{}"))
+
+        assert await backend.get_response("second") is None
+        assert await backend.get_response("first") is not None
+        assert backend.stats.evictions == 1
+        assert backend.stats.entries == 2
+
+    async def test_max_bytes_negative(self):
+        backend = backends.MemoryBackend(max_bytes=100, compress_threshold=None)
+        for index in range(5):
+            await backend.store_response(
+                str(index), backends.StoredResponse(200, b"x" * 40)
+            )
+
+        assert backend.stats.stored_bytes <= 100
+        assert backend.stats.entries == 2
+        assert backend.stats.evictions == 3
+
+    async def test_max_entry_bytes_negative(self):
+        backend = backends.MemoryBackend(max_entry_bytes=10, compress_threshold=None)
+        await backend.store_idempotency_key("key")
+
+        await backend.store_response("key", backends.StoredResponse(200, b"x" * 11))
+
+        assert await backend.get_or_lock("key") == (None, False)
+        assert backend.stats.rejected == 1
+        assert backend.stats.entries == 0
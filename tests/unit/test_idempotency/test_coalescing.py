@@ -0,0 +1,153 @@
+import asyncio
+import time
+import uuid
+
+import fakeredis
+from fastapi import status
+from idempotency_header_middleware import backends as library_backends
+
+from fastapi_app.idempotency import backends, cache
+from tests.mock import idempotency_mock_api
+
+
+class CountingBackend(backends.RedisBackend):
+    """Redis backend that counts `get_or_lock` calls."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    async def get_or_lock(self, idempotency_key):
+        self.calls += 1
+        return await super().get_or_lock(idempotency_key)
+
+
+def make_body() -> dict:
+    return idempotency_mock_api.Foo(bar=uuid.uuid4()).model_dump(mode="json")
+
+
+class TestResponseCache:
+    def test_lru_positive(self):
+        response_cache = cache.ResponseCache(max_size=2)
+        response = backends.StoredResponse(200, b"{}")
+        response_cache.set("first", response)
+        response_cache.set("second", response)
+
+        response_cache.get("first")
+        response_cache.set("third", response)
+
+        assert len(response_cache) == 2
+        assert response_cache.get("first") is response
+        assert response_cache.get("second") is None
+
+    def test_ttl_negative(self):
+        response_cache = cache.ResponseCache(ttl=0.01)
+        response_cache.set("key", backends.StoredResponse(200, b"{}"))
+
+        time.sleep(0.02)
+
+        assert response_cache.get("key") is None
+        assert not len(response_cache)
+
+
+class TestIdempotencyCoalescing:
+    async def test_cache_positive(self, api_with_idempotency_backend):
+        backend = CountingBackend(fakeredis.FakeAsyncRedis())
+        client = api_with_idempotency_backend(
+            backend, response_cache=cache.ResponseCache()
+        )
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        body = make_body()
+        first = await client.post("/idempotency/slow", headers=headers, json=body)
+
+        replays = [
+            await client.post("/idempotency/slow", headers=headers, json=body)
+            for _ in range(3)
+        ]
+
+        assert backend.calls == 1
+        assert all(replay.content == first.content for replay in replays)
+        assert all(
+            replay.headers["Idempotent-Replayed"] == "true" for replay in replays
+        )
+
+    async def test_wait_positive(self, api_with_idempotency_backend):
+        backend = backends.RedisBackend(fakeredis.FakeAsyncRedis())
+        client = api_with_idempotency_backend(backend, wait_timeout=5)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        body = make_body()
+
+        responses = await asyncio.gather(
+            *(
+                client.post("/idempotency/slow", headers=headers, json=body)
+                for _ in range(5)
+            ),
+        )
+
+        assert [response.status_code for response in responses] == [
+            status.HTTP_200_OK
+        ] * 5
+        assert len({response.content for response in responses}) == 1
+        assert idempotency_mock_api.slow_calls.count(uuid.UUID(body["bar"])) == 1
+
+    async def test_wait_library_backend_positive(self, api_with_idempotency_backend):
+        client = api_with_idempotency_backend(
+            library_backends.MemoryBackend(), wait_timeout=5
+        )
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+        responses = await asyncio.gather(
+            *(
+                client.post("/idempotency/slow", headers=headers, json=make_body())
+                for _ in range(3)
+            ),
+        )
+
+        assert [response.status_code for response in responses] == [
+            status.HTTP_200_OK
+        ] * 3
+        assert len({response.content for response in responses}) == 1
+
+    async def test_wait_timeout_negative(self, api_with_idempotency_backend):
+        backend = backends.RedisBackend(fakeredis.FakeAsyncRedis())
+        client = api_with_idempotency_backend(backend, wait_timeout=0.01)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        body = make_body()
+
+        first, second = await asyncio.gather(
+            client.post("/idempotency/slow", headers=headers, json=body),
+            client.post("/idempotency/slow", headers=headers, json=body),
+        )
+
+        assert first.status_code == status.HTTP_200_OK
+        assert second.status_code == status.HTTP_409_CONFLICT
+
+    async def test_cross_worker_notify_positive(self):
+        server = fakeredis.FakeServer()
+        first = backends.RedisBackend(
+            fakeredis.FakeAsyncRedis(server=server), notify=True
+        )
+        second = backends.RedisBackend(
+            fakeredis.FakeAsyncRedis(server=server), notify=True
+        )
+        key = str(uuid.uuid4())
+        await first.get_or_lock(key)
+        assert await second.get_or_lock(key) == (None, True)
+
+        waiting = asyncio.create_task(second.wait_response(key, timeout=5))
+        await asyncio.sleep(0.01)
+        stored = backends.StoredResponse(201, b"{}")
+        await first.store_response(key, stored)
+
+        assert await waiting == stored
+
+    async def test_cross_worker_notify_negative(self):
+        backend = backends.RedisBackend(fakeredis.FakeAsyncRedis(), notify=True)
+        key = str(uuid.uuid4())
+        await backend.get_or_lock(key)
+
+        waiting = asyncio.create_task(backend.wait_response(key, timeout=5))
+        await asyncio.sleep(0.01)
+        await backend.clear_idempotency_key(key)
+
+        assert await waiting is None
@@ -0,0 +1,444 @@
+import asyncio
+import collections
+import random
+import time
+
+import pytest
+from aiokafka import structs
+
+from fastapi_app import kafka
+from tests.mock import kafka_mock
+
+
+def make_consumer(
+    fake: kafka_mock.FakeAIOKafkaConsumer, **kwargs
+) -> kafka.KafkaConsumer:
+    return kafka.KafkaConsumer(fake, **kwargs)
+
+
+class TestKafkaConsumer:
+    async def test_sequential_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(10):
+            fake.produce(index % 2, str(index).encode())
+        processed = []
+
+        async def on_message(message):
+            processed.append(message.value)
+
+        await kafka_mock.consume_until(
+            make_consumer(fake).run(on_message), fake.is_committed
+        )
+
+        assert sorted(processed) == sorted(str(index).encode() for index in range(10))
+        assert fake.stopped
+
+    async def test_concurrent_partitions_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=4)
+        for index in range(40):
+            fake.produce(index % 4, str(index).encode())
+        processed = collections.defaultdict(list)
+        active, max_active = 0, 0
+
+        async def on_message(message):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            processed[message.partition].append(message.offset)
+            active -= 1
+
+        start = time.monotonic()
+        consumer = make_consumer(fake, concurrency=4)
+        await kafka_mock.consume_until(
+            consumer.run(on_message, max_records=5), fake.is_committed
+        )
+
+        assert max_active == 4
+        assert all(offsets == list(range(10)) for offsets in processed.values())
+        # Последовательно 40 сообщений заняли бы 0.4 секунды
+        assert time.monotonic() - start < 0.3
+        assert not fake.paused_partitions
+
+    async def test_concurrency_limit_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=4)
+        for index in range(8):
+            fake.produce(index % 4)
+        active, max_active = 0, 0
+
+        async def on_message(message):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.005)
+            active -= 1
+
+        consumer = make_consumer(fake, concurrency=2)
+        await kafka_mock.consume_until(consumer.run(on_message), fake.is_committed)
+
+        assert max_active == 2
+
+    async def test_commit_after_processing_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(4):
+            fake.produce(index % 2)
+
+        async def on_message(message):
+            if message.partition == 1:
+                raise ValueError("poison message")
+            await asyncio.sleep(0.01)
+
+        consumer = make_consumer(fake, concurrency=2)
+        with pytest.raises(ValueError):
+            await kafka_mock.consume_until(consumer.run(on_message), lambda: False)
+
+        assert fake.committed_offsets == {
+            structs.TopicPartition(kafka_mock.TOPIC, 0): 2
+        }
+        assert fake.stopped
+
+    async def test_failed_partition_paused_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=1)
+        fake.produce(0)
+        processed = []
+
+        async def on_message(message):
+            if message.offset == 0:
+                await asyncio.sleep(0.01)
+                # Следующее сообщение приходит, пока цикл чтения ждет в getmany
+                asyncio.get_running_loop().call_later(0.01, fake.produce, 0)
+                raise RuntimeError("boom")
+            processed.append(message.offset)
+
+        consumer = make_consumer(fake, concurrency=2)
+        with pytest.raises(RuntimeError):
+            await kafka_mock.consume_until(
+                consumer.run(on_message, timeout_ms=100), lambda: False
+            )
+
+        assert not processed
+        assert not fake.commits
+
+
+class TestKafkaConsumerBatches:
+    async def test_partition_batches_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(10):
+            fake.produce(index % 2)
+        batches = []
+
+        async def on_batch(messages):
+            batches.append(
+                [(message.partition, message.offset) for message in messages]
+            )
+
+        consumer = make_consumer(fake)
+        await kafka_mock.consume_until(
+            consumer.run_batches(on_batch, max_batch_size=100, max_wait_ms=20),
+            fake.is_committed,
+        )
+
+        assert sorted(batches) == [
+            [(0, offset) for offset in range(5)],
+            [(1, offset) for offset in range(5)],
+        ]
+
+    async def test_merged_batch_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=3)
+        for index in range(9):
+            fake.produce(index % 3)
+        batches = []
+
+        async def on_batch(messages):
+            batches.append(len(messages))
+
+        consumer = make_consumer(fake)
+        await kafka_mock.consume_until(
+            consumer.run_batches(
+                on_batch, max_batch_size=100, max_wait_ms=20, merged=True
+            ),
+            fake.is_committed,
+        )
+
+        assert batches == [9]
+        assert len(fake.commits) == 1
+
+    async def test_max_batch_size_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=1)
+        for _ in range(10):
+            fake.produce(0)
+        batches = []
+
+        async def on_batch(messages):
+            batches.append(len(messages))
+
+        consumer = make_consumer(fake, concurrency=2)
+        await kafka_mock.consume_until(
+            consumer.run_batches(on_batch, max_batch_size=4, max_wait_ms=20),
+            fake.is_committed,
+        )
+
+        assert batches == [4, 4, 2]
+
+    async def test_max_wait_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=1)
+        fake.produce(0)
+        batches = []
+
+        async def on_batch(messages):
+            batches.append(len(messages))
+
+        async def produce_later():
+            await asyncio.sleep(0.01)
+            fake.produce(0)
+
+        consumer = make_consumer(fake)
+        producer = asyncio.create_task(produce_later())
+        await kafka_mock.consume_until(
+            consumer.run_batches(on_batch, max_batch_size=100, max_wait_ms=200),
+            lambda: (
+                fake.is_committed()
+                and len(fake.records[structs.TopicPartition(kafka_mock.TOPIC, 0)]) == 2
+            ),
+        )
+        await producer
+
+        assert batches == [2]
+
+    async def test_batch_failure_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=1)
+        fake.produce(0)
+
+        async def on_batch(messages):
+            raise ValueError("bulk insert failed")
+
+        with pytest.raises(ValueError):
+            await kafka_mock.consume_until(
+                make_consumer(fake).run_batches(on_batch, max_wait_ms=10), lambda: False
+            )
+
+        assert not fake.commits
+
+
+class TestKafkaConsumerCommits:
+    async def test_coalesced_commit_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=4)
+        for index in range(8):
+            fake.produce(index % 4)
+
+        async def on_message(message):
+            pass
+
+        await kafka_mock.consume_until(
+            make_consumer(fake).run(on_message), fake.is_committed
+        )
+
+        assert fake.commits == [
+            {
+                structs.TopicPartition(kafka_mock.TOPIC, partition): 2
+                for partition in range(4)
+            }
+        ]
+
+    async def test_commit_every_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=1)
+        for _ in range(10):
+            fake.produce(0)
+
+        async def on_message(message):
+            pass
+
+        consumer = make_consumer(fake, commit_every=5)
+        await kafka_mock.consume_until(
+            consumer.run(on_message, max_records=1), fake.is_committed
+        )
+
+        tp = structs.TopicPartition(kafka_mock.TOPIC, 0)
+        assert fake.commits == [{tp: 5}, {tp: 10}]
+
+    async def test_commit_interval_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(6):
+            fake.produce(index % 2)
+        processed = []
+
+        async def on_message(message):
+            processed.append(message)
+
+        consumer = make_consumer(fake, commit_interval_ms=60_000)
+        await kafka_mock.consume_until(
+            consumer.run(on_message, max_records=1), lambda: len(processed) == 6
+        )
+
+        # Единственный коммит - финальный при остановке
+        assert fake.commits == [
+            {
+                structs.TopicPartition(kafka_mock.TOPIC, partition): 3
+                for partition in range(2)
+            }
+        ]
+
+    async def test_commit_on_revoke_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(4):
+            fake.produce(index % 2)
+        processed = []
+
+        async def on_message(message):
+            await asyncio.sleep(0.01)
+            processed.append(message)
+
+        consumer = make_consumer(fake, concurrency=2, commit_interval_ms=60_000)
+
+        async def revoke():
+            await asyncio.sleep(0.005)
+            await fake.revoke(*fake.records)
+            return list(fake.commits)
+
+        revoking = asyncio.create_task(revoke())
+        await kafka_mock.consume_until(
+            consumer.run(on_message), lambda: revoking.done()
+        )
+
+        # Перед отзывом партиций дожидаемся обработки пачек и коммитим их
+        assert revoking.result() == [{tp: 2 for tp in fake.records}]
+        assert len(processed) == 4
+
+
+class TestKafkaConsumerBackpressure:
+    async def test_max_in_flight_messages_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=4)
+        for index in range(80):
+            fake.produce(index % 4)
+        consumer = make_consumer(fake, concurrency=1, max_in_flight_messages=10)
+        max_in_flight, paused = 0, False
+
+        async def on_message(message):
+            nonlocal max_in_flight, paused
+            max_in_flight = max(max_in_flight, consumer._in_flight_messages)
+            paused = paused or fake.paused() == fake.assignment()
+            await asyncio.sleep(0.001)
+
+        await kafka_mock.consume_until(
+            consumer.run(on_message, max_records=5), fake.is_committed
+        )
+
+        # Лимит может быть превышен не больше чем на одну пачку
+        assert max_in_flight <= 10 + 5
+        assert paused
+        assert not fake.paused_partitions
+        assert not consumer._backpressure_partitions
+
+    async def test_max_in_flight_bytes_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(20):
+            fake.produce(index % 2, b"x" * 100)
+        consumer = make_consumer(fake, concurrency=2, max_in_flight_bytes=250)
+        max_in_flight = 0
+
+        async def on_batch(messages):
+            nonlocal max_in_flight
+            max_in_flight = max(max_in_flight, consumer._in_flight_bytes)
+            await asyncio.sleep(0.001)
+
+        await kafka_mock.consume_until(
+            consumer.run_batches(on_batch, max_batch_size=2, max_wait_ms=5),
+            fake.is_committed,
+        )
+
+        assert max_in_flight <= 250 + 200
+        assert not fake.paused_partitions
+
+    async def test_no_limit_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(20):
+            fake.produce(index % 2)
+        consumer = make_consumer(fake, concurrency=2)
+
+        async def on_message(message):
+            assert (
+                fake.paused() != fake.assignment()
+                or consumer._in_flight_partitions == fake.assignment()
+            )
+
+        await kafka_mock.consume_until(
+            consumer.run(on_message, max_records=2), fake.is_committed
+        )
+
+        assert not consumer._backpressure_partitions
+
+
+class CheckedCommitsConsumer(kafka_mock.FakeAIOKafkaConsumer):
+    """Fails the test if a commit skips a message that is not processed yet."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.processed: set[tuple[int, int]] = set()
+
+    async def commit(self, offsets=None):
+        for tp, offset in (offsets or {}).items():
+            assert all(
+                (tp.partition, previous) in self.processed for previous in range(offset)
+            )
+        await super().commit(offsets)
+
+
+class TestKafkaConsumerKeyOrdering:
+    async def test_key_ordering_positive(self):
+        fake = CheckedCommitsConsumer(partitions=2)
+        for index in range(200):
+            fake.produce(index % 2, str(index).encode(), key=str(index % 7).encode())
+        by_key = collections.defaultdict(list)
+        active, max_active = 0, 0
+
+        async def on_message(message):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(random.uniform(0, 0.003))
+            by_key[(message.partition, message.key)].append(message.offset)
+            fake.processed.add((message.partition, message.offset))
+            active -= 1
+
+        consumer = make_consumer(fake, concurrency=8, key_ordering=True, commit_every=3)
+        await kafka_mock.consume_until(
+            consumer.run(on_message, max_records=20), lambda: len(fake.processed) == 200
+        )
+
+        assert fake.is_committed()
+        assert all(offsets == sorted(offsets) for offsets in by_key.values())
+        assert sum(map(len, by_key.values())) == 200
+        assert max_active > 2
+        assert not consumer._key_queues
+
+    async def test_key_ordering_failure_negative(self):
+        fake = CheckedCommitsConsumer(partitions=1)
+        for index in range(30):
+            fake.produce(0, str(index).encode(), key=str(index % 3).encode())
+
+        async def on_message(message):
+            await asyncio.sleep(random.uniform(0, 0.002))
+            if message.offset == 10:
+                raise ValueError("poison message")
+            fake.processed.add((message.partition, message.offset))
+
+        consumer = make_consumer(fake, concurrency=4, key_ordering=True)
+        with pytest.raises(ValueError):
+            await kafka_mock.consume_until(consumer.run(on_message), lambda: False)
+
+        assert fake.committed_offsets[structs.TopicPartition(kafka_mock.TOPIC, 0)] == 10
+
+    async def test_key_ordering_batches_negative(self):
+        consumer = make_consumer(
+            kafka_mock.FakeAIOKafkaConsumer(), concurrency=2, key_ordering=True
+        )
+
+        async def on_batch(messages):
+            pass
+
+        with pytest.raises(ValueError):
+            await consumer.run_batches(on_batch)
+
+    def test_key_ordering_without_concurrency_negative(self):
+        with pytest.raises(ValueError):
+            make_consumer(kafka_mock.FakeAIOKafkaConsumer(), key_ordering=True)
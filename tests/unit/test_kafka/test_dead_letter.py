@@ -0,0 +1,114 @@
+import pytest
+
+from fastapi_app import kafka
+from tests.mock import kafka_mock
+
+
+def make_consumer(
+    fake: kafka_mock.FakeAIOKafkaConsumer, **kwargs
+) -> kafka.KafkaConsumer:
+    return kafka.KafkaConsumer(fake, retry_backoff_ms=1, **kwargs)
+
+
+class TestRetries:
+    async def test_retry_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0, b"flaky")
+        calls = []
+
+        async def on_message(message):
+            calls.append(message.offset)
+            if len(calls) < 3:
+                raise ConnectionError("database is unavailable")
+
+        consumer = make_consumer(fake, retries=3)
+        await kafka_mock.consume_until(consumer.run(on_message), fake.is_committed)
+
+        assert calls == [0, 0, 0]
+        assert consumer.stats.failures == 2
+        assert consumer.stats.retries == 2
+        assert consumer.stats.dead_letters == 0
+
+    async def test_retry_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0)
+
+        async def on_message(message):
+            raise ValueError("poison message")
+
+        consumer = make_consumer(fake, retries=2)
+        with pytest.raises(ValueError):
+            await kafka_mock.consume_until(consumer.run(on_message), lambda: False)
+
+        assert consumer.stats.failures == 3
+        assert not fake.committed_offsets
+
+
+class TestDeadLetter:
+    async def test_dead_letter_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(6):
+            fake.produce(index % 2, str(index).encode(), key=b"key")
+        producer = kafka_mock.FakeAIOKafkaProducer()
+        processed = []
+
+        async def on_message(message):
+            if message.value == b"3":
+                raise ValueError("poison message")
+            processed.append(message.value)
+
+        consumer = make_consumer(
+            fake, retries=1, dead_letter=kafka.DeadLetterPublisher(producer)
+        )
+        await kafka_mock.consume_until(consumer.run(on_message), fake.is_committed)
+
+        assert sorted(processed) == [b"0", b"1", b"2", b"4", b"5"]
+        assert len(producer.sent) == 1
+        sent = producer.sent[0]
+        assert (sent["topic"], sent["value"], sent["key"]) == (
+            f"{kafka_mock.TOPIC}.DLQ",
+            b"3",
+            b"key",
+        )
+        headers = dict(sent["headers"])
+        assert headers["dlq.partition"] == b"1"
+        assert headers["dlq.offset"] == b"1"
+        assert headers["dlq.error"] == b"ValueError: poison message"
+        assert consumer.stats.dead_letters == 1
+
+    async def test_dead_letter_batch_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        for _ in range(3):
+            fake.produce(0)
+        producer = kafka_mock.FakeAIOKafkaProducer()
+
+        async def on_batch(messages):
+            raise ValueError("bulk insert failed")
+
+        consumer = make_consumer(
+            fake, dead_letter=kafka.DeadLetterPublisher(producer, topic="failed")
+        )
+        await kafka_mock.consume_until(
+            consumer.run_batches(on_batch, max_wait_ms=10), fake.is_committed
+        )
+
+        assert [sent["topic"] for sent in producer.sent] == ["failed"] * 3
+        assert consumer.stats.dead_letters == 3
+
+    async def test_dead_letter_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0)
+
+        async def on_message(message):
+            raise ValueError("poison message")
+
+        consumer = make_consumer(
+            fake,
+            dead_letter=kafka.DeadLetterPublisher(
+                kafka_mock.FakeAIOKafkaProducer(fail=True)
+            ),
+        )
+        with pytest.raises(ConnectionError):
+            await kafka_mock.consume_until(consumer.run(on_message), lambda: False)
+
+        assert not fake.committed_offsets
@@ -0,0 +1,155 @@
+import concurrent.futures
+import pickle
+import typing
+import uuid
+
+import orjson
+import pydantic
+import pytest
+
+from fastapi_app import kafka
+from fastapi_app.kafka import decoders
+from tests.mock import kafka_mock
+
+
+class Event(pydantic.BaseModel):
+    id: uuid.UUID
+    amount: int
+
+
+class CountingDecoder(decoders.PydanticDecoder):
+    """Pydantic decoder that counts decoder calls."""
+
+    calls = 0
+
+    def __call__(self, values):
+        CountingDecoder.calls += 1
+        return super().__call__(values)
+
+
+def produce_events(fake: kafka_mock.FakeAIOKafkaConsumer, count: int) -> list[Event]:
+    events = [Event(id=uuid.uuid4(), amount=index) for index in range(count)]
+    for index, event in enumerate(events):
+        fake.produce(index % len(fake.records), event.model_dump_json().encode())
+    return events
+
+
+class TestDecoders:
+    def test_orjson_positive(self):
+        assert decoders.OrjsonDecoder()([b'{"a": 1}', None]) == [{"a": 1}, None]
+
+    def test_pydantic_positive(self):
+        decoder = pickle.loads(pickle.dumps(decoders.PydanticDecoder(Event)))
+        event = Event(id=uuid.uuid4(), amount=1)
+
+        assert decoder([event.model_dump_json().encode()] * 2) == [event, event]
+
+    def test_pydantic_negative(self):
+        decoder = decoders.PydanticDecoder(int)
+
+        with pytest.raises(ValueError):
+            decoder([b"1,2"])
+
+    def test_pydantic_malformed_values_negative(self):
+        decoder = decoders.PydanticDecoder(typing.Any)
+
+        with pytest.raises(ValueError):
+            decoder([b"1,2", b"[3", b"4]"])
+
+
+class TestKafkaConsumerDecoding:
+    async def test_batch_decoding_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        events = produce_events(fake, 10)
+        received = []
+
+        async def on_message(message):
+            received.append(message.value)
+
+        CountingDecoder.calls = 0
+        consumer = kafka.KafkaConsumer(fake, decoder=CountingDecoder(Event))
+        await kafka_mock.consume_until(consumer.run(on_message), fake.is_committed)
+
+        assert sorted(received, key=lambda event: event.amount) == events
+        assert CountingDecoder.calls == 1
+
+    async def test_executor_decoding_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(10):
+            fake.produce(index % 2, orjson.dumps({"index": index}))
+        received = []
+
+        async def on_batch(messages):
+            received.extend(message.value["index"] for message in messages)
+
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            consumer = kafka.KafkaConsumer(
+                fake,
+                concurrency=2,
+                decoder=decoders.OrjsonDecoder(),
+                decode_executor=executor,
+                decode_executor_min_batch=1,
+            )
+            await kafka_mock.consume_until(
+                consumer.run_batches(on_batch, max_wait_ms=10), fake.is_committed
+            )
+
+        assert sorted(received) == list(range(10))
+
+    async def test_decode_failure_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        produce_events(fake, 2)
+        fake.produce(0, b"not json")
+        producer = kafka_mock.FakeAIOKafkaProducer()
+        received = []
+
+        async def on_batch(messages):
+            received.extend(messages)
+
+        consumer = kafka.KafkaConsumer(
+            fake,
+            decoder=decoders.PydanticDecoder(Event),
+            dead_letter=kafka.DeadLetterPublisher(producer),
+            retries=3,
+        )
+        await kafka_mock.consume_until(
+            consumer.run_batches(on_batch, max_wait_ms=10), fake.is_committed
+        )
+
+        assert len(received) == 2
+        assert [sent["value"] for sent in producer.sent] == [b"not json"]
+        assert consumer.stats.failures == 1
+        assert consumer.stats.retries == 0
+
+    async def test_handler_failure_dead_letter_raw_value_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0, b'{"index": 1}')
+        producer = kafka_mock.FakeAIOKafkaProducer()
+
+        async def on_message(message):
+            assert message.value == {"index": 1}
+            raise ValueError("boom")
+
+        consumer = kafka.KafkaConsumer(
+            fake,
+            decoder=decoders.OrjsonDecoder(),
+            dead_letter=kafka.DeadLetterPublisher(producer),
+            retry_backoff_ms=0,
+        )
+        await kafka_mock.consume_until(consumer.run(on_message), fake.is_committed)
+
+        assert [sent["value"] for sent in producer.sent] == [b'{"index": 1}']
+        assert consumer.stats.dead_letters == 1
+
+    async def test_decode_failure_without_dead_letter_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0, b"not json")
+
+        async def on_message(message):
+            pass
+
+        consumer = kafka.KafkaConsumer(fake, decoder=decoders.OrjsonDecoder())
+        with pytest.raises(orjson.JSONDecodeError):
+            await kafka_mock.consume_until(consumer.run(on_message), lambda: False)
+
+        assert not fake.committed_offsets
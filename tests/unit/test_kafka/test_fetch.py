@@ -0,0 +1,74 @@
+from fastapi_app import kafka
+from tests.mock import kafka_mock
+
+
+class RecordingAIOKafkaConsumer(kafka_mock.FakeAIOKafkaConsumer):
+    """Fake consumer that records `getmany` arguments."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetches: list[tuple[float, int | None]] = []
+
+    async def getmany(self, *partitions, timeout_ms=0, max_records=None):
+        self.fetches.append((timeout_ms, max_records))
+        return await super().getmany(
+            *partitions, timeout_ms=timeout_ms, max_records=max_records
+        )
+
+
+class TestAdaptiveFetch:
+    def test_grow_positive(self):
+        adaptive = kafka.AdaptiveFetch(
+            initial_records=10, max_records=100, target_batch_ms=1000
+        )
+        for _ in range(5):
+            adaptive.on_fetch(adaptive.records, lag=1000)
+            adaptive.on_processed(adaptive.records, 0.001)
+
+        assert adaptive.records == 100
+        assert adaptive.timeout_ms == 0
+
+    def test_shrink_negative(self):
+        adaptive = kafka.AdaptiveFetch(initial_records=100, target_batch_ms=100)
+        adaptive.on_fetch(100, lag=1000)
+
+        adaptive.on_processed(100, 0.5)
+
+        assert adaptive.records == 20
+
+    def test_idle_backoff_positive(self):
+        adaptive = kafka.AdaptiveFetch(min_timeout_ms=10, max_timeout_ms=50)
+        timeouts = []
+        for _ in range(4):
+            adaptive.on_fetch(0)
+            timeouts.append(adaptive.timeout_ms)
+        adaptive.on_fetch(1)
+
+        assert timeouts == [10, 20, 40, 50]
+        assert adaptive.timeout_ms == 0
+
+
+class TestKafkaConsumerAdaptiveFetch:
+    async def test_consume_positive(self):
+        fake = RecordingAIOKafkaConsumer(partitions=1)
+        for _ in range(700):
+            fake.produce(0)
+        processed = []
+
+        async def on_message(message):
+            processed.append(message.offset)
+
+        adaptive = kafka.AdaptiveFetch(
+            initial_records=10, max_records=200, max_timeout_ms=20
+        )
+        consumer = kafka.KafkaConsumer(fake, adaptive_fetch=adaptive)
+        # Без сообщений таймаут опроса растет до max_timeout_ms
+        await kafka_mock.consume_until(
+            consumer.run(on_message),
+            lambda: fake.is_committed() and fake.fetches[-1][0] == 20,
+        )
+
+        assert processed == list(range(700))
+        limits = [max_records for _, max_records in fake.fetches]
+        assert limits[:3] == [10, 20, 40]
+        assert max(limits) == 200
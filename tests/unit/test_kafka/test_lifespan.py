@@ -0,0 +1,126 @@
+import asyncio
+import contextlib
+
+import pytest
+from aiokafka import structs
+
+import fastapi_app
+from fastapi_app import kafka
+from tests.mock import kafka_mock
+
+
+class FailingAIOKafkaConsumer(kafka_mock.FakeAIOKafkaConsumer):
+    async def start(self) -> None:
+        raise ConnectionError("Kafka is unavailable")
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.001)
+
+
+class TestKafkaConsumerLifecycle:
+    async def test_start_stop_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(10):
+            fake.produce(index % 2)
+        processed = []
+
+        async def on_message(message):
+            processed.append(message)
+
+        consumer = kafka.KafkaConsumer(fake, commit_interval_ms=60_000)
+        await consumer.start(on_message, timeout_ms=10)
+        assert fake.started
+        await wait_for(lambda: len(processed) == 10)
+        await consumer.stop()
+
+        assert fake.is_committed()
+        assert fake.stopped
+
+    async def test_start_negative(self):
+        consumer = kafka.KafkaConsumer(FailingAIOKafkaConsumer())
+
+        async def on_message(message):
+            pass
+
+        with pytest.raises(ConnectionError):
+            await consumer.start(on_message)
+
+    async def test_stop_timeout_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0)
+        blocked = asyncio.Event()
+
+        async def on_message(message):
+            blocked.set()
+            await asyncio.Event().wait()
+
+        consumer = kafka.KafkaConsumer(fake)
+        await consumer.start(on_message)
+        await blocked.wait()
+        await consumer.stop(timeout=0.01)
+
+        assert fake.stopped
+        assert not fake.is_committed()
+
+    async def test_stop_timeout_concurrent_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        fake.produce(0)
+        fake.produce(1)
+        processed = []
+
+        async def on_message(message):
+            if message.partition == 0:
+                await asyncio.sleep(10)
+            processed.append(message)
+
+        consumer = kafka.KafkaConsumer(fake, concurrency=2)
+        await consumer.start(on_message)
+        await wait_for(lambda: len(processed) == 1)
+        await consumer.stop(timeout=0.2)
+
+        # Отмена ожидания пачек не мешает коммиту обработанных и остановке consumer'а
+        assert fake.committed_offsets == {
+            structs.TopicPartition(kafka_mock.TOPIC, 1): 1
+        }
+        assert fake.stopped
+        assert consumer.health().status == "stopped"
+
+
+class TestKafkaLifespan:
+    async def test_app_lifespan_positive(self):
+        fakes = [kafka_mock.FakeAIOKafkaConsumer(), kafka_mock.FakeAIOKafkaConsumer()]
+        processed = []
+        events = []
+
+        async def on_message(message):
+            processed.append(message)
+
+        def starter(fake):
+            async def start() -> kafka.KafkaConsumer:
+                consumer = kafka.KafkaConsumer(fake)
+                await consumer.start(on_message, timeout_ms=10)
+                return consumer
+
+            return start
+
+        @contextlib.asynccontextmanager
+        async def lifespan_handler(app):
+            events.append("startup")
+            yield
+            events.append("shutdown")
+
+        app = fastapi_app.create(
+            kafka_consumers=[starter(fake) for fake in fakes],
+            lifespan_handler=lifespan_handler,
+        )
+        async with app.router.lifespan_context(app):
+            assert events == ["startup"]
+            for fake in fakes:
+                fake.produce(0)
+            await wait_for(lambda: len(processed) == 2)
+
+        assert events == ["startup", "shutdown"]
+        assert all(fake.is_committed() and fake.stopped for fake in fakes)
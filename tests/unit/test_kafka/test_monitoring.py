@@ -0,0 +1,152 @@
+import asyncio
+
+import aiokafka
+import fastapi
+import httpx
+
+from fastapi_app import kafka
+from fastapi_app.kafka import metrics
+from tests.mock import kafka_mock
+
+
+def get_client(*consumers: kafka.KafkaConsumer, **kwargs) -> httpx.AsyncClient:
+    app = fastapi.FastAPI()
+    app.include_router(kafka.monitoring_router(consumers, **kwargs))
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+
+class TestHistogram:
+    def test_observe_positive(self):
+        histogram = metrics.Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [(1, 2), (5, 3), (float("inf"), 4)]
+        assert histogram.sum == 14.5
+
+
+class TestConsumerMonitoring:
+    async def test_metrics_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer(partitions=2)
+        for index in range(10):
+            fake.produce(index % 2)
+
+        async def on_message(message):
+            pass
+
+        consumer = kafka.KafkaConsumer(fake, name="orders")
+        await kafka_mock.consume_until(consumer.run(on_message), fake.is_committed)
+        fake.produce(0)
+        text = kafka.render_prometheus([consumer])
+
+        assert 'kafka_consumer_messages_total{consumer="orders"} 10' in text
+        assert (
+            f'kafka_consumer_lag{{consumer="orders",topic="{kafka_mock.TOPIC}",partition="0"}} 1'
+            in text
+        )
+        assert (
+            f'kafka_consumer_lag{{consumer="orders",topic="{kafka_mock.TOPIC}",partition="1"}} 0'
+            in text
+        )
+        assert (
+            'kafka_consumer_handler_latency_seconds_count{consumer="orders"} 10' in text
+        )
+        assert (
+            'kafka_consumer_commit_latency_seconds_count{consumer="orders"} 1' in text
+        )
+        assert 'kafka_consumer_batch_size_bucket{consumer="orders",le="5.0"} 2' in text
+        assert consumer.metrics.records_per_second() > 0
+
+    async def test_health_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+
+        async def on_message(message):
+            pass
+
+        consumer = kafka.KafkaConsumer(fake, name="orders")
+        await consumer.start(on_message, timeout_ms=10)
+        async with get_client(consumer) as client:
+            response = await client.get("/health/kafka")
+        await consumer.stop()
+
+        assert response.status_code == fastapi.status.HTTP_200_OK
+        assert response.json()["orders"]["status"] == "idle"
+        assert consumer.health().status == "stopped"
+
+    async def test_health_stuck_negative(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        fake.produce(0)
+        blocked = asyncio.Event()
+
+        async def on_message(message):
+            blocked.set()
+            await asyncio.Event().wait()
+
+        consumer = kafka.KafkaConsumer(fake, name="orders")
+        await consumer.start(on_message)
+        await blocked.wait()
+        await asyncio.sleep(0.02)
+        async with get_client(consumer, stuck_timeout=0.01) as client:
+            response = await client.get("/health/kafka")
+        await consumer.stop(timeout=0.01)
+
+        assert response.status_code == fastapi.status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["orders"]["status"] == "stuck"
+
+    async def test_duplicate_names_positive(self):
+        first = kafka.KafkaConsumer(kafka_mock.FakeAIOKafkaConsumer(), name="orders")
+        second = kafka.KafkaConsumer(kafka_mock.FakeAIOKafkaConsumer(), name="orders")
+        first.stats.messages = 1
+
+        text = kafka.render_prometheus([second, first])
+        async with get_client(first, second) as client:
+            response = await client.get("/health/kafka")
+
+        assert (
+            f'kafka_consumer_messages_total{{consumer="orders",instance="{first.id}"}} 1'
+            in text
+        )
+        assert (
+            f'kafka_consumer_messages_total{{consumer="orders",instance="{second.id}"}} 0'
+            in text
+        )
+        assert set(response.json()) == {f"orders/{first.id}", f"orders/{second.id}"}
+
+    async def test_lag_before_commit_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        for _ in range(5):
+            fake.produce(0)
+        blocked = asyncio.Event()
+
+        async def on_message(message):
+            blocked.set()
+            await asyncio.Event().wait()
+
+        consumer = kafka.KafkaConsumer(fake, name="orders")
+        await consumer.start(on_message)
+        await blocked.wait()
+        lag = consumer.lag()
+        await consumer.stop(timeout=0.01)
+
+        assert not fake.commits
+        assert lag == {aiokafka.TopicPartition(kafka_mock.TOPIC, 0): 5}
+
+    async def test_lag_committed_on_assignment_positive(self):
+        fake = kafka_mock.FakeAIOKafkaConsumer()
+        for _ in range(5):
+            fake.produce(0)
+        fake.commits.append({aiokafka.TopicPartition(kafka_mock.TOPIC, 0): 2})
+        consumer = kafka.KafkaConsumer(fake, name="orders")
+
+        await consumer._on_partitions_assigned(fake.assignment())
+
+        assert consumer.lag() == {aiokafka.TopicPartition(kafka_mock.TOPIC, 0): 3}
+
+    async def test_health_not_started_positive(self):
+        consumer = kafka.KafkaConsumer(kafka_mock.FakeAIOKafkaConsumer(), name="orders")
+
+        async with get_client(consumer) as client:
+            response = await client.get("/health/kafka")
+
+        assert response.status_code == fastapi.status.HTTP_200_OK
+        assert response.json()["orders"]["status"] == "not_started"
@@ -0,0 +1,50 @@
+import random
+
+from fastapi_app.kafka import OffsetTracker
+
+
+class TestOffsetTracker:
+    def test_in_order_positive(self):
+        tracker = OffsetTracker()
+        for offset in range(3):
+            tracker.add(offset)
+
+        assert [tracker.done(offset) for offset in range(3)] == [1, 2, 3]
+        assert not len(tracker)
+
+    def test_out_of_order_positive(self):
+        tracker = OffsetTracker()
+        for offset in range(10, 14):
+            tracker.add(offset)
+
+        assert tracker.done(12) is None
+        assert tracker.done(11) is None
+        assert tracker.done(10) == 13
+        assert len(tracker) == 1
+        assert tracker.done(13) == 14
+
+    def test_random_order_positive(self):
+        tracker = OffsetTracker()
+        offsets = list(range(100))
+        for offset in offsets:
+            tracker.add(offset)
+        random.shuffle(offsets)
+        processed = set()
+
+        for offset in offsets:
+            processed.add(offset)
+            committable = tracker.done(offset)
+            if committable is not None:
+                assert set(range(committable)) <= processed
+                assert committable not in processed
+
+        assert committable == 100
+
+    def test_gap_negative(self):
+        tracker = OffsetTracker()
+        for offset in (0, 5, 9):
+            tracker.add(offset)
+
+        assert tracker.done(9) is None
+        assert tracker.done(5) is None
+        assert tracker.done(0) == 10
@@ -0,0 +1,61 @@
+import typing
+
+import fastapi
+import httpx
+import pytest
+
+import fastapi_app
+from fastapi_app import kafka
+from tests.mock import kafka_mock
+
+
+class TestKafkaProducer:
+    async def test_send_many_positive(self):
+        fake = kafka_mock.FakeAIOKafkaProducer()
+        producer = kafka.KafkaProducer(lambda: fake)
+        await producer.start()
+
+        metadata = await producer.send_many(
+            "events",
+            [
+                kafka.ProducerRecord(str(index).encode(), key=b"key")
+                for index in range(5)
+            ],
+        )
+        await producer.stop()
+
+        assert [item.offset for item in metadata] == list(range(5))
+        assert [sent["value"] for sent in fake.sent] == [
+            str(index).encode() for index in range(5)
+        ]
+        assert fake.started and fake.stopped
+
+    async def test_not_started_negative(self):
+        producer = kafka.KafkaProducer(kafka_mock.FakeAIOKafkaProducer)
+
+        with pytest.raises(RuntimeError):
+            await producer.send_and_wait("events", b"{}")
+
+    async def test_dependency_lifespan_positive(self):
+        fake = kafka_mock.FakeAIOKafkaProducer()
+        producer = kafka.KafkaProducer(lambda: fake)
+        router = fastapi.APIRouter()
+
+        @router.post("/events")
+        async def publish(
+            kafka_producer: typing.Annotated[
+                kafka.KafkaProducer, fastapi.Depends(producer)
+            ],
+        ):
+            await kafka_producer.send_and_wait("events", b"{}")
+
+        app = fastapi_app.create(command_routers=[router], kafka_producers=[producer])
+        async with (
+            app.router.lifespan_context(app),
+            httpx.AsyncClient(app=app, base_url="http://test") as client,
+        ):
+            response = await client.post("/events")
+
+        assert response.status_code == fastapi.status.HTTP_200_OK
+        assert [sent["topic"] for sent in fake.sent] == ["events"]
+        assert fake.stopped
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from fastapi_app import kafka
+from tests.mock import kafka_mock
+
+
+def start(runner: kafka.ConsumerRunner) -> threading.Thread:
+    thread = threading.Thread(target=runner.run)
+    thread.start()
+    return thread
+
+
+def wait_for(condition, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Condition has not been met in time"
+        time.sleep(0.05)
+
+
+class TestConsumerRunner:
+    def test_graceful_stop_positive(self):
+        runner = kafka.ConsumerRunner(
+            kafka_mock.consume_forever, workers=2, stats_interval=0.05
+        )
+        thread = start(runner)
+
+        wait_for(
+            lambda: all(
+                stats.messages == kafka_mock.RUNNER_MESSAGES for stats in runner.stats()
+            )
+        )
+        runner.stop()
+        thread.join(20)
+
+        assert not thread.is_alive()
+        stats = runner.stats()
+        assert [worker.exit_code for worker in stats] == [0, 0]
+        assert all(worker.commits >= 1 and worker.restarts == 0 for worker in stats)
+        assert len({worker.pid for worker in stats}) == 2
+
+    def test_finished_workers_positive(self):
+        runner = kafka.ConsumerRunner(kafka_mock.finish, workers=2)
+        thread = start(runner)
+
+        thread.join(20)
+
+        assert not thread.is_alive()
+        assert [worker.exit_code for worker in runner.stats()] == [0, 0]
+
+    def test_restart_negative(self):
+        runner = kafka.ConsumerRunner(
+            kafka_mock.crash, workers=1, restart_backoff=0.01, max_restart_backoff=0.02
+        )
+        thread = start(runner)
+
+        wait_for(lambda: runner.stats()[0].restarts >= 2)
+        runner.stop()
+        thread.join(20)
+
+        assert not thread.is_alive()
+        assert runner.stats()[0].exit_code is not None
@@ -0,0 +1,104 @@
+import json
+import logging
+import sys
+
+import orjson
+import pytest
+
+from fastapi_app.logging import formatters
+from fastapi_app.logging.models import RawJSON
+
+
+def make_record(**extra) -> logging.LogRecord:
+    record = logging.LogRecord(
+        name="test",
+        level=logging.INFO,
+        pathname="/app/module.py",
+        lineno=10,
+        msg="Hello %s",
+        args=("world",),
+        exc_info=None,
+        func="handler",
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+class TestFastJSONLogFormatter:
+    @pytest.mark.parametrize(
+        "extra",
+        [
+            {},
+            {"duration": 15},
+            {"otelSpanID": "span", "otelTraceID": "trace"},
+            {
+                "request_json_fields": {
+                    "url.path": "/test",
+                    "http.response.status_code": 200,
+                }
+            },
+            {
+                "request_json_fields": {
+                    "http.request.body.content": RawJSON(b'{"foo": [1, "bar"]}')
+                }
+            },
+        ],
+    )
+    def test_fast_formatter_same_output_positive(self, extra):
+        record = make_record(**extra)
+        formatter = formatters.JSONLogFormatter(app_name="app", app_version="1.0")
+        fast_formatter = formatters.FastJSONLogFormatter(
+            app_name="app", app_version="1.0"
+        )
+
+        expected = json.loads(formatter.format(record))
+        result = orjson.loads(fast_formatter.format_bytes(record))
+
+        assert result == expected
+        assert list(result) == list(expected)
+
+    def test_fast_formatter_exception_positive(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = make_record(exc_info=sys.exc_info())
+        fast_formatter = formatters.FastJSONLogFormatter(
+            app_name="app", app_version="1.0"
+        )
+
+        result = json.loads(fast_formatter.format(record))
+
+        assert "ValueError: boom\n" in result["labels"]["exceptions"]
+
+    def test_fast_formatter_timestamp_cache_positive(self):
+        fast_formatter = formatters.FastJSONLogFormatter(
+            app_name="app", app_version="1.0"
+        )
+        first, second = make_record(), make_record()
+        second.created = first.created + 1
+
+        assert fast_formatter._format_timestamp(
+            first.created
+        ) == fast_formatter._format_timestamp(
+            int(first.created) + 0.999,
+        )
+        assert fast_formatter._format_timestamp(
+            first.created
+        ) != fast_formatter._format_timestamp(second.created)
+
+    def test_formatter_invalid_raw_json_negative(self):
+        record = make_record(
+            request_json_fields={
+                "http.request.body.content": RawJSON(b'{"a": 1}, "b": {}')
+            }
+        )
+        formatter = formatters.JSONLogFormatter(app_name="app", app_version="1.0")
+
+        result = json.loads(formatter.format(record))
+
+        assert result["http.request.body.content"] == '{"a": 1}, "b": {}'
+
+    def test_generate_log_config_fast_positive(self):
+        config = formatters.generate_log_config("INFO", serialize=True, fast=True)
+
+        assert config["formatters"]["json"]["()"] is formatters.FastJSONLogFormatter
@@ -0,0 +1,136 @@
+import io
+import logging
+import threading
+import time
+
+import orjson
+
+from fastapi_app.logging import formatters, handlers
+
+
+class BlockingStream(io.StringIO):
+    """Stream that counts writes and blocks them until `release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, data: str) -> int:
+        self.release.wait(timeout=5)
+        self.writes += 1
+        return super().write(data)
+
+
+def make_record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def wait_writer_busy(handler: handlers.BatchQueueHandler) -> None:
+    deadline = time.monotonic() + 5
+    while not handler._in_progress and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def fill_with_blocked_writer(handler, stream, records) -> None:
+    stream.release.clear()
+    handler.handle(make_record("in progress"))
+    wait_writer_busy(handler)
+    for record in records:
+        handler.handle(record)
+
+
+class TestBatchQueueHandler:
+    def test_batch_single_write_positive(self):
+        stream = BlockingStream()
+        handler = handlers.BatchQueueHandler(stream=stream, max_size=100)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        fill_with_blocked_writer(
+            handler, stream, [make_record(str(i)) for i in range(10)]
+        )
+        stream.release.set()
+        handler.close()
+
+        assert stream.getvalue().splitlines() == [
+            "in progress",
+            *[str(i) for i in range(10)],
+        ]
+        assert stream.writes == 2
+
+    def test_drop_oldest_negative(self):
+        stream = BlockingStream()
+        handler = handlers.BatchQueueHandler(
+            stream=stream, max_size=2, overflow_policy="drop_oldest"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        fill_with_blocked_writer(
+            handler, stream, [make_record(str(i)) for i in range(4)]
+        )
+        stream.release.set()
+        handler.close()
+
+        assert stream.getvalue().splitlines() == ["in progress", "2", "3"]
+        assert handler.dropped_total == 2
+
+    def test_drop_debug_first_negative(self):
+        stream = BlockingStream()
+        handler = handlers.BatchQueueHandler(
+            stream=stream, max_size=2, overflow_policy="drop_debug_first"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        records = [
+            make_record("debug", logging.DEBUG),
+            make_record("info"),
+            make_record("error", logging.ERROR),
+            make_record("new debug", logging.DEBUG),
+        ]
+        fill_with_blocked_writer(handler, stream, records)
+        stream.release.set()
+        handler.close()
+
+        assert stream.getvalue().splitlines() == ["in progress", "info", "error"]
+        assert handler.dropped == {"DEBUG": 2}
+
+    def test_block_waits_for_writer_positive(self):
+        stream = BlockingStream()
+        handler = handlers.BatchQueueHandler(stream=stream, max_size=1)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        fill_with_blocked_writer(handler, stream, [make_record("queued")])
+        producer = threading.Thread(
+            target=handler.handle, args=(make_record("blocked"),)
+        )
+        producer.start()
+        producer.join(timeout=0.05)
+        assert producer.is_alive()
+
+        stream.release.set()
+        producer.join(timeout=5)
+        handler.close()
+
+        assert stream.getvalue().splitlines() == ["in progress", "queued", "blocked"]
+        assert handler.dropped_total == 0
+
+    def test_fast_formatter_bytes_positive(self):
+        buffer = io.BytesIO()
+        stream = io.TextIOWrapper(buffer, encoding="utf-8")
+        handler = handlers.BatchQueueHandler(stream=stream)
+        handler.setFormatter(
+            formatters.FastJSONLogFormatter(app_name="app", app_version="1.0")
+        )
+
+        handler.handle(make_record("привет"))
+        handler.flush()
+
+        assert orjson.loads(buffer.getvalue())["message"] == "привет"
+        handler.close()
+
+    def test_generate_log_config_queue_positive(self):
+        config = formatters.generate_log_config("INFO", serialize=True, queue_size=100)
+
+        assert config["handlers"]["json"]["()"] is handlers.BatchQueueHandler
+        assert config["handlers"]["json"]["max_size"] == 100
@@ -0,0 +1,60 @@
+import logging
+
+import loguru
+import pytest
+
+from fastapi_app.logging import formatters, loggers
+
+
+@pytest.fixture
+def loguru_records():
+    records = []
+    sink_id = loguru.logger.add(lambda message: records.append(message.record), level=0)
+    yield records
+    loguru.logger.remove(sink_id)
+
+
+@pytest.fixture
+def std_logger():
+    handler = loggers.FastConsoleLogger()
+    logger = logging.getLogger("tests.fast_console_logger")
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger
+    logger.removeHandler(handler)
+    handler.close()
+
+
+class TestFastConsoleLogger:
+    def test_caller_from_log_record_positive(self, std_logger, loguru_records):
+        std_logger.info("Hello %s", "world")
+
+        record = loguru_records[-1]
+        assert record["message"] == "Hello world"
+        assert record["level"].name == "INFO"
+        assert record["name"] == "tests.fast_console_logger"
+        assert record["function"] == "test_caller_from_log_record_positive"
+        assert record["file"].path == __file__
+        assert (
+            record["line"]
+            == self.test_caller_from_log_record_positive.__code__.co_firstlineno + 1
+        )
+
+    def test_custom_level_positive(self, std_logger, loguru_records):
+        std_logger.log(15, "custom level")
+
+        assert loguru_records[-1]["level"].no == 15
+
+    def test_exception_positive(self, std_logger, loguru_records):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            std_logger.exception("failed")
+
+        assert loguru_records[-1]["exception"].type is ValueError
+
+    def test_generate_log_config_fast_intercept_positive(self):
+        config = formatters.generate_log_config("INFO", fast=True)
+
+        assert config["handlers"]["intercept"]["()"] is loggers.FastConsoleLogger
@@ -0,0 +1,138 @@
+import logging
+
+import orjson
+
+from fastapi_app.logging import formatters, masking
+from fastapi_app.logging.models import RawJSON
+
+
+class TestMasker:
+    def test_mask_raw_json_positive(self):
+        masker = masking.Masker(["*.password", "token"])
+        body = RawJSON(
+            b'{"login": "user", "Password": "p\\"wd", "data": [{"token": 123}]}'
+        )
+
+        result = masker.mask_body(body)
+
+        assert orjson.loads(result.raw) == {
+            "login": "user",
+            "Password": "***",
+            "data": [{"token": "***"}],
+        }
+
+    def test_mask_raw_json_without_sensitive_fields_positive(self):
+        masker = masking.Masker(masking.DEFAULT_MASK_RULES)
+        body = RawJSON(b'{"login": "user", "text": "\\"password\\": 1"}')
+
+        assert masker.mask_body(body) is body
+
+    def test_mask_raw_json_nested_value_positive(self):
+        masker = masking.Masker(["secret"])
+        body = RawJSON(b'{"secret": {"key": "value"}, "other": 1}')
+
+        result = masker.mask_body(body)
+
+        assert orjson.loads(result.raw) == {"secret": "***", "other": 1}
+
+    def test_mask_truncated_body_positive(self):
+        masker = masking.Masker(masking.DEFAULT_MASK_RULES)
+
+        assert masker.mask_truncated(
+            '{"login": "u", "password": "hunter2", "da<truncated: 90 bytes>'
+        ) == ('{"login": "u", "password": "***", "da<truncated: 90 bytes>')
+        assert masker.mask_truncated(
+            '{"login": "u", "token": "hunt<truncated: 90 bytes>'
+        ) == ('{"login": "u", "token": "***"<truncated: 90 bytes>')
+        assert (
+            masker.mask_truncated('{"secret": {"key": "val<truncated: 90 bytes>')
+            == "<truncated: 90 bytes>"
+        )
+
+    def test_mask_path_rules_positive(self):
+        masker = masking.Masker(["body.user.password", "body.*.pin"])
+        body = {
+            "user": {"password": "1", "login": "a"},
+            "card": {"pin": "0000"},
+            "password": "2",
+        }
+
+        result = masker.mask_body(body)
+
+        assert result == {
+            "user": {"password": "***", "login": "a"},
+            "card": {"pin": "***"},
+            "password": "2",
+        }
+        assert masker.mask_body(RawJSON(orjson.dumps(body))).loads() == result
+
+    def test_mask_headers_positive(self):
+        masker = masking.Masker(masking.DEFAULT_MASK_RULES)
+        headers = {"authorization": "Bearer token", "content-type": "application/json"}
+
+        assert masker.mask_headers(headers) == {
+            "authorization": "***",
+            "content-type": "application/json",
+        }
+
+    def test_mask_body_unchanged_is_same_object_positive(self):
+        masker = masking.Masker(masking.DEFAULT_MASK_RULES)
+        body = {"user": {"login": "a"}, "items": [1, 2]}
+
+        assert masker.mask_body(body) is body
+
+
+class TestFormatterMasking:
+    def test_formatter_masks_request_fields_positive(self):
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "message", None, None
+        )
+        record.to_mask = True
+        record.request_json_fields = {
+            "http.request.body.content": RawJSON(b'{"password": "secret"}'),
+            "http.request.headers": {"x-api-key": "key"},
+        }
+
+        for formatter_class in (
+            formatters.JSONLogFormatter,
+            formatters.FastJSONLogFormatter,
+        ):
+            result = orjson.loads(
+                formatter_class(app_name="app", app_version="1.0").format(record)
+            )
+            assert result["http.request.body.content"] == {"password": "***"}
+            assert result["http.request.headers"] == {"x-api-key": "***"}
+
+    def test_formatter_masks_truncated_body_positive(self):
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "message", None, None
+        )
+        record.to_mask = True
+        record.request_json_fields = {
+            "http.request.body.content": '{"login": "user", "password": "hunter2", "d<truncated: 60 bytes>',
+        }
+
+        for formatter_class in (
+            formatters.JSONLogFormatter,
+            formatters.FastJSONLogFormatter,
+        ):
+            result = orjson.loads(
+                formatter_class(app_name="app", app_version="1.0").format(record)
+            )
+            assert "hunter2" not in result["http.request.body.content"]
+
+    def test_formatter_without_to_mask_negative(self):
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "message", None, None
+        )
+        record.request_json_fields = {
+            "http.request.body.content": {"password": "secret"}
+        }
+
+        result = orjson.loads(
+            formatters.FastJSONLogFormatter(app_name="app", app_version="1.0").format(
+                record
+            )
+        )
+
+        assert result["http.request.body.content"] == {"password": "secret"}
@@ -0,0 +1,199 @@
+import logging
+
+import orjson
+from fastapi import status
+
+from fastapi_app import logging as app_logging
+from fastapi_app.logging import formatters, middleware, timing
+from fastapi_app.logging.models import RawJSON
+
+
+def get_request_logs(caplog) -> list[dict]:
+    return [
+        record.request_json_fields
+        for record in caplog.records
+        if hasattr(record, "request_json_fields")
+    ]
+
+
+def get_request_log(caplog) -> dict:
+    records = get_request_logs(caplog)
+    assert len(records) == 1
+    return records[0]
+
+
+class TestLoggingMiddleware:
+    async def test_logging_json_body_positive(self, api_with_logging, caplog):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        response = await api_with_logging.post("/echo", json={"foo": "bar"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"foo": "bar"}
+        fields = get_request_log(caplog)
+        assert fields["http.request.body.content"] == RawJSON(b'{"foo": "bar"}')
+        assert fields["http.response.body.content"] == RawJSON(b'{"foo":"bar"}')
+        assert fields["http.response.status_code"] == status.HTTP_200_OK
+
+    async def test_logging_invalid_json_body_negative(self, api_with_logging, caplog):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        response = await api_with_logging.post(
+            "/echo",
+            content=b'{"foo": }',
+            headers={"content-type": "application/json"},
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        fields = get_request_log(caplog)
+        assert fields["http.request.body.content"] == "<non-json binary data>"
+
+    async def test_logging_json_like_invalid_body_negative(
+        self, api_with_logging, caplog
+    ):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        response = await api_with_logging.request(
+            "GET",
+            "/stream",
+            content=b'{"a":1}, "log.level": "FORGED", "x": {}',
+            headers={"content-type": "application/json"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        fields = get_request_log(caplog)
+        assert fields["http.request.body.content"] == "<non-json binary data>"
+        record = next(
+            record
+            for record in caplog.records
+            if hasattr(record, "request_json_fields")
+        )
+        for formatter_class in (
+            formatters.JSONLogFormatter,
+            formatters.FastJSONLogFormatter,
+        ):
+            formatter = formatter_class(app_name="app", app_version="1.0")
+            result = orjson.loads(formatter.format(record))
+            assert result["log.level"] == "INFO"
+
+    async def test_logging_streaming_response_positive(self, api_with_logging, caplog):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        response = await api_with_logging.get("/stream")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b"x" * 10 * 1024
+        fields = get_request_log(caplog)
+        assert fields["http.response.body.bytes"] == 10 * 1024
+
+    async def test_logging_truncates_large_body_positive(
+        self, api_with_logging, caplog
+    ):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        body = {"data": "x" * app_logging.LoggingPolicy().max_body_bytes}
+        response = await api_with_logging.post("/echo", json=body)
+
+        assert response.json() == body
+        fields = get_request_log(caplog)
+        content = fields["http.response.body.content"]
+        assert isinstance(content, str)
+        assert len(content) < app_logging.LoggingPolicy().max_body_bytes + 100
+        assert content.endswith(
+            f"<truncated: {fields['http.response.body.bytes']} bytes>"
+        )
+
+    async def test_logging_unhandled_error_negative(self, api_with_logging, caplog):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        response = await api_with_logging.get("/error_route")
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        fields = get_request_log(caplog)
+        assert (
+            fields["http.response.status_code"] == status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+class TestRequestTimings:
+    async def test_timings_in_log_positive(self, api_with_logging, caplog):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        await api_with_logging.get("/timed")
+
+        record = next(
+            record
+            for record in caplog.records
+            if hasattr(record, "request_json_fields")
+        )
+        timings = record.request_json_fields["http.server.timings"]
+        assert {"handler", "response", "log", "db"} <= set(timings)
+        assert timings["db"] >= 1
+        assert record.duration >= 1
+
+    async def test_server_timing_header_positive(self, api_with_logging_policy):
+        client = api_with_logging_policy(app_logging.LoggingPolicy(server_timing=True))
+        response = await client.get("/timed")
+
+        server_timing = response.headers["server-timing"]
+        assert "handler;dur=" in server_timing
+        assert "db;dur=" in server_timing
+
+    async def test_server_timing_header_disabled_negative(self, api_with_logging):
+        response = await api_with_logging.get("/timed")
+
+        assert "server-timing" not in response.headers
+
+    def test_span_outside_request_negative(self):
+        with timing.span("db"):
+            pass
+
+        assert timing.current() is None
+
+
+class TestLoggingPolicy:
+    async def test_logging_sampled_out_status_negative(
+        self, api_with_logging_policy, caplog
+    ):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        policy = app_logging.LoggingPolicy(sample_rates={2: 0.0})
+        client = api_with_logging_policy(policy)
+
+        await client.post("/echo", json={"foo": "bar"})
+        await client.get("/error_route")
+
+        records = get_request_logs(caplog)
+        assert len(records) == 1
+        assert (
+            records[0]["http.response.status_code"]
+            == status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    async def test_logging_route_sample_rate_positive(
+        self, api_with_logging_policy, caplog
+    ):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        policy = app_logging.LoggingPolicy(
+            sample_rates={2: 0.0},
+            route_sample_rates={"/echo": {2: 1.0}},
+        )
+        client = api_with_logging_policy(policy)
+
+        await client.post("/echo", json={"foo": "bar"})
+        await client.get("/stream")
+
+        records = get_request_logs(caplog)
+        assert [record["url.path"] for record in records] == ["/echo"]
+
+    async def test_logging_body_status_classes_positive(
+        self, api_with_logging_policy, caplog
+    ):
+        caplog.set_level(logging.INFO, logger=middleware.__name__)
+        policy = app_logging.LoggingPolicy(body_status_classes={5})
+        client = api_with_logging_policy(policy)
+
+        await client.post("/echo", json={"foo": "bar"})
+
+        fields = get_request_log(caplog)
+        assert fields["http.request.body.content"] == ""
+        assert fields["http.response.body.content"] == ""
+
+    def test_logging_excluded_routes_positive(self):
+        policy = app_logging.LoggingPolicy(excluded_prefixes=("/admin", "/internal"))
+
+        assert policy.is_excluded("/docs")
+        assert policy.is_excluded("/internal/metrics")
+        assert not policy.is_excluded("/echo")
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext import asyncio as sa_asyncio
+
+import fastapi_app
+from fastapi_app import kafka, outbox
+from tests.mock import kafka_mock
+
+
+async def count_unsent(engine: sa_asyncio.AsyncEngine) -> int:
+    async with engine.connect() as connection:
+        return await connection.scalar(
+            sa.select(sa.func.count())
+            .select_from(outbox.outbox_table)
+            .where(outbox.outbox_table.c.sent_at.is_(None)),
+        )
+
+
+class TestOutbox:
+    async def test_add_event_rollback_negative(self, outbox_engine):
+        async with sa_asyncio.AsyncSession(outbox_engine) as session:
+            await outbox.add_event(session, "orders", b"{}")
+            await session.rollback()
+
+        assert await count_unsent(outbox_engine) == 0
+
+    async def test_relay_batch_positive(self, outbox_engine):
+        async with sa_asyncio.AsyncSession(outbox_engine) as session, session.begin():
+            await outbox.add_event(
+                session, "orders", b"first", key=b"1", headers={"source": "test"}
+            )
+            await outbox.add_events(
+                session, "payments", [(b"2", b"second"), (b"3", b"third")]
+            )
+            await outbox.add_event(session, "orders", b"fourth")
+        fake = kafka_mock.FakeAIOKafkaProducer()
+        producer = kafka.KafkaProducer(lambda: fake)
+        relay = outbox.OutboxRelay(outbox_engine, producer, batch_size=3)
+        await producer.start()
+
+        assert await relay.relay_batch() == 3
+        assert await relay.relay_batch() == 1
+        assert await relay.relay_batch() == 0
+
+        assert [
+            (sent["topic"], sent["value"])
+            for sent in fake.sent
+            if sent["topic"] == "orders"
+        ] == [
+            ("orders", b"first"),
+            ("orders", b"fourth"),
+        ]
+        assert fake.sent[0]["headers"] == [("source", b"test")]
+        assert sorted(
+            sent["key"] for sent in fake.sent if sent["topic"] == "payments"
+        ) == [b"2", b"3"]
+        assert await count_unsent(outbox_engine) == 0
+
+    async def test_relay_publish_failure_negative(self, outbox_engine):
+        async with sa_asyncio.AsyncSession(outbox_engine) as session, session.begin():
+            await outbox.add_event(session, "orders", b"{}")
+        producer = kafka.KafkaProducer(
+            lambda: kafka_mock.FakeAIOKafkaProducer(fail=True)
+        )
+        relay = outbox.OutboxRelay(outbox_engine, producer)
+        await producer.start()
+
+        with pytest.raises(ConnectionError):
+            await relay.relay_batch()
+
+        assert await count_unsent(outbox_engine) == 1
+
+    async def test_delete_sent_positive(self, outbox_engine):
+        async with sa_asyncio.AsyncSession(outbox_engine) as session, session.begin():
+            await outbox.add_event(session, "orders", b"{}")
+        producer = kafka.KafkaProducer(kafka_mock.FakeAIOKafkaProducer)
+        relay = outbox.OutboxRelay(outbox_engine, producer, delete_sent=True)
+        await producer.start()
+
+        await relay.relay_batch()
+
+        async with outbox_engine.connect() as connection:
+            assert (
+                await connection.scalar(
+                    sa.select(sa.func.count()).select_from(outbox.outbox_table)
+                )
+                == 0
+            )
+
+    async def test_app_lifespan_positive(self, outbox_engine):
+        fake = kafka_mock.FakeAIOKafkaProducer()
+        producer = kafka.KafkaProducer(lambda: fake)
+        relay = outbox.OutboxRelay(outbox_engine, producer, poll_interval=0.01)
+        app = fastapi_app.create(kafka_producers=[producer], outbox_relays=[relay])
+
+        async with app.router.lifespan_context(app):
+            async with (
+                sa_asyncio.AsyncSession(outbox_engine) as session,
+                session.begin(),
+            ):
+                await outbox.add_event(session, "orders", b"{}")
+            async with asyncio.timeout(5):
+                while not fake.sent:
+                    await asyncio.sleep(0.01)
+
+        assert await count_unsent(outbox_engine) == 0
+        assert fake.stopped
+
+    async def test_app_lifespan_stops_own_producer_positive(self, outbox_engine):
+        fake = kafka_mock.FakeAIOKafkaProducer()
+        producer = kafka.KafkaProducer(lambda: fake)
+        relay = outbox.OutboxRelay(outbox_engine, producer, poll_interval=0.01)
+        app = fastapi_app.create(outbox_relays=[relay])
+
+        async with app.router.lifespan_context(app):
+            async with (
+                sa_asyncio.AsyncSession(outbox_engine) as session,
+                session.begin(),
+            ):
+                await outbox.add_event(session, "orders", b"{}")
+            async with asyncio.timeout(5):
+                while not fake.sent:
+                    await asyncio.sleep(0.01)
+            assert not fake.stopped
+
+        assert fake.stopped
+        assert not producer.started